@@ -1,12 +1,49 @@
 #!/usr/bin/env python3
 
-import asyncio
+from __future__ import annotations
+
+import argparse
+import hashlib
 import json
-from collections import OrderedDict
-from playwright.async_api import async_playwright, Page, ElementHandle
+import os
+import re
+import sys
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from urllib.parse import urlparse
+
+from autoply.snapshots import SNAPSHOT_DIR, SnapshotStore, diff_snapshots, print_delta
+
+# Playwright takes far longer to import than everything else, so it is only
+# imported inside the functions that drive a browser, and asyncio only inside
+# the scrape paths. That keeps cache hits and the status/summary commands
+# fast.
+if TYPE_CHECKING:
+    from playwright.async_api import (
+        Browser,
+        BrowserContext,
+        ElementHandle,
+        Page,
+        Playwright,
+        Response,
+    )
 
-URL = "https://www.publix.com/savings/weekly-ad/bogo"
+WEEKLY_AD_URL = "https://www.publix.com/savings/weekly-ad/"
+URL = WEEKLY_AD_URL + "bogo"
+VIEWPORT = {"width": 1280, "height": 1600}
+
+# The grouped output, and a small sidecar describing it (timestamp, content
+# hash, counts) so freshness checks never have to parse the full payload
+OUTPUT_PATH = "publix.json"
+PLAN_PATH = "dinners.json"
+MANIFEST_PATH = "publix.manifest.json"
+CACHE_MAX_AGE = timedelta(days=7)
 
 CARD_SELECTOR = '[data-qa="savings-weekly-card"]'
 HEADING_SELECTOR = 'h2[id$="-heading"]'
@@ -14,6 +51,296 @@ TITLE_SELECTOR = '[data-qa-automation="prod-title"]'
 SAVINGS_SELECTOR = "span.additional-info"
 OFFER_SELECTOR = ".p-savings-badge__text span"
 
+# Upper bound (seconds) on the readiness wait and how long (ms) the card count
+# must stay unchanged before the page counts as ready
+READY_TIMEOUT = 30.0
+READY_STABLE_MS = 1500
+
+# Store mode: the store a browser context shops at is taken from this cookie
+STORE_COOKIE = "PublixStore"
+STORE_COOKIE_DOMAIN = ".publix.com"
+STORE_DIR = "stores"
+
+# Deals are appended to the journal as they are found, and the scroll position
+# is checkpointed after every step so an interrupted scrape can be resumed
+JOURNAL_PATH = "publix.ndjson"
+CHECKPOINT_PATH = "publix.checkpoint.json"
+
+# Browsers the scraper can drive. Only Chromium exposes performance.memory,
+# so the trace's JS heap gauge is only filled in with --browser chromium
+BROWSERS = ("firefox", "chromium")
+DEFAULT_BROWSER = "firefox"
+
+# Fields that identify a deal when deduplicating
+DEAL_IDENTITY = ("category", "title", "offer")
+
+# Lean profile: run headless and abort these resource types, plus any request
+# to a host outside the allowlist (ads, analytics, third-party widgets)
+LEAN_BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+LEAN_ALLOWED_HOSTS = ("publix.com",)
+
+# Network engine: JSON responses whose URL matches this pattern are captured,
+# and objects carrying a title plus a savings or offer field become deals. Each
+# field is read from the first key present on the object.
+RESPONSE_URL_PATTERN = re.compile(r"savings|weekly-?ad", re.I)
+RESPONSE_FIELDS = {
+    "title": ("title", "productName", "name"),
+    "savings": ("additionalDealInfo", "additionalInfo", "savingsText"),
+    "offer": ("savings", "dealText", "badgeText", "offer"),
+    "category": ("category", "categoryName", "department", "departmentName"),
+}
+
+# Page-side heading index: a sorted array of heading Y offsets built once and
+# rebuilt only after a DOM mutation or resize marks it dirty. Card categories
+# are then resolved by binary search instead of re-reading every heading.
+HEADING_INDEX_JS = """(selector) => {
+    let index = window.__autoplyHeadingIndex;
+
+    if (!index || index.selector !== selector) {
+        index = { selector, dirty: true, ys: [], names: [] };
+
+        const invalidate = () => {
+            index.dirty = true;
+        };
+        new MutationObserver(invalidate).observe(document.body, {
+            childList: true,
+            subtree: true,
+        });
+        new ResizeObserver(invalidate).observe(document.body);
+        window.addEventListener("resize", invalidate);
+
+        index.categoryAt = (y) => {
+            let lo = 0;
+            let hi = index.ys.length - 1;
+            let found = -1;
+
+            while (lo <= hi) {
+                const mid = (lo + hi) >> 1;
+                if (index.ys[mid] <= y) {
+                    found = mid;
+                    lo = mid + 1;
+                } else {
+                    hi = mid - 1;
+                }
+            }
+
+            return found === -1 ? null : index.names[found];
+        };
+
+        window.__autoplyHeadingIndex = index;
+    }
+
+    if (index.dirty) {
+        const entries = Array.from(document.querySelectorAll(selector), (h) => ({
+            y: h.getBoundingClientRect().top + window.scrollY,
+            name: h.innerText.trim(),
+        }));
+        entries.sort((a, b) => a.y - b.y);
+
+        index.ys = entries.map((e) => e.y);
+        index.names = entries.map((e) => e.name);
+        index.dirty = false;
+    }
+
+    return index;
+}"""
+
+
+@dataclass
+class Trace:
+    """Phase timings, browser round trips and scroll iterations of a scrape"""
+
+    counts: Counter = field(default_factory=Counter)
+    iterations: list = field(default_factory=list)
+    phases: list = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+    live_handles: int = 0
+    peak_handles: int = 0
+
+    def to_dict(self) -> dict:
+        """
+        Convert the trace into a JSON-serializable dictionary
+
+        Returns:
+            dict: Dictionary containing phases, round trips, iterations and totals
+        """
+        return {
+            "phases": self.phases,
+            "round_trips": sum(self.counts.values()),
+            "round_trip_counts": dict(self.counts),
+            "iterations": self.iterations,
+            "totals": {
+                "seconds": round(time.perf_counter() - self.started, 4),
+                "iterations": len(self.iterations),
+                "cards_read": sum(i.get("cards", 0) for i in self.iterations),
+                "new": sum(i.get("new", 0) for i in self.iterations),
+                "duplicates": sum(i.get("duplicates", 0) for i in self.iterations),
+            },
+            "memory": {
+                "live_handles": self.live_handles,
+                "peak_handles": self.peak_handles,
+                "peak_js_heap": max(
+                    (i["jsHeap"] for i in self.iterations if i.get("jsHeap")),
+                    default=None,
+                ),
+                "peak_dom_nodes": max(
+                    (i["domNodes"] for i in self.iterations if i.get("domNodes")),
+                    default=None,
+                ),
+            },
+        }
+
+    def merge(self, other: "Trace", label: str):
+        """
+        Fold another trace into this one, tagging its phases and iterations
+
+        Args:
+            other (Trace): Trace to merge, e.g. one section of a multi-section run
+            label (str): Prefix for the merged phase names and ``section`` value
+                on the merged iterations
+        """
+        self.counts.update(other.counts)
+        self.peak_handles = max(self.peak_handles, other.peak_handles)
+        self.live_handles += other.live_handles
+
+        offset = other.started - self.started
+        for p in other.phases:
+            self.phases.append(
+                {**p, "name": f"{label}: {p['name']}", "start": p["start"] + offset}
+            )
+        for i in other.iterations:
+            self.iterations.append({"section": label, **i})
+
+    def summary(self) -> str:
+        """
+        Render the phase timings and counters as a plain-text table
+
+        Returns:
+            str: Summary table
+        """
+        data = self.to_dict()
+        width = max([20] + [len(p["name"]) for p in self.phases])
+        lines = [f"{'phase':<{width}} {'seconds':>10}"]
+
+        for p in self.phases:
+            lines.append(f"{p['name']:<{width}} {p['seconds']:>10.3f}")
+
+        lines.append(f"{'total':<{width}} {data['totals']['seconds']:>10.3f}")
+        lines.append("")
+        lines.append(f"{'round trips':<20} {data['round_trips']:>10}")
+
+        for kind, count in self.counts.most_common():
+            lines.append(f"  {kind:<18} {count:>10}")
+
+        for key in ("iterations", "cards_read", "new", "duplicates"):
+            lines.append(f"{key.replace('_', ' '):<20} {data['totals'][key]:>10}")
+
+        lines.append("")
+        for key, value in data["memory"].items():
+            value = "n/a" if value is None else value
+            lines.append(f"{key.replace('_', ' '):<20} {value:>10}")
+
+        return "\n".join(lines)
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+
+
+@contextmanager
+def tracing(trace: Trace | None = None):
+    """
+    Record round trips and iterations made inside the block into a trace
+
+    Args:
+        trace (Trace | None): Trace to record into, a new one if omitted
+
+    Yields:
+        Trace: The active trace
+    """
+    trace = trace or Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Time the enclosed block as a named phase of the active trace
+
+    Args:
+        name (str): Phase name, e.g. "goto" or "scroll loop"
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.phases.append(
+                {
+                    "name": name,
+                    "start": round(start - trace.started, 4),
+                    "seconds": round(time.perf_counter() - start, 4),
+                }
+            )
+
+
+def count_round_trip(kind: str):
+    """
+    Count one browser round trip of the given kind on the active trace
+
+    Args:
+        kind (str): Playwright call name, e.g. "evaluate" or "inner_text"
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.counts[kind] += 1
+
+
+def track_handles(delta: int):
+    """
+    Adjust the live ElementHandle count on the active trace
+
+    Args:
+        delta (int): Handles created (positive) or disposed (negative)
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.live_handles += delta
+        trace.peak_handles = max(trace.peak_handles, trace.live_handles)
+
+
+async def release_handles(handles: list):
+    """
+    Dispose ElementHandles so neither the driver nor the browser keeps them alive
+
+    Args:
+        handles (list): ElementHandles to dispose
+    """
+    import asyncio
+
+    for _ in handles:
+        count_round_trip("dispose")
+    await asyncio.gather(*(h.dispose() for h in handles))
+    track_handles(-len(handles))
+
+
+def record_iteration(**fields):
+    """
+    Append one scroll iteration record to the active trace
+
+    The trace's live ElementHandle count is added to the record as ``handles``.
+
+    Args:
+        **fields: Values describing the iteration
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.iterations.append({**fields, "handles": trace.live_handles})
+
 
 async def get_category_for_card(page: Page, card: ElementHandle) -> str | None:
     """
@@ -27,31 +354,115 @@ async def get_category_for_card(page: Page, card: ElementHandle) -> str | None:
         str | None: The category heading text if found, otherwise None
     """
 
+    count_round_trip("evaluate")
     return await page.evaluate(
         """([card, selector]) => {
+            const index = ("""
+        + HEADING_INDEX_JS
+        + """)(selector);
             const cardY = card.getBoundingClientRect().top + window.scrollY;
 
-            const headings = Array.from(
-                document.querySelectorAll(selector)
-            );
-
-            let category = null;
-
-            for (const h of headings) {
-                const y = h.getBoundingClientRect().top + window.scrollY;
-                if (y <= cardY) {
-                    category = h.innerText.trim();
-                } else {
-                    break;
-                }
-            }
-
-            return category;
+            return index.categoryAt(cardY);
         }""",
         [card, HEADING_SELECTOR],
     )
 
 
+async def wait_for_network_idle(page: Page, timeout: float) -> bool:
+    """
+    Wait for the page to reach Playwright's networkidle load state
+
+    Args:
+        page (Page): Playwright page object
+        timeout (float): Maximum time to wait in seconds
+
+    Returns:
+        bool: True if the network went idle, False if the wait timed out
+    """
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    try:
+        count_round_trip("wait_for_load_state")
+        await page.wait_for_load_state("networkidle", timeout=timeout * 1000)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def wait_for_ready(
+    page: Page,
+    timeout: float = READY_TIMEOUT,
+    stable_ms: int = READY_STABLE_MS,
+    network_idle: bool = False,
+) -> dict:
+    """
+    Wait until the weekly ad cards have rendered and stopped changing
+
+    The page counts as ready once the first card has a measurable height and
+    the card count has been stable for ``stable_ms``. Polling happens inside
+    the page, so the whole wait is a single round trip. Network idle is an
+    optional extra signal since ad and analytics requests can keep the network
+    busy long after the cards are rendered.
+
+    Args:
+        page (Page): Playwright page object
+        timeout (float): Upper bound on the wait in seconds
+        stable_ms (int): How long the card count must stay unchanged
+        network_idle (bool): Also wait for the networkidle load state
+
+    Returns:
+        dict: Dictionary containing waited (seconds), cardCount, timedOut and
+            networkIdle (None when not requested)
+    """
+    import asyncio
+
+    start = time.perf_counter()
+
+    count_round_trip("evaluate")
+    waits = [
+        page.evaluate(
+            """([selector, stableMs, timeoutMs]) => new Promise((resolve) => {
+                const start = performance.now();
+                let lastCount = -1;
+                let stableSince = start;
+
+                const tick = () => {
+                    const now = performance.now();
+                    const cards = document.querySelectorAll(selector);
+                    const measurable =
+                        cards.length > 0 &&
+                        cards[0].getBoundingClientRect().height > 0;
+
+                    if (cards.length !== lastCount) {
+                        lastCount = cards.length;
+                        stableSince = now;
+                    }
+
+                    if (measurable && now - stableSince >= stableMs) {
+                        resolve({ cardCount: cards.length, timedOut: false });
+                    } else if (now - start >= timeoutMs) {
+                        resolve({ cardCount: cards.length, timedOut: true });
+                    } else {
+                        setTimeout(tick, 100);
+                    }
+                };
+
+                tick();
+            })""",
+            [CARD_SELECTOR, stable_ms, timeout * 1000],
+        )
+    ]
+    if network_idle:
+        waits.append(wait_for_network_idle(page, timeout))
+
+    results = await asyncio.gather(*waits)
+
+    ready = results[0]
+    ready["networkIdle"] = results[1] if network_idle else None
+    ready["waited"] = time.perf_counter() - start
+    return ready
+
+
 async def get_card_metrics(page: Page) -> dict:
     """
     Get metrics about the card elements on the page
@@ -62,8 +473,10 @@ async def get_card_metrics(page: Page) -> dict:
     Returns:
         dict: Dictionary containing cardHeight and firstCardY
     """
+    count_round_trip("wait_for_selector")
     await page.wait_for_selector(CARD_SELECTOR)
 
+    count_round_trip("evaluate")
     return await page.evaluate(
         """(selector) => {
             const el = document.querySelector(selector);
@@ -98,6 +511,7 @@ async def is_element_visible(element: ElementHandle) -> bool:
     Returns:
         bool: True if the element is visible, False otherwise
     """
+    count_round_trip("evaluate")
     return await element.evaluate(
         """(el) => {
             const rect = el.getBoundingClientRect();
@@ -122,35 +536,342 @@ async def extract_text(card: ElementHandle, selector: str) -> str | None:
     Returns:
         str | None: The cleaned text if found, otherwise None
     """
+    count_round_trip("query_selector")
     extract_text = await card.query_selector(selector)
     if extract_text:
-        return (await extract_text.inner_text()).strip()
+        track_handles(1)
+        try:
+            count_round_trip("inner_text")
+            return (await extract_text.inner_text()).strip()
+        finally:
+            await release_handles([extract_text])
     return None
 
 
-def add_new_deals(master_list: list, new_deals: list):
+async def extract_viewport(page: Page) -> list:
+    """
+    Extract every fully visible card in the viewport in one browser round trip
+
+    Visibility, title, savings, offer and category are all resolved inside the
+    page, so the cost no longer scales with the number of cards.
+
+    Args:
+        page (Page): Playwright page object
+
+    Returns:
+        list: List of deal dictionaries, in document order
+    """
+    count_round_trip("evaluate")
+    return await page.evaluate(
+        """([cardSel, headingSel, titleSel, savingsSel, offerSel]) => {
+            const vh = window.innerHeight || document.documentElement.clientHeight;
+            const vw = window.innerWidth || document.documentElement.clientWidth;
+
+            const text = (card, selector) => {
+                const el = card.querySelector(selector);
+                return el ? el.innerText.trim() : null;
+            };
+
+            const index = ("""
+        + HEADING_INDEX_JS
+        + """)(headingSel);
+
+            const deals = [];
+
+            for (const card of document.querySelectorAll(cardSel)) {
+                const rect = card.getBoundingClientRect();
+                if (
+                    rect.top < 0 ||
+                    rect.left < 0 ||
+                    rect.bottom > vh ||
+                    rect.right > vw
+                ) {
+                    continue;
+                }
+
+                const title = text(card, titleSel);
+                if (!title) continue;
+
+                deals.push({
+                    category: index.categoryAt(rect.top + window.scrollY),
+                    title,
+                    savings: text(card, savingsSel),
+                    offer: text(card, offerSel),
+                });
+            }
+
+            return deals;
+        }""",
+        [
+            CARD_SELECTOR,
+            HEADING_SELECTOR,
+            TITLE_SELECTOR,
+            SAVINGS_SELECTOR,
+            OFFER_SELECTOR,
+        ],
+    )
+
+
+class DealAccumulator:
+    """
+    Deals collected during a scrape, deduplicated on an identity key
+
+    The keys of every accepted deal are kept in a set, so each insert is O(1)
+    no matter how many deals have been collected. The default identity keeps
+    distinct offers that share a title.
+
+    Args:
+        identity (tuple): Deal fields that together identify a deal
+    """
+
+    def __init__(self, identity: tuple = DEAL_IDENTITY):
+        self.identity = tuple(identity)
+        self.deals = []
+        self._seen = set()
+
+    def key(self, deal: dict) -> tuple:
+        return tuple(deal.get(f) for f in self.identity)
+
+    def add(self, deal: dict) -> bool:
+        """
+        Add a deal unless one with the same identity was already added
+
+        Args:
+            deal (dict): Deal dictionary
+
+        Returns:
+            bool: True if the deal was new
+        """
+        key = self.key(deal)
+        if key in self._seen:
+            return False
+
+        self._seen.add(key)
+        self._accept(deal)
+        return True
+
+    def _accept(self, deal: dict):
+        self.deals.append(deal)
+
+    def extend(self, deals: Iterable[dict]) -> tuple[int, int]:
+        """
+        Add a batch of deals
+
+        Args:
+            deals (Iterable[dict]): Deal dictionaries
+
+        Returns:
+            tuple: Number of new deals and number of duplicates in the batch
+        """
+        new = duplicates = 0
+        for deal in deals:
+            if self.add(deal):
+                new += 1
+            else:
+                duplicates += 1
+        return new, duplicates
+
+    def checkpoint(self, url: str, scroll_y: float):
+        """
+        Record scrape progress, a no-op unless the accumulator persists deals
+
+        Args:
+            url (str): URL of the page being scrolled
+            scroll_y (float): Scroll offset whose cards have all been added
+        """
+
+    def resume_position(self, url: str) -> float | None:
+        """
+        Scroll offset to resume a page from, None unless resuming a journal
+
+        Args:
+            url (str): URL of the page being scrolled
+
+        Returns:
+            float | None: Last checkpointed scroll offset for the URL
+        """
+        return None
+
+    def __contains__(self, deal: dict) -> bool:
+        return self.key(deal) in self._seen
+
+    def __iter__(self):
+        return iter(self.deals)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+def read_journal(path: str | Path) -> Iterable[dict]:
+    """
+    Stream deals from an NDJSON journal
+
+    A trailing partial line, left behind when a scrape was killed mid-write,
+    is ignored.
+
+    Args:
+        path (str | Path): Path to the journal
+
+    Yields:
+        dict: Deal dictionaries in the order they were found
     """
-    Add new deals to the master list, avoiding duplicates based on title
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                return
+
+
+class DealJournal(DealAccumulator):
+    """
+    DealAccumulator that streams new deals to an NDJSON journal
+
+    Only the identity keys stay in memory, every new deal is appended to the
+    journal as soon as it is seen, and checkpoint() atomically rewrites the
+    checkpoint file with the latest scroll position of every page. With
+    ``resume`` the seen index is rebuilt from the existing journal (dropping a
+    partial last line) and the saved positions are served by resume_position.
+
+    The checkpoint records the identity fields and the URLs of the run, and
+    resuming with different ones raises ValueError rather than mixing the
+    deals of two runs.
+
     Args:
-        master_list (list): Existing list of deals
-        new_deals (list): New deals to add
+        path (str | Path): NDJSON journal path
+        checkpoint_path (str | Path): Checkpoint JSON path
+        identity (tuple): Deal fields that together identify a deal
+        resume (bool): Continue an existing journal instead of starting over
+        urls (list | None): URLs the run scrapes
+
+    Raises:
+        ValueError: The checkpoint being resumed is from a different run
     """
 
-    existing_titles = {deal["title"] for deal in master_list}
-    for deal in new_deals:
-        if deal["title"] not in existing_titles:
-            master_list.append(deal)
+    def __init__(
+        self,
+        path: str | Path = JOURNAL_PATH,
+        checkpoint_path: str | Path = CHECKPOINT_PATH,
+        identity: tuple = DEAL_IDENTITY,
+        resume: bool = False,
+        urls: list | None = None,
+    ):
+        super().__init__(identity)
+        self.path = Path(path)
+        self.checkpoint_path = Path(checkpoint_path)
+        self.urls = list(urls) if urls is not None else None
+        self.positions = {}
+
+        if resume and self.path.exists():
+            try:
+                with open(self.checkpoint_path, "r") as f:
+                    saved = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                saved = {}
+
+            if saved.get("identity", list(self.identity)) != list(self.identity):
+                raise ValueError(
+                    f"{self.checkpoint_path} was deduplicated on "
+                    f"{','.join(saved['identity'])}, not {','.join(self.identity)}"
+                )
+            if self.urls is not None and saved.get("urls", self.urls) != self.urls:
+                raise ValueError(
+                    f"{self.checkpoint_path} is for {', '.join(saved['urls'])}, "
+                    f"not {', '.join(self.urls)}"
+                )
+            self.positions = saved.get("positions", {})
+
+            kept = 0
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        deal = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self._seen.add(self.key(deal))
+                    kept += len(line)
+
+            # Drop whatever was half-written when the previous run died
+            with open(self.path, "r+b") as f:
+                f.truncate(kept)
+
+            print(f"Resuming with {len(self._seen)} deals already journaled")
+        else:
+            self.checkpoint_path.unlink(missing_ok=True)
+
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+
+    def _accept(self, deal: dict):
+        self._file.write(json.dumps(deal, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def checkpoint(self, url: str, scroll_y: float):
+        self.positions[url] = scroll_y
+
+        tmp = self.checkpoint_path.with_suffix(self.checkpoint_path.suffix + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                    "identity": list(self.identity),
+                    "urls": self.urls,
+                    "deals": len(self),
+                    "positions": self.positions,
+                },
+                f,
+            )
+        os.replace(tmp, self.checkpoint_path)
+
+    def resume_position(self, url: str) -> float | None:
+        return self.positions.get(url)
 
+    @property
+    def deals(self) -> list:
+        """
+        Every journaled deal, including resumed ones, read back from the journal
 
-def group_deals_by_category(deals: list[dict]) -> list[dict]:
+        Returns:
+            list: Deal dictionaries in the order they were found
+        """
+        return list(self)
+
+    @deals.setter
+    def deals(self, value: list):
+        # DealAccumulator.__init__ starts an in-memory list; the journal is
+        # the only store here
+        pass
+
+    def close(self, completed: bool = False):
+        """
+        Close the journal
+
+        Args:
+            completed (bool): The scrape finished, so the checkpoint is removed
+        """
+        self._file.close()
+        if completed:
+            self.checkpoint_path.unlink(missing_ok=True)
+
+    def __iter__(self):
+        if not self._file.closed:
+            self._file.flush()
+        return iter(read_journal(self.path))
+
+
+def group_deals_by_category(deals: Iterable[dict]) -> dict:
     """
     Group deals by their category
 
     Args:
-        deals (list): List of deal dictionaries
+        deals (Iterable[dict]): Deal dictionaries, e.g. a list or a
+            DealAccumulator
 
     Returns:
-        list: List of categories with their associated deals
+        dict: Timestamp and list of categories with their associated deals
     """
     grouped = OrderedDict()
 
@@ -179,21 +900,230 @@ def group_deals_by_category(deals: list[dict]) -> list[dict]:
     return {"timestamp": utc_now, "deals": deals}
 
 
-async def scrape_publix(page: Page, pause: float = 0.0) -> list:
+def build_manifest(data: dict, payload: bytes, stat: os.stat_result) -> dict:
+    """
+    Describe a grouped output file without the deals themselves
+
+    Args:
+        data (dict): The grouped output, as returned by group_deals_by_category
+        payload (bytes): The serialized output exactly as written to disk
+        stat (os.stat_result): Stat of the written output file
+
+    Returns:
+        dict: Timestamp, content hash, file identity and counts
+    """
+    counts = {cat["category"]: len(cat["items"]) for cat in data["deals"]}
+    return {
+        "timestamp": data.get("timestamp"),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "bytes": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "categories": len(counts),
+        "items": sum(counts.values()),
+        "category_counts": counts,
+    }
+
+
+def write_output(
+    data: dict, path: str = OUTPUT_PATH, manifest_path: str = MANIFEST_PATH
+) -> dict:
+    """
+    Write the grouped output and its manifest sidecar
+
+    Args:
+        data (dict): The grouped output, as returned by group_deals_by_category
+        path (str): Output JSON path
+        manifest_path (str): Manifest sidecar path
+
+    Returns:
+        dict: The manifest that was written
+    """
+    payload = json.dumps(data, indent=2).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(payload)
+
+    manifest = build_manifest(data, payload, os.stat(path))
+
+    tmp = f"{manifest_path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+
+    return manifest
+
+
+def read_manifest(
+    path: str = OUTPUT_PATH, manifest_path: str = MANIFEST_PATH
+) -> dict | None:
+    """
+    Read the manifest for the output file, rebuilding it if it is out of date
+
+    The manifest is trusted only while the output file's size and mtime match
+    the ones it recorded. Otherwise, e.g. after publix.json was edited by hand
+    or written by an older version, it is rebuilt from the payload once.
+
+    Args:
+        path (str): Output JSON path
+        manifest_path (str): Manifest sidecar path
+
+    Returns:
+        dict | None: The manifest, or None if there is no usable output file
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        if (
+            manifest.get("bytes") == stat.st_size
+            and manifest.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            return manifest
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        pass
+
+    with open(path, "rb") as f:
+        payload = f.read()
+    try:
+        data = json.loads(payload)
+        manifest = build_manifest(data, payload, stat)
+    except (json.JSONDecodeError, AttributeError, KeyError, TypeError):
+        return None
+
+    tmp = f"{manifest_path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+
+    return manifest
+
+
+def manifest_age(manifest: dict) -> timedelta | None:
+    """
+    Age of the scrape a manifest describes
+
+    Args:
+        manifest (dict): Manifest from read_manifest
+
+    Returns:
+        timedelta | None: Time since the scrape, or None without a timestamp
+    """
+    timestamp = manifest.get("timestamp")
+    if not timestamp:
+        return None
+    return datetime.now(timezone.utc) - datetime.fromisoformat(timestamp)
+
+
+def is_fresh(manifest: dict | None, max_age: timedelta = CACHE_MAX_AGE) -> bool:
+    """
+    Check whether the cached output can be used instead of scraping
+
+    Args:
+        manifest (dict | None): Manifest from read_manifest
+        max_age (timedelta): Oldest scrape still considered current
+
+    Returns:
+        bool: True if the output exists and is newer than max_age
+    """
+    if manifest is None:
+        return False
+
+    age = manifest_age(manifest)
+    return age is None or age < max_age
+
+
+def print_summary(manifest: dict):
+    """
+    Print the per-category item counts recorded in a manifest
+
+    Args:
+        manifest (dict): Manifest from read_manifest or write_output
+    """
+    for category, count in manifest["category_counts"].items():
+        print(category, "→", count, "items")
+
+    print(f"Total categories found: {manifest['categories']}")
+    print("Total items found ", manifest["items"])
+
+
+async def scroll_to(page: Page, y: float) -> dict:
+    """
+    Scroll the window to an absolute Y offset and report the resulting scroll state
+
+    Args:
+        page (Page): Playwright page object
+        y (float): Target scroll offset in pixels
+
+    Returns:
+        dict: Dictionary containing scrollY, scrollHeight, viewportHeight,
+            cardCount, domNodes and jsHeap (None when the browser hides it)
+    """
+    count_round_trip("evaluate")
+    return await page.evaluate(
+        """([y, selector]) => {
+            window.scrollTo(0, y);
+
+            return {
+                scrollY: window.scrollY,
+                scrollHeight: document.documentElement.scrollHeight,
+                viewportHeight:
+                    window.innerHeight || document.documentElement.clientHeight,
+                cardCount: document.querySelectorAll(selector).length,
+                domNodes: document.getElementsByTagName("*").length,
+                // Only Chromium exposes performance.memory
+                jsHeap: performance.memory ? performance.memory.usedJSHeapSize : null,
+            };
+        }""",
+        [y, CARD_SELECTOR],
+    )
+
+
+async def scrape_publix(
+    page: Page,
+    pause: float = 0.0,
+    overlap: float | None = None,
+    idle_steps: int = 2,
+    batched: bool = True,
+    accumulator: DealAccumulator | None = None,
+    start_y: float | None = None,
+    settle_ms: int = READY_STABLE_MS,
+) -> int:
     """
     Scrape all deals from the Publix weekly ad page by scrolling through the content
 
+    The page is stepped by roughly one viewport at a time. Each step overlaps
+    the previous one so cards cut off at the bottom edge are fully visible on
+    the next step. The loop ends once the bottom has been reached and
+    ``idle_steps`` consecutive steps produced no new cards and no content
+    growth (scrollHeight or card count), which also covers lazy-loaded and
+    virtualized lists. Before a step counts as idle, the card count must stay
+    unchanged for ``settle_ms``, so a fetch triggered by reaching the bottom
+    has time to add its cards.
+
     Args:
         page (Page): Playwright page object
         pause (float): Pause duration between scrolls
+        overlap (float | None): Pixels shared between consecutive viewports,
+            defaults to one card height
+        idle_steps (int): Steps without new cards or growth needed to stop
+        batched (bool): Passed through to scrape_viewport
+        accumulator (DealAccumulator | None): Collects and deduplicates the
+            deals, a new one keyed on DEAL_IDENTITY if omitted
+        start_y (float | None): Scroll offset to resume from instead of the
+            first card
+        settle_ms (int): How long the card count must stay unchanged at the
+            bottom before a step counts as idle
 
     Returns:
-        list: List of deal dictionaries
+        int: Deals in the accumulator so far
     """
-    last_scroll_y = -1
-    deals = []
+    import asyncio
 
-    metrics = await get_card_metrics(page)
+    with phase("metrics"):
+        metrics = await get_card_metrics(page)
 
     card_height = metrics["cardHeight"]
     first_card_y = metrics["firstCardY"]
@@ -201,119 +1131,1692 @@ async def scrape_publix(page: Page, pause: float = 0.0) -> list:
     if not card_height:
         raise RuntimeError("Could not determine card height")
 
-    await page.evaluate("(y) => window.scrollTo(0, y)", first_card_y)
+    if overlap is None:
+        overlap = card_height
+
+    state = await scroll_to(page, max(first_card_y, start_y or 0))
     last_scroll_y = -1
+    last_scroll_height = state["scrollHeight"]
+    last_card_count = state["cardCount"]
+    idle = 0
+
+    if accumulator is None:
+        accumulator = DealAccumulator()
+
+    with phase("scroll loop"):
+        while True:
+            started = time.perf_counter()
+            deals = await scrape_viewport(page, batched=batched)
+            new_cards, duplicates = accumulator.extend(deals)
+
+            record_iteration(
+                scrollY=state["scrollY"],
+                seconds=round(time.perf_counter() - started, 4),
+                cards=len(deals),
+                new=new_cards,
+                duplicates=duplicates,
+                domNodes=state["domNodes"],
+                jsHeap=state["jsHeap"],
+            )
+            accumulator.checkpoint(page.url, state["scrollY"])
 
-    clean_deals = []
+            grew = (
+                state["scrollHeight"] > last_scroll_height
+                or state["cardCount"] != last_card_count
+            )
+            at_bottom = (
+                state["scrollY"] + state["viewportHeight"] >= state["scrollHeight"] - 1
+                or state["scrollY"] == last_scroll_y
+            )
 
-    while True:
-        scroll_y = await page.evaluate("() => window.scrollY")
+            if at_bottom and not (new_cards or grew):
+                # Reaching the bottom may have started a lazy-load fetch, so
+                # let the cards settle and measure the page again
+                await wait_for_ready(page, stable_ms=settle_ms)
+                settled = await scroll_to(page, state["scrollY"])
+                grew = (
+                    settled["scrollHeight"] > state["scrollHeight"]
+                    or settled["cardCount"] != state["cardCount"]
+                )
+                state = settled
 
-        # Stop if scrolling no longer advances
-        if scroll_y == last_scroll_y:
-            print("No further scroll possible")
-            break
+            if new_cards or grew or not at_bottom:
+                idle = 0
+            else:
+                idle += 1
+                if idle >= idle_steps:
+                    print("No new cards after reaching the bottom")
+                    break
 
-        deals = await scrape_viewport(page)
-        add_new_deals(clean_deals, deals)
+            last_scroll_y = state["scrollY"]
+            last_scroll_height = state["scrollHeight"]
+            last_card_count = state["cardCount"]
 
-        # Scroll exactly one card down
-        await page.evaluate("(y) => window.scrollTo(0, y)", scroll_y + card_height)
+            # Step one viewport down, keeping `overlap` pixels of the previous one
+            step = max(state["viewportHeight"] - overlap, card_height)
+            state = await scroll_to(page, last_scroll_y + step)
 
-        last_scroll_y = scroll_y
-        await asyncio.sleep(pause)
+            await asyncio.sleep(pause)
 
-    return clean_deals
+    return len(accumulator)
 
 
-async def scrape_viewport(page: Page) -> list:
+def capture_responses(page: Page) -> list:
     """
-    Scrape all visible cards in the current viewport
+    Start collecting the weekly ad JSON responses fetched by the page
 
     Args:
         page (Page): Playwright page object
 
     Returns:
-        list: List of deal dictionaries
+        list: List that fills with matching Response objects as they arrive
     """
-    cards = await page.query_selector_all(CARD_SELECTOR)
-    deals = []
+    captured = []
 
-    for card in cards:
-        # Only cards currently in viewport
-        if not await is_element_visible(card):
-            continue
+    def on_response(response: Response):
+        content_type = response.headers.get("content-type", "")
+        if "json" in content_type and RESPONSE_URL_PATTERN.search(response.url):
+            captured.append(response)
 
-        title = await extract_text(card, TITLE_SELECTOR)
-        if not title:
-            continue
+    page.on("response", on_response)
+    return captured
 
-        category = await get_category_for_card(page, card)
-        savings = await extract_text(card, SAVINGS_SELECTOR)
-        offer = await extract_text(card, OFFER_SELECTOR)
 
-        deal = {
-            "category": category,
-            "title": title,
-            "savings": savings,
-            "offer": offer,
-        }
+async def read_responses(responses: list) -> list:
+    """
+    Read captured responses into JSON-serializable recordings
 
-        deals.append(deal)
+    Args:
+        responses (list): Response objects from capture_responses
 
-    print(f"Found {len(deals)} deals in viewport")
-    return deals
+    Returns:
+        list: List of {url, status, body} dictionaries
+    """
+    from playwright.async_api import Error as PlaywrightError
 
+    recordings = []
 
-async def async_main():
-    try:
-        with open("publix.json", "r") as f:
-            data = json.load(f)
-            timestamp_str = data.get("timestamp")
-            if timestamp_str:
-                timestamp = datetime.fromisoformat(timestamp_str)
-                if datetime.now(timezone.utc) - timestamp < timedelta(days=7):
-                    print("Using cached publix.json file")
-                else:
-                    print("New deals available, refreshing cache")
-                    raise ValueError("Cached data is stale")
+    for response in responses:
+        try:
+            body = await response.json()
+        except (PlaywrightError, json.JSONDecodeError):
+            continue
 
-    except (FileNotFoundError, json.JSONDecodeError, AttributeError, ValueError):
-        print("Scraping Publix weekly ad...")
-        async with async_playwright() as p:
-            browser = await p.firefox.launch(headless=False)
-            page = await browser.new_page(
-                color_scheme="dark", viewport={"width": 1280, "height": 1600}
+        recordings.append(
+            {"url": response.url, "status": response.status, "body": body}
+        )
+
+    return recordings
+
+
+async def replay_responses(page: Page, recordings: list):
+    """
+    Serve recorded responses through page.route and load each of them
+
+    Every request not covered by a recording is aborted, so replaying never
+    touches the network.
+
+    Args:
+        page (Page): Playwright page object
+        recordings (list): List of {url, status, body} dictionaries
+    """
+    by_url = {rec["url"]: rec for rec in recordings}
+
+    async def handle(route):
+        rec = by_url.get(route.request.url)
+        if rec is None:
+            await route.abort()
+            return
+
+        await route.fulfill(
+            status=rec["status"],
+            content_type="application/json",
+            body=json.dumps(rec["body"]),
+        )
+
+    await page.route("**/*", handle)
+
+    for url in by_url:
+        await page.goto(url)
+
+
+def _field_text(obj: dict, keys: tuple) -> str | None:
+    for key in keys:
+        value = obj.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def deals_from_payload(payload, category: str | None = None) -> list:
+    """
+    Map a captured JSON payload into deal dictionaries
+
+    Objects with a title and a savings or offer field are treated as deals.
+    Any other object is searched recursively, passing its category (if it has
+    one) down to the deals nested inside it.
+
+    Args:
+        payload: Decoded JSON response body
+        category (str | None): Category inherited from an enclosing object
+
+    Returns:
+        list: List of deal dictionaries
+    """
+    deals = []
+
+    if isinstance(payload, list):
+        for value in payload:
+            deals.extend(deals_from_payload(value, category))
+        return deals
+
+    if not isinstance(payload, dict):
+        return deals
+
+    category = _field_text(payload, RESPONSE_FIELDS["category"]) or category
+    title = _field_text(payload, RESPONSE_FIELDS["title"])
+    savings = _field_text(payload, RESPONSE_FIELDS["savings"])
+    offer = _field_text(payload, RESPONSE_FIELDS["offer"])
+
+    if title and (savings or offer):
+        deals.append(
+            {
+                "category": category,
+                "title": title,
+                "savings": savings,
+                "offer": offer,
+            }
+        )
+        return deals
+
+    for value in payload.values():
+        if isinstance(value, (dict, list)):
+            deals.extend(deals_from_payload(value, category))
+
+    return deals
+
+
+async def scrape_publix_network(
+    page: Page,
+    url: str = URL,
+    recordings: list | None = None,
+    timeout: float = READY_TIMEOUT,
+    accumulator: DealAccumulator | None = None,
+) -> tuple[int, list]:
+    """
+    Scrape deals from the JSON the weekly ad page fetches instead of the DOM
+
+    Args:
+        page (Page): Playwright page object
+        url (str): Weekly ad URL to load
+        recordings (list | None): Previously recorded responses to replay
+            offline instead of loading the live page
+        timeout (float): Upper bound on waiting for the network to go idle
+        accumulator (DealAccumulator | None): Collects and deduplicates the
+            deals, a new one keyed on DEAL_IDENTITY if omitted
+
+    Returns:
+        tuple: Deals in the accumulator and the recordings they came from
+    """
+    captured = capture_responses(page)
+
+    if recordings is not None:
+        await replay_responses(page, recordings)
+    else:
+        await page.goto(url, wait_until="domcontentloaded")
+        await wait_for_network_idle(page, timeout)
+
+    recordings = await read_responses(captured)
+
+    if accumulator is None:
+        accumulator = DealAccumulator()
+
+    for rec in recordings:
+        accumulator.extend(deals_from_payload(rec["body"]))
+
+    print(f"Found {len(accumulator)} deals in {len(recordings)} responses")
+    return len(accumulator), recordings
+
+
+async def scrape_viewport(page: Page, batched: bool = True) -> list:
+    """
+    Scrape all visible cards in the current viewport
+
+    Args:
+        page (Page): Playwright page object
+        batched (bool): Extract every card in a single page.evaluate round trip
+            instead of querying each card individually
+
+    Returns:
+        list: List of deal dictionaries
+    """
+    if batched:
+        deals = await extract_viewport(page)
+        print(f"Found {len(deals)} deals in viewport")
+        return deals
+
+    count_round_trip("query_selector_all")
+    cards = await page.query_selector_all(CARD_SELECTOR)
+    track_handles(len(cards))
+    deals = []
+
+    try:
+        for card in cards:
+            # Only cards currently in viewport
+            if not await is_element_visible(card):
+                continue
+
+            title = await extract_text(card, TITLE_SELECTOR)
+            if not title:
+                continue
+
+            category = await get_category_for_card(page, card)
+            savings = await extract_text(card, SAVINGS_SELECTOR)
+            offer = await extract_text(card, OFFER_SELECTOR)
+
+            deal = {
+                "category": category,
+                "title": title,
+                "savings": savings,
+                "offer": offer,
+            }
+
+            deals.append(deal)
+    finally:
+        # Handles are scoped to this viewport, release them before scrolling on
+        await release_handles(cards)
+
+    print(f"Found {len(deals)} deals in viewport")
+    return deals
+
+
+def track_transfer(page: Page) -> dict:
+    """
+    Count finished requests and the bytes they transferred
+
+    Args:
+        page (Page): Playwright page object
+
+    Returns:
+        dict: Dictionary containing requests, blocked and bytes, updated live
+    """
+    stats = {"requests": 0, "blocked": 0, "bytes": 0}
+
+    async def on_request_finished(request):
+        sizes = await request.sizes()
+        stats["requests"] += 1
+        stats["bytes"] += sizes["responseHeadersSize"] + sizes["responseBodySize"]
+
+    page.on("requestfinished", on_request_finished)
+    return stats
+
+
+def _host_allowed(url: str) -> bool:
+    host = urlparse(url).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in LEAN_ALLOWED_HOSTS)
+
+
+async def apply_lean_profile(page: Page | BrowserContext, stats: dict):
+    """
+    Abort images, media, fonts and requests to hosts outside LEAN_ALLOWED_HOSTS
+
+    Args:
+        page (Page | BrowserContext): Page or whole context to apply it to
+        stats (dict): Transfer stats from track_transfer, its blocked count is
+            incremented for every aborted request
+    """
+
+    async def handle(route):
+        request = route.request
+        blocked = request.resource_type in LEAN_BLOCKED_RESOURCE_TYPES
+        if blocked or not _host_allowed(request.url):
+            stats["blocked"] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await page.route("**/*", handle)
+
+
+async def launch_browser(
+    p: Playwright, browser_type: str = DEFAULT_BROWSER, headless: bool = False
+) -> Browser:
+    """
+    Launch one of BROWSERS
+
+    Chromium is started with precise memory info, so the JS heap it reports
+    to the trace is not rounded to coarse buckets.
+
+    Args:
+        p (Playwright): Playwright instance
+        browser_type (str): "firefox" or "chromium"
+        headless (bool): Run without a window
+
+    Returns:
+        Browser: The launched browser
+    """
+    if browser_type == "chromium":
+        return await p.chromium.launch(
+            headless=headless, args=["--enable-precise-memory-info"]
+        )
+    return await p.firefox.launch(headless=headless)
+
+
+async def open_page(
+    p: Playwright, lean: bool = False, browser_type: str = DEFAULT_BROWSER
+) -> tuple[Browser, Page, dict]:
+    """
+    Launch the browser and open a page for scraping
+
+    Args:
+        p (Playwright): Playwright instance
+        lean (bool): Run headless and block non-essential requests
+        browser_type (str): Browser to launch, see BROWSERS
+
+    Returns:
+        tuple: Browser, page and its live transfer stats
+    """
+    browser = await launch_browser(p, browser_type, headless=lean)
+    _, page, stats = await new_context_page(browser, lean=lean)
+    return browser, page, stats
+
+
+async def select_store(context: BrowserContext, store: str):
+    """
+    Make every page in the context browse the weekly ad of the given store
+
+    Args:
+        context (BrowserContext): Browser context to configure
+        store (str): Publix store number
+    """
+    await context.add_cookies(
+        [
+            {
+                "name": STORE_COOKIE,
+                "value": store,
+                "domain": STORE_COOKIE_DOMAIN,
+                "path": "/",
+            }
+        ]
+    )
+
+
+async def new_context_page(
+    browser: Browser, lean: bool = False, store: str | None = None
+) -> tuple[BrowserContext, Page, dict]:
+    """
+    Open a page in a new, isolated browser context
+
+    Args:
+        browser (Browser): Browser to create the context in
+        lean (bool): Block non-essential requests in the context
+        store (str | None): Store number to select, the site default if None
+
+    Returns:
+        tuple: Context, page and the page's live transfer stats
+    """
+    context = await browser.new_context(color_scheme="dark", viewport=VIEWPORT)
+    if store is not None:
+        await select_store(context, store)
+    page = await context.new_page()
+
+    stats = track_transfer(page)
+    if lean:
+        await apply_lean_profile(context, stats)
+
+    return context, page, stats
+
+
+async def load_weekly_ad(
+    page: Page, url: str = URL, ready_timeout: float = READY_TIMEOUT
+) -> dict:
+    """
+    Navigate to the weekly ad and wait for the cards to be ready
+
+    Args:
+        page (Page): Playwright page object
+        url (str): Weekly ad URL to load
+        ready_timeout (float): Upper bound on the readiness wait in seconds
+
+    Returns:
+        dict: Readiness result from wait_for_ready plus loadTime, the seconds
+            from navigation start until the page was ready
+    """
+    start = time.perf_counter()
+    with phase("goto"):
+        count_round_trip("goto")
+        await page.goto(url, wait_until="domcontentloaded")
+
+    with phase("readiness"):
+        # Wait for the content wrapper to be present
+        count_round_trip("wait_for_selector")
+        await page.wait_for_selector(".weekly-ad-xp-content-wrapper", timeout=15000)
+        ready = await wait_for_ready(page, timeout=ready_timeout)
+    ready["loadTime"] = time.perf_counter() - start
+
+    if ready["timedOut"]:
+        print(f"Page not stable after {ready['waited']:.2f}s, continuing anyway")
+    else:
+        print(
+            f"Page loaded in {ready['loadTime']:.2f}s "
+            f"({ready['cardCount']} cards, {ready['waited']:.2f}s readiness wait)"
+        )
+
+    return ready
+
+
+def section_url(section: str) -> str:
+    """
+    Resolve a weekly ad section name (e.g. "bogo") or full URL to a URL
+
+    Args:
+        section (str): Section name under WEEKLY_AD_URL, or an absolute URL
+
+    Returns:
+        str: URL to scrape
+    """
+    if "://" in section:
+        return section
+    return WEEKLY_AD_URL + section.strip("/")
+
+
+async def scrape_section(
+    browser: Browser,
+    url: str,
+    accumulator: DealAccumulator,
+    lean: bool = False,
+    ready_timeout: float = READY_TIMEOUT,
+    store: str | None = None,
+) -> dict:
+    """
+    Scrape one weekly ad section in its own browser context
+
+    The section runs under its own trace, which is merged into the caller's
+    trace (if any) afterwards with the URL as label.
+
+    Args:
+        browser (Browser): Shared browser to create the context in
+        url (str): Section URL
+        accumulator (DealAccumulator): Accumulator shared by all sections
+        lean (bool): Block non-essential requests in the context
+        ready_timeout (float): Upper bound on the readiness wait in seconds
+        store (str | None): Store number to select, the site default if None
+
+    Returns:
+        dict: Per-section report with timing, deal and transfer counts, plus
+            error when the section failed
+    """
+    from playwright.async_api import Error as PlaywrightError
+
+    parent = _current_trace.get()
+    error = None
+
+    with tracing() as trace:
+        context, page, transfer = await new_context_page(
+            browser, lean=lean, store=store
+        )
+        try:
+            await load_weekly_ad(page, url, ready_timeout)
+
+            start_y = accumulator.resume_position(page.url)
+            if start_y is not None:
+                print(f"Resuming {url} from scroll position {start_y}")
+
+            await scrape_publix(page, accumulator=accumulator, start_y=start_y)
+        except (PlaywrightError, RuntimeError) as e:
+            error = str(e)
+            print(f"Section {url} failed: {error}")
+        finally:
+            await context.close()
+
+    if parent is not None:
+        parent.merge(trace, url)
+
+    data = trace.to_dict()
+    return {
+        "url": url,
+        "seconds": data["totals"]["seconds"],
+        "iterations": data["totals"]["iterations"],
+        "new": data["totals"]["new"],
+        "round_trips": data["round_trips"],
+        **transfer,
+        "error": error,
+    }
+
+
+async def scrape_sections(
+    browser: Browser,
+    urls: list[str],
+    accumulator: DealAccumulator,
+    concurrency: int = 2,
+    lean: bool = False,
+    ready_timeout: float = READY_TIMEOUT,
+) -> list:
+    """
+    Scrape several weekly ad sections concurrently from one browser process
+
+    At most ``concurrency`` browser contexts are open at a time. Every section
+    feeds the same accumulator, so deals shared between sections are kept once.
+
+    Args:
+        browser (Browser): Shared browser
+        urls (list[str]): Section URLs
+        accumulator (DealAccumulator): Accumulator shared by all sections
+        concurrency (int): Maximum number of sections scraped at once
+        lean (bool): Block non-essential requests in every context
+        ready_timeout (float): Upper bound on each readiness wait in seconds
+
+    Returns:
+        list: Per-section reports, in the order of ``urls``
+    """
+    import asyncio
+
+    pool = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(url: str) -> dict:
+        async with pool:
+            return await scrape_section(
+                browser, url, accumulator, lean=lean, ready_timeout=ready_timeout
+            )
+
+    reports = await asyncio.gather(*(run(url) for url in urls))
+
+    if len(reports) > 1:
+        print(f"{'section':<50} {'seconds':>8} {'iters':>6} {'new':>6}")
+        for r in reports:
+            status = "failed" if r["error"] else f"{r['new']:>6}"
+            print(
+                f"{r['url'][-50:]:<50} {r['seconds']:>8.2f} "
+                f"{r['iterations']:>6} {status:>6}"
+            )
+
+    return reports
+
+
+async def scrape_store_shard_async(
+    stores: list[str],
+    urls: list[str],
+    contexts: int = 2,
+    lean: bool = False,
+    ready_timeout: float = READY_TIMEOUT,
+    out_dir: str = STORE_DIR,
+    identity: tuple = DEAL_IDENTITY,
+    interval: float = 0.0,
+    browser_type: str = DEFAULT_BROWSER,
+) -> list:
+    """
+    Scrape a list of stores from one browser, writing one output per store
+
+    Args:
+        stores (list[str]): Store numbers
+        urls (list[str]): Section URLs scraped for every store
+        contexts (int): Browser contexts open at once
+        lean (bool): Run headless and block non-essential requests
+        ready_timeout (float): Upper bound on each readiness wait in seconds
+        out_dir (str): Directory for the per-store publix.<store>.json files
+        identity (tuple): Deal fields that together identify a deal
+        interval (float): Minimum seconds between consecutive store starts
+        browser_type (str): Browser to launch, see BROWSERS
+
+    Returns:
+        list: One report dictionary per store
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    import asyncio
+
+    from playwright.async_api import async_playwright
+
+    pool = asyncio.Semaphore(max(1, contexts))
+
+    async with async_playwright() as p:
+        browser = await launch_browser(p, browser_type, headless=lean)
+
+        async def run_section(url: str, store: str, accumulator: DealAccumulator):
+            async with pool:
+                return await scrape_section(
+                    browser,
+                    url,
+                    accumulator,
+                    lean=lean,
+                    ready_timeout=ready_timeout,
+                    store=store,
+                )
+
+        async def run_store(index: int, store: str) -> dict:
+            # Pace store starts to honour the requested stores per minute
+            await asyncio.sleep(index * interval)
+
+            start = time.perf_counter()
+            accumulator = DealAccumulator(identity)
+            sections = await asyncio.gather(
+                *(run_section(url, store, accumulator) for url in urls)
             )
+            errors = [r["error"] for r in sections if r["error"]]
+
+            path = out / f"publix.{store}.json"
+            if len(accumulator) or not errors:
+                with open(path, "w") as f:
+                    json.dump(group_deals_by_category(accumulator), f, indent=2)
 
-            await page.goto(URL, wait_until="domcontentloaded")
+            return {
+                "store": store,
+                "output": str(path) if path.exists() else None,
+                "deals": len(accumulator),
+                "seconds": round(time.perf_counter() - start, 4),
+                "errors": errors,
+            }
+
+        reports = await asyncio.gather(
+            *(run_store(i, store) for i, store in enumerate(stores))
+        )
+        await browser.close()
+
+    return reports
+
+
+def scrape_store_shard(stores: list[str], urls: list[str], **options) -> list:
+    """
+    Process pool entry point for scrape_store_shard_async
+
+    Args:
+        stores (list[str]): Store numbers
+        urls (list[str]): Section URLs scraped for every store
+        **options: Keyword arguments for scrape_store_shard_async
+
+    Returns:
+        list: One report dictionary per store
+    """
+    import asyncio
 
-            # Wait for the content wrapper to be present
-            await page.wait_for_selector(".weekly-ad-xp-content-wrapper", timeout=15000)
-            await asyncio.sleep(30)
-            print("Page loaded")
+    return asyncio.run(scrape_store_shard_async(stores, urls, **options))
+
+
+def build_store_index(reports: list, identity: tuple = DEAL_IDENTITY) -> dict:
+    """
+    Merge per-store outputs into one index of which stores carry which deal
+
+    Args:
+        reports (list): Store reports from scrape_store_shard_async
+        identity (tuple): Deal fields that together identify a deal
+
+    Returns:
+        dict: Timestamp, the store reports and every deal with its stores
+    """
+    deals = OrderedDict()
+
+    for report in reports:
+        if not report["output"]:
+            continue
+
+        with open(report["output"], "r") as f:
+            data = json.load(f)
+
+        for cat in data["deals"]:
+            for item in cat["items"]:
+                deal = {"category": cat["category"], **item}
+                key = tuple(deal.get(f) for f in identity)
+                deals.setdefault(key, {**deal, "stores": []})["stores"].append(
+                    report["store"]
+                )
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "stores": reports,
+        "deals": list(deals.values()),
+    }
+
+
+def scrape_stores(
+    stores: list[str],
+    urls: list[str],
+    workers: int = 2,
+    contexts_per_worker: int = 2,
+    stores_per_minute: float | None = None,
+    lean: bool = False,
+    ready_timeout: float = READY_TIMEOUT,
+    out_dir: str = STORE_DIR,
+    identity: tuple = DEAL_IDENTITY,
+    browser_type: str = DEFAULT_BROWSER,
+) -> dict:
+    """
+    Scrape many stores, sharded across worker processes
+
+    Stores are dealt round-robin to ``workers`` processes, each running one
+    browser with up to ``contexts_per_worker`` contexts. Throughput is tuned
+    with those two numbers and optionally capped with ``stores_per_minute``.
+
+    Args:
+        stores (list[str]): Store numbers
+        urls (list[str]): Section URLs scraped for every store
+        workers (int): Worker processes
+        contexts_per_worker (int): Browser contexts open at once per worker
+        stores_per_minute (float | None): Upper bound on store starts per
+            minute across all workers, unlimited if None
+        lean (bool): Run headless and block non-essential requests
+        ready_timeout (float): Upper bound on each readiness wait in seconds
+        out_dir (str): Directory for the per-store files and index.json
+        identity (tuple): Deal fields that together identify a deal
+        browser_type (str): Browser every worker launches, see BROWSERS
+
+    Returns:
+        dict: The merged store index, also written to <out_dir>/index.json
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = max(1, min(workers, len(stores)))
+    shards = [stores[i::workers] for i in range(workers)]
+    interval = 60 * workers / stores_per_minute if stores_per_minute else 0.0
+    options = {
+        "contexts": contexts_per_worker,
+        "lean": lean,
+        "ready_timeout": ready_timeout,
+        "out_dir": out_dir,
+        "identity": identity,
+        "interval": interval,
+        "browser_type": browser_type,
+    }
+
+    start = time.perf_counter()
+    reports = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (shard, pool.submit(scrape_store_shard, shard, urls, **options))
+            for shard in shards
+        ]
+        for shard, future in futures:
+            try:
+                reports.extend(future.result())
+            except Exception as e:
+                # A crashed worker only loses its own shard
+                reports.extend(
+                    {"store": store, "output": None, "deals": 0, "errors": [str(e)]}
+                    for store in shard
+                )
+
+    elapsed = time.perf_counter() - start
+    reports.sort(key=lambda r: stores.index(r["store"]))
+
+    index = build_store_index(reports, identity)
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(out_dir) / "index.json", "w") as f:
+        json.dump(index, f, indent=2)
+
+    failed = sum(1 for r in reports if not r["output"])
+    print(
+        f"Scraped {len(stores)} stores ({failed} failed) in {elapsed:.1f}s, "
+        f"{len(stores) / elapsed * 60:.1f} stores/min, "
+        f"{len(index['deals'])} distinct deals"
+    )
+    return index
+
+
+async def compare_profiles(
+    url: str = URL,
+    ready_timeout: float = READY_TIMEOUT,
+    browser_type: str = DEFAULT_BROWSER,
+) -> list:
+    """
+    Load the weekly ad with the full and the lean profile and compare them
+
+    Args:
+        url (str): Weekly ad URL to load
+        ready_timeout (float): Upper bound on the readiness wait in seconds
+        browser_type (str): Browser to launch, see BROWSERS
+
+    Returns:
+        list: One report dictionary per profile
+    """
+    from playwright.async_api import async_playwright
+
+    reports = []
+
+    async with async_playwright() as p:
+        for lean in (False, True):
+            browser, page, transfer = await open_page(
+                p, lean=lean, browser_type=browser_type
+            )
+            ready = await load_weekly_ad(page, url, ready_timeout)
+            await browser.close()
+
+            reports.append(
+                {
+                    "profile": "lean" if lean else "full",
+                    **transfer,
+                    "loadTime": ready["loadTime"],
+                    "cardCount": ready["cardCount"],
+                }
+            )
+
+    print(
+        f"{'profile':<8} {'requests':>8} {'blocked':>8} "
+        f"{'MB':>8} {'load s':>8} {'cards':>6}"
+    )
+    for r in reports:
+        print(
+            f"{r['profile']:<8} {r['requests']:>8} {r['blocked']:>8} "
+            f"{r['bytes'] / 1e6:>8.2f} {r['loadTime']:>8.2f} {r['cardCount']:>6}"
+        )
+
+    return reports
+
+
+async def async_main(
+    ready_timeout: float = READY_TIMEOUT,
+    engine: str = "dom",
+    record: str | None = None,
+    replay: str | None = None,
+    lean: bool = False,
+    identity: tuple = DEAL_IDENTITY,
+    resume: bool = False,
+    sections: list[str] | None = None,
+    concurrency: int = 2,
+    force: bool = False,
+    browser_type: str = DEFAULT_BROWSER,
+) -> int:
+    urls = [section_url(s) for s in sections] if sections else [URL]
+
+    # Replaying and resuming always scrape, so they skip the cache check
+    manifest = None if replay or resume or force else read_manifest()
+
+    if is_fresh(manifest):
+        print(f"Using cached {OUTPUT_PATH} file")
+    else:
+        if manifest is not None:
+            print("New deals available, refreshing cache")
+
+        from playwright.async_api import async_playwright
+
+        print("Scraping Publix weekly ad...")
+        try:
+            accumulator = DealJournal(identity=identity, resume=resume, urls=urls)
+        except ValueError as e:
+            print(f"Cannot resume: {e}; run without --resume to start over")
+            return 2
+        failed = []
+
+        async with async_playwright() as p:
+            if engine == "network":
+                with phase("launch"):
+                    browser, page, transfer = await open_page(
+                        p, lean=lean, browser_type=browser_type
+                    )
+
+                with phase("network capture"):
+                    if replay:
+                        with open(replay, "r") as f:
+                            recordings = json.load(f)
+
+                        _, recordings = await scrape_publix_network(
+                            page,
+                            recordings=recordings,
+                            timeout=ready_timeout,
+                            accumulator=accumulator,
+                        )
+                    else:
+                        recordings = []
+                        for url in urls:
+                            _, captured = await scrape_publix_network(
+                                page,
+                                url=url,
+                                timeout=ready_timeout,
+                                accumulator=accumulator,
+                            )
+                            recordings.extend(captured)
+
+                if record:
+                    with open(record, "w") as f:
+                        json.dump(recordings, f, indent=2)
+            else:
+                with phase("launch"):
+                    browser = await launch_browser(p, browser_type, headless=lean)
+
+                reports = await scrape_sections(
+                    browser,
+                    urls,
+                    accumulator,
+                    concurrency=concurrency,
+                    lean=lean,
+                    ready_timeout=ready_timeout,
+                )
+                transfer = {
+                    key: sum(r[key] for r in reports)
+                    for key in ("requests", "blocked", "bytes")
+                }
+                failed = [r["url"] for r in reports if r["error"]]
 
-            flat_deals = await scrape_publix(page)
             await browser.close()
 
-        data = group_deals_by_category(flat_deals)
-        print(f"Total deals found: {len(flat_deals)}")
+        print(
+            f"Transferred {transfer['bytes'] / 1e6:.2f} MB in "
+            f"{transfer['requests']} requests ({transfer['blocked']} blocked)"
+        )
+
+        # A partial scrape must not replace the cached ad or become the latest
+        # snapshot; the journal and checkpoint stay behind for --resume
+        if failed:
+            accumulator.close()
+            print(
+                f"{len(failed)} of {len(urls)} sections failed, {OUTPUT_PATH} "
+                f"was not updated; run again with --resume to continue"
+            )
+            return 1
+
+        accumulator.close(completed=True)
+
+        # Streamed from the journal, the only time the deals are read back
+        with phase("grouping"):
+            data = group_deals_by_category(iter(accumulator))
+        print(f"Total deals found: {len(accumulator)}")
+
+        with phase("write"):
+            manifest = write_output(data)
+            snapshot = SnapshotStore().add(data)
+        print(f"Stored snapshot {snapshot['id'][:12]} for ad week {snapshot['week']}")
+
+    print_summary(manifest)
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Scrape the Publix weekly ad into publix.json",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    scrape = commands.add_parser(
+        "scrape",
+        help="Scrape the weekly ad unless the cached output is still fresh "
+        "(default command)",
+    )
+    scrape.add_argument(
+        "--engine",
+        choices=["dom", "network"],
+        default="dom",
+        help="Read deals from the rendered cards (dom) or from the page's JSON "
+        "responses (network)",
+    )
+    scrape.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=READY_TIMEOUT,
+        help=f"Upper bound in seconds on the page wait (default: {READY_TIMEOUT})",
+    )
+    scrape.add_argument(
+        "--record",
+        default=None,
+        help="Save the captured JSON responses to this path (network engine)",
+    )
+    scrape.add_argument(
+        "--replay",
+        default=None,
+        help="Replay responses recorded with --record instead of loading the "
+        "live page (implies --engine network)",
+    )
+
+    scrape.add_argument(
+        "--browser",
+        choices=BROWSERS,
+        default=DEFAULT_BROWSER,
+        help=f"Browser to drive (default: {DEFAULT_BROWSER}); the trace's JS "
+        "heap gauge needs chromium",
+    )
+    scrape.add_argument(
+        "--lean",
+        action="store_true",
+        help="Run headless and block images, media, fonts and third-party requests",
+    )
+    scrape.add_argument(
+        "--compare-profiles",
+        action="store_true",
+        help="Load the page with and without --lean, report bytes and load time, "
+        "and exit without scraping",
+    )
+
+    scrape.add_argument(
+        "--dedupe-on",
+        default=",".join(DEAL_IDENTITY),
+        help="Comma-separated deal fields that identify a duplicate "
+        f"(default: {','.join(DEAL_IDENTITY)})",
+    )
+    scrape.add_argument(
+        "--section",
+        dest="sections",
+        action="append",
+        default=None,
+        help="Weekly ad section name (e.g. bogo) or URL to scrape, repeat for "
+        "several sections (default: bogo)",
+    )
+    scrape.add_argument(
+        "--concurrency",
+        type=int,
+        default=2,
+        help="Sections scraped at once, each in its own browser context "
+        "(default: 2)",
+    )
+    scrape.add_argument(
+        "--store",
+        dest="stores",
+        action="append",
+        default=None,
+        help="Store number to scrape, repeat for several stores. Store mode "
+        f"writes one file per store plus a merged index to {STORE_DIR}/",
+    )
+    scrape.add_argument(
+        "--stores-file",
+        default=None,
+        help="File with one store number per line (store mode)",
+    )
+    scrape.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Worker processes in store mode (default: 2)",
+    )
+    scrape.add_argument(
+        "--contexts-per-worker",
+        type=int,
+        default=2,
+        help="Browser contexts open at once per worker in store mode (default: 2)",
+    )
+    scrape.add_argument(
+        "--stores-per-minute",
+        type=float,
+        default=None,
+        help="Cap on store starts per minute across all workers (store mode)",
+    )
+    scrape.add_argument(
+        "--store-dir",
+        default=STORE_DIR,
+        help=f"Output directory for store mode (default: {STORE_DIR})",
+    )
+    scrape.add_argument(
+        "--force",
+        action="store_true",
+        help=f"Scrape even if {OUTPUT_PATH} is less than "
+        f"{CACHE_MAX_AGE.days} days old",
+    )
+    scrape.add_argument(
+        "--resume",
+        action="store_true",
+        help=f"Continue an interrupted scrape from {JOURNAL_PATH} and "
+        f"{CHECKPOINT_PATH} instead of starting over",
+    )
+    scrape.add_argument(
+        "--trace",
+        default=None,
+        help="Write phase timings, round-trip counts and per-iteration stats "
+        "to this JSON file",
+    )
+    scrape.add_argument(
+        "--summary",
+        action="store_true",
+        help="Print a phase timing and round-trip summary table at the end",
+    )
+
+    status_parser = commands.add_parser(
+        "status",
+        help="Report cache freshness from the manifest (exit 0 fresh, 1 stale, "
+        "2 missing)",
+    )
+    status_parser.add_argument(
+        "--json", action="store_true", help="Print the status as JSON"
+    )
+
+    commands.add_parser(
+        "summary", help="Print per-category item counts of the cached output"
+    )
+
+    snapshots_parser = commands.add_parser(
+        "snapshots", help=f"List the weekly snapshots stored in {SNAPSHOT_DIR}/"
+    )
+    snapshots_parser.add_argument(
+        "--add",
+        default=None,
+        help=f"Store this grouped output file (e.g. an older {OUTPUT_PATH}) as "
+        "a snapshot first",
+    )
+
+    diff_parser = commands.add_parser(
+        "diff", help="Report added, removed and changed deals between two snapshots"
+    )
+    diff_parser.add_argument(
+        "old",
+        nargs="?",
+        default="previous",
+        help="Snapshot id prefix, ad week (YYYY-MM-DD), latest or previous "
+        "(default: previous)",
+    )
+    diff_parser.add_argument(
+        "new",
+        nargs="?",
+        default="latest",
+        help="Snapshot to compare against (default: latest)",
+    )
+    diff_parser.add_argument(
+        "--json", action="store_true", help="Print the delta as JSON"
+    )
+    diff_parser.add_argument(
+        "--out", default=None, help="Also write the delta JSON to this path"
+    )
+
+    history_parser = commands.add_parser(
+        "history",
+        help="Ingest weekly outputs into a SQLite deal history and query it",
+    )
+    history_parser.add_argument(
+        "--db",
+        default=None,
+        help="History database path (default: history.sqlite3)",
+    )
+    queries = history_parser.add_subparsers(dest="query", required=True)
+
+    ingest_parser = queries.add_parser(
+        "ingest", help="Load weekly outputs, ideally sanitized, into the history"
+    )
+    ingest_parser.add_argument(
+        "paths", nargs="+", help="Grouped JSON files, e.g. *.sanitized.json"
+    )
+
+    prices_parser = queries.add_parser("prices", help="Price history of an item")
+    prices_parser.add_argument("title", help="Item title or part of it")
+
+    bogo_parser = queries.add_parser(
+        "bogo", help="How often an item goes buy one get one"
+    )
+    bogo_parser.add_argument("title", help="Item title or part of it")
+
+    best_parser = queries.add_parser(
+        "best", help="Best unit price per category in an ad week"
+    )
+    best_parser.add_argument(
+        "--week",
+        default=None,
+        help="Ad week as YYYY-MM-DD (default: the latest ingested)",
+    )
+
+    for query in (prices_parser, bogo_parser, best_parser):
+        query.add_argument("--json", action="store_true", help="Print JSON rows")
+
+    analytics_parser = commands.add_parser(
+        "analytics",
+        help="Rank and compare sanitized deals by effective price (needs numpy)",
+    )
+    reports = analytics_parser.add_subparsers(dest="report", required=True)
+
+    top_parser = reports.add_parser("top", help="Best deals of every category")
+    top_parser.add_argument(
+        "-k", type=int, default=5, help="Deals per category (default: 5)"
+    )
+    top_parser.add_argument(
+        "--by",
+        choices=["discount", "price"],
+        default="discount",
+        help="Rank by percentage discount or by effective unit price, per unit "
+        "(default: discount)",
+    )
+
+    compare_parser = reports.add_parser(
+        "compare", help="Price spread of each item across weeks or stores"
+    )
+    compare_parser.add_argument(
+        "--label",
+        choices=["file", "week", "store"],
+        default="week",
+        help="What a file's prices are compared as (default: week)",
+    )
+    compare_parser.add_argument(
+        "--min-sources",
+        type=int,
+        default=2,
+        help="Only items found in at least this many files (default: 2)",
+    )
+    compare_parser.add_argument(
+        "--limit", type=int, default=20, help="Items to list (default: 20)"
+    )
+
+    for report in (top_parser, compare_parser):
+        report.add_argument(
+            "paths",
+            nargs="+",
+            help="Columnar exports (*.sanitized.json.cols) or sanitized JSON files",
+        )
+        report.add_argument("--json", action="store_true", help="Print JSON rows")
+
+    match_parser = commands.add_parser(
+        "match",
+        help="Match ingredients to this week's deals with a local search index",
+    )
+    match_parser.add_argument(
+        "ingredients",
+        nargs="*",
+        help="Ingredients to look up (default: the ingredient list of --plan)",
+    )
+    match_parser.add_argument(
+        "--plan",
+        default=PLAN_PATH,
+        help=f"Meal plan whose in_deals to recompute (default: {PLAN_PATH})",
+    )
+    match_parser.add_argument(
+        "--deals",
+        default=OUTPUT_PATH,
+        help=f"Grouped deals to search (default: {OUTPUT_PATH})",
+    )
+    match_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Minimum score (0-1) for an ingredient to count as on sale "
+        "(default: 0.5)",
+    )
+    match_parser.add_argument(
+        "--limit", type=int, default=3, help="Matches per ingredient (default: 3)"
+    )
+    match_parser.add_argument(
+        "--write",
+        action="store_true",
+        help="Save the recomputed in_deals back to the meal plan",
+    )
+    match_parser.add_argument("--json", action="store_true", help="Print JSON rows")
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    # Bare flags keep working as before, e.g. `autoply --lean` scrapes
+    if not argv or argv[0] not in (*commands.choices, "-h", "--help"):
+        argv = ["scrape", *argv]
+
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        return status(args)
+    if args.command == "summary":
+        return summary(args)
+    if args.command == "snapshots":
+        return list_snapshots(args)
+    if args.command == "diff":
+        return diff(args)
+    if args.command == "history":
+        return history(args)
+    if args.command == "analytics":
+        return analytics(args)
+    if args.command == "match":
+        return match(args)
+
+    # Only the scrape paths need asyncio, which is slow to import
+    import asyncio
+
+    if args.compare_profiles:
+        asyncio.run(
+            compare_profiles(
+                ready_timeout=args.ready_timeout, browser_type=args.browser
+            )
+        )
+        return 0
+
+    identity = tuple(f.strip() for f in args.dedupe_on.split(","))
+
+    stores = list(args.stores or [])
+    if args.stores_file:
+        with open(args.stores_file, "r") as f:
+            stores.extend(line.strip() for line in f if line.strip())
+
+    if stores:
+        sections = args.sections or [URL]
+        scrape_stores(
+            stores,
+            [section_url(s) for s in sections],
+            workers=args.workers,
+            contexts_per_worker=args.contexts_per_worker,
+            stores_per_minute=args.stores_per_minute,
+            lean=args.lean,
+            ready_timeout=args.ready_timeout,
+            out_dir=args.store_dir,
+            identity=identity,
+            browser_type=args.browser,
+        )
+        return 0
+
+    # asyncio.run copies the current context, so the trace set here is the one
+    # every phase and round trip inside the scrape records into
+    with tracing() as trace:
+        code = asyncio.run(
+            async_main(
+                ready_timeout=args.ready_timeout,
+                engine="network" if args.replay else args.engine,
+                record=args.record,
+                replay=args.replay,
+                lean=args.lean,
+                identity=identity,
+                resume=args.resume,
+                sections=args.sections,
+                concurrency=args.concurrency,
+                force=args.force,
+                browser_type=args.browser,
+            )
+        )
+
+    if args.trace:
+        with open(args.trace, "w") as f:
+            json.dump(trace.to_dict(), f, indent=2)
+
+    if args.summary:
+        print(trace.summary())
+
+    return code
+
+
+def status(args: argparse.Namespace) -> int:
+    """
+    Report whether the cached output is fresh, from the manifest alone
+
+    Args:
+        args (argparse.Namespace): Parsed status arguments
+
+    Returns:
+        int: 0 if fresh, 1 if stale, 2 if there is no usable output
+    """
+    manifest = read_manifest()
+
+    if manifest is None:
+        state, code = "missing", 2
+    elif is_fresh(manifest):
+        state, code = "fresh", 0
+    else:
+        state, code = "stale", 1
+
+    if args.json:
+        age = manifest_age(manifest) if manifest else None
+        report = {
+            "status": state,
+            "path": OUTPUT_PATH,
+            "age_s": round(age.total_seconds(), 1) if age is not None else None,
+            **(
+                {k: v for k, v in manifest.items() if k != "category_counts"}
+                if manifest
+                else {}
+            ),
+        }
+        print(json.dumps(report, indent=2))
+    elif manifest is None:
+        print(f"{OUTPUT_PATH}: missing")
+    else:
+        print(
+            f"{OUTPUT_PATH}: {state}, scraped {manifest['timestamp']}, "
+            f"{manifest['categories']} categories, {manifest['items']} items"
+        )
+
+    return code
+
+
+def summary(args: argparse.Namespace) -> int:
+    """
+    Print the per-category counts of the cached output without scraping
+
+    Args:
+        args (argparse.Namespace): Parsed summary arguments
+
+    Returns:
+        int: 0 on success, 2 if there is no usable output
+    """
+    manifest = read_manifest()
+
+    if manifest is None:
+        print(f"{OUTPUT_PATH}: missing, run the scrape command first")
+        return 2
+
+    print_summary(manifest)
+    return 0
+
+
+def list_snapshots(args: argparse.Namespace) -> int:
+    """
+    Print the stored snapshots, oldest first
+
+    Args:
+        args (argparse.Namespace): Parsed snapshots arguments
+
+    Returns:
+        int: 0 on success
+    """
+    store = SnapshotStore()
+
+    if args.add:
+        with open(args.add, "r") as f:
+            entry = store.add(json.load(f))
+        print(f"Stored snapshot {entry['id'][:12]} for ad week {entry['week']}")
+
+    print(f"{'id':<12} {'week':<10} {'items':>6} {'categories':>10}  timestamp")
+    for e in store.entries():
+        print(
+            f"{e['id'][:12]} {e['week']:<10} {e['items']:>6} "
+            f"{e['categories']:>10}  {e['timestamp']}"
+        )
+
+    return 0
 
-        with open("publix.json", "w") as f:
-            json.dump(data, f, indent=2)
 
-    num_items = 0
-    for cat in data["deals"]:
-        print(cat["category"], "→", len(cat["items"]), "items")
-        num_items += len(cat["items"])
+def diff(args: argparse.Namespace) -> int:
+    """
+    Print the delta between two stored snapshots
+
+    Args:
+        args (argparse.Namespace): Parsed diff arguments
+
+    Returns:
+        int: 0 on success, 2 if a snapshot reference does not resolve
+    """
+    store = SnapshotStore()
+
+    try:
+        delta = diff_snapshots(store.load(args.old), store.load(args.new))
+    except KeyError as e:
+        print(e.args[0])
+        return 2
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(delta, f, indent=2, ensure_ascii=False)
+
+    if args.json:
+        print(json.dumps(delta, indent=2, ensure_ascii=False))
+    else:
+        print_delta(delta)
+
+    return 0
+
+
+def history(args: argparse.Namespace) -> int:
+    """
+    Ingest into or query the SQLite deal history
+
+    Args:
+        args (argparse.Namespace): Parsed history arguments
+
+    Returns:
+        int: 0 on success
+    """
+    # sqlite3 is only needed here, so it stays off the cache-hit path
+    from autoply import history as store
+
+    conn = store.connect(args.db or store.HISTORY_PATH)
+
+    try:
+        if args.query == "ingest":
+            start = time.perf_counter()
+            reports = store.ingest_files(conn, args.paths)
+            for r in reports:
+                if r["upgraded"]:
+                    state = "parsed columns filled in"
+                else:
+                    state = "ingested" if r["new"] else "already ingested"
+                print(f"{r['path']}: {state}, {r['offers']} offers")
+            print(
+                f"Ingested {sum(r['new'] for r in reports)} of {len(reports)} "
+                f"files in {time.perf_counter() - start:.2f}s"
+            )
+            return 0
+
+        if args.query == "prices":
+            rows = store.price_history(conn, args.title)
+            columns = ("week", "title", "category", "offer_raw", "unit_price", "unit")
+        elif args.query == "bogo":
+            rows = store.bogo_frequency(conn, args.title)
+            columns = (
+                "title",
+                "weeks_listed",
+                "weeks_bogo",
+                "weeks_total",
+                "bogo_share",
+                "last_bogo",
+            )
+        else:
+            rows = store.best_unit_prices(conn, args.week)
+            columns = ("week", "category", "unit", "title", "unit_price", "offer_raw")
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    else:
+        store.print_rows(rows, columns)
+
+    return 0
+
+
+def analytics(args: argparse.Namespace) -> int:
+    """
+    Rank or compare sanitized deals with vectorized analytics
+
+    Args:
+        args (argparse.Namespace): Parsed analytics arguments
+
+    Returns:
+        int: 0 on success, 2 if numpy is not installed
+    """
+    # numpy is optional and only needed here
+    try:
+        from autoply import analytics as stats
+    except ImportError as e:
+        print(
+            f"analytics needs numpy ({e}); install the analytics extra: "
+            'poetry install -E analytics, or pip install ".[analytics]"'
+        )
+        return 2
+
+    from autoply.history import print_rows
+
+    if args.report == "top":
+        deals = stats.load_deals(args.paths)
+        rows = stats.top_deals(deals, k=args.k, by=args.by)
+        columns = (
+            "category",
+            "title",
+            "offer_kind",
+            "effective_price",
+            "unit",
+            "regular_price",
+            "discount_pct",
+        )
+        if len(args.paths) > 1:
+            columns = ("source", *columns)
+    else:
+        deals = stats.load_deals(args.paths, by=args.label)
+        rows = stats.compare_sources(
+            deals, min_sources=args.min_sources, limit=args.limit
+        )
+        columns = (
+            "title",
+            "unit",
+            "sources",
+            "best_source",
+            "best_price",
+            "worst_source",
+            "worst_price",
+            "spread_pct",
+        )
+
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    else:
+        print_rows(rows, columns)
+
+    return 0
+
+
+def match(args: argparse.Namespace) -> int:
+    """
+    Match ingredients to deals, or recompute a meal plan's in_deals
+
+    The search index of the deals is built on first use and kept in the
+    snapshot store, so later runs against the same weekly ad load it.
+
+    Args:
+        args (argparse.Namespace): Parsed match arguments
+
+    Returns:
+        int: 0 on success, 2 if the deals or the plan cannot be read
+    """
+    from autoply import search
+    from autoply.history import print_rows
+
+    threshold = search.MATCH_THRESHOLD if args.threshold is None else args.threshold
+
+    try:
+        with open(args.deals, "r", encoding="utf-8") as f:
+            index = search.DealIndex.for_payload(json.load(f))
+    except FileNotFoundError:
+        print(f"{args.deals}: missing, run the scrape command first")
+        return 2
+
+    if args.ingredients:
+        rows = [
+            {"ingredient": text, **deal}
+            for text, deals in index.match_all(args.ingredients, args.limit).items()
+            for deal in deals
+        ]
+        columns = ("ingredient", "score", "title", "category", "offer")
+    else:
+        try:
+            with open(args.plan, "r", encoding="utf-8") as f:
+                plan = json.load(f)
+        except FileNotFoundError:
+            print(f"{args.plan}: missing")
+            return 2
+
+        ingredients = plan.get("ingredient_list", [])
+        if not ingredients:
+            print(f"{args.plan}: no ingredients")
+            return 0
+
+        updated = search.recompute_in_deals(plan, index, threshold)
+        rows = []
+        for old, new in zip(ingredients, updated["ingredient_list"]):
+            deal = new["deal"] or {}
+            rows.append(
+                {
+                    "ingredient": new["ingredient"],
+                    "was": old.get("in_deals"),
+                    "in_deals": new["in_deals"],
+                    "score": deal.get("score"),
+                    "deal": deal.get("title"),
+                }
+            )
+        columns = ("ingredient", "was", "in_deals", "score", "deal")
 
-    print(f"Total categories found: {len(data["deals"])}")
-    print("Total items found ", num_items)
+        if args.write:
+            with open(args.plan, "w", encoding="utf-8") as f:
+                json.dump(updated, f, indent=4, ensure_ascii=False)
 
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    else:
+        print_rows(rows, columns)
 
-def main():
-    asyncio.run(async_main())
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,401 @@
+"""Vectorized analytics over sanitized deals.
+
+Deals are loaded into NumPy arrays with one element per item, from columnar
+exports (``sanitizer.py --columnar``, mapped without copying) or from
+sanitized JSON. Prices, discounts, rankings and comparisons are then computed
+on whole columns at once, which keeps millions of rows to a few seconds.
+
+NumPy is only needed here, so it is not a dependency of the rest of autoply.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from autoply.columnar import COLUMNS, NULL_ID, ColumnBuilder, load_columnar
+from autoply.snapshots import ad_week, normalize
+
+# What a source's rows are labelled with in comparisons
+LABELS = ("file", "week", "store")
+
+# Per-store outputs are written as publix.<store>.json
+_STORE = re.compile(r"publix\.([^.]+)\.json")
+
+
+@dataclass
+class Deals:
+    """
+    Sanitized deals as parallel arrays, one element per item
+
+    String columns (see autoply.columnar.COLUMNS) hold ids into strings, or
+    NULL_ID; number columns are float64 with NaN where missing. source holds
+    each row's index into labels.
+    """
+
+    columns: dict
+    strings: list
+    labels: list
+    source: np.ndarray
+    _ids: dict = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def string_id(self, value: str) -> int:
+        """
+        Id of a string, adding it to the table if it is not there
+
+        Args:
+            value (str): String to look up
+
+        Returns:
+            int: Its id
+        """
+        if not self._ids:
+            self._ids.update((s, i) for i, s in enumerate(self.strings))
+
+        sid = self._ids.get(value)
+        if sid is None:
+            sid = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return sid
+
+    def decode(self, ids: np.ndarray) -> list:
+        """
+        Resolve string ids
+
+        Args:
+            ids (np.ndarray): Ids from a string column
+
+        Returns:
+            list: Strings, None for NULL_ID
+        """
+        return [None if i == NULL_ID else self.strings[i] for i in ids.tolist()]
+
+
+def _label(path: Path, timestamp: str | None, by: str) -> str:
+    if by == "week":
+        return ad_week(timestamp)
+    if by == "store":
+        match = _STORE.search(path.name)
+        if match:
+            return match.group(1)
+    return path.name
+
+
+def _read_json(path: Path) -> tuple[dict, list, str | None]:
+    # Sanitized JSON carries the parsed fields; unsanitized items load as
+    # rows with every parsed column missing
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    builder = ColumnBuilder(str(path))
+    for cat in data["deals"]:
+        category = cat.get("category") or "Uncategorized"
+        for item in cat.get("items") or ():
+            if isinstance(item, dict):
+                builder.add(
+                    category,
+                    item.get("title"),
+                    item.get("savings_parsed"),
+                    item.get("offer_parsed"),
+                )
+
+    columns = {
+        name: np.frombuffer(values, dtype=values.typecode)
+        for name, values in builder.columns().items()
+    }
+    return columns, builder.strings, data.get("timestamp")
+
+
+def _read_columnar(path: Path) -> tuple[dict, list, str | None]:
+    # The mapping stays open for as long as the arrays are referenced
+    deals = load_columnar(path)
+    columns = {
+        name: np.frombuffer(deals.column(name), dtype=COLUMNS[name]) for name in COLUMNS
+    }
+    return columns, deals.strings, deals.timestamp
+
+
+def load_deals(paths: list, by: str = "file") -> Deals:
+    """
+    Load sanitized deals from one or more files
+
+    A single columnar file is used in place. Several files are concatenated,
+    with their string tables merged so equal strings share one id.
+
+    Args:
+        paths (list): .cols exports or sanitized JSON files
+        by (str): Label each file's rows by its file name, ad week or store
+
+    Returns:
+        Deals: All rows, labelled by source
+    """
+    parts, labels = [], []
+
+    for path in map(Path, paths):
+        read = _read_columnar if path.suffix == ".cols" else _read_json
+        columns, strings, timestamp = read(path)
+        parts.append((columns, strings))
+        labels.append(_label(path, timestamp, by))
+
+    if len(parts) == 1:
+        columns, strings = parts[0]
+        rows = len(columns["category"])
+        return Deals(columns, list(strings), labels, np.zeros(rows, dtype=np.int32))
+
+    strings, ids = [], {}
+    merged = {name: [] for name in COLUMNS}
+    sources = []
+
+    for index, (columns, local) in enumerate(parts):
+        # Local id to merged id, with NULL_ID mapped to itself through the
+        # extra last slot
+        mapping = np.empty(len(local) + 1, dtype=np.uint32)
+        for i, s in enumerate(local):
+            sid = ids.get(s)
+            if sid is None:
+                sid = ids[s] = len(strings)
+                strings.append(s)
+            mapping[i] = sid
+        mapping[-1] = NULL_ID
+
+        for name, code in COLUMNS.items():
+            column = columns[name]
+            if code == "I":
+                column = mapping[np.where(column == NULL_ID, len(local), column)]
+            merged[name].append(column)
+
+        sources.append(np.full(len(columns["category"]), index, dtype=np.int32))
+
+    return Deals(
+        {name: np.concatenate(arrays) for name, arrays in merged.items()},
+        strings,
+        labels,
+        np.concatenate(sources),
+    )
+
+
+def effective_prices(deals: Deals) -> dict:
+    """
+    Effective and regular unit price and discount of every deal
+
+    - A plain price or multibuy costs its unit price.
+    - A BOGO's regular price is what the savings say the free items are
+      worth (divided by how many are free). Paying for buy_qty of
+      buy_qty + get_qty items makes the effective price a fraction of it,
+      half for buy one get one.
+    - A price or multibuy's regular price is its unit price plus the
+      savings, when the savings are in the same unit.
+
+    "Save up to" amounts are upper bounds, so the discounts are too. Deals
+    without a stated price (coupons, free text) get NaN throughout.
+
+    Args:
+        deals (Deals): Loaded deals
+
+    Returns:
+        dict: Arrays "effective", "regular", "discount" (percent) and
+            "unit" (string ids)
+    """
+    kind = deals["offer_kind"]
+    unit = deals["unit"]
+    savings = deals["savings_amount"]
+    savings_unit = deals["savings_unit"]
+    buy, get = deals["buy_qty"], deals["get_qty"]
+
+    is_bogo = kind == deals.string_id("bogo")
+    each = deals.string_id("each")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bogo_regular = savings / get
+        effective = np.where(
+            is_bogo, bogo_regular * buy / (buy + get), deals["unit_price"]
+        )
+
+        same_unit = (savings_unit == NULL_ID) | (savings_unit == unit)
+        regular = np.where(
+            is_bogo,
+            bogo_regular,
+            np.where(same_unit, deals["unit_price"] + savings, np.nan),
+        )
+        discount = (regular - effective) / regular * 100
+
+    return {
+        "effective": effective,
+        "regular": regular,
+        "discount": discount,
+        "unit": np.where(
+            is_bogo, np.where(savings_unit == NULL_ID, each, savings_unit), unit
+        ),
+    }
+
+
+def _round(value: float) -> float | None:
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def _rows(deals: Deals, prices: dict, index: np.ndarray) -> list:
+    category = deals.decode(deals["category"][index])
+    title = deals.decode(deals["title"][index])
+    kind = deals.decode(deals["offer_kind"][index])
+    unit = deals.decode(prices["unit"][index])
+
+    return [
+        {
+            "source": deals.labels[s],
+            "category": category[i],
+            "title": title[i],
+            "offer_kind": kind[i],
+            "effective_price": _round(prices["effective"][r]),
+            "unit": unit[i],
+            "regular_price": _round(prices["regular"][r]),
+            "discount_pct": _round(prices["discount"][r]),
+        }
+        for i, (r, s) in enumerate(zip(index.tolist(), deals.source[index].tolist()))
+    ]
+
+
+def top_deals(
+    deals: Deals, k: int = 5, by: str = "discount", prices: dict | None = None
+) -> list:
+    """
+    Best k deals of every category
+
+    Prices in different units do not compare, so by price the deals of a
+    category are ranked separately per unit (per lb, per each, ...), k of
+    each.
+
+    Args:
+        deals (Deals): Loaded deals
+        k (int): Deals per category, or per category and unit by price
+        by (str): "discount" (largest first) or "price" (lowest effective
+            price first)
+        prices (dict | None): effective_prices(deals), if already computed
+
+    Returns:
+        list: Row dictionaries, grouped by category (and unit by price), best
+            first
+    """
+    prices = prices or effective_prices(deals)
+    category = deals["category"]
+
+    metric = -prices["discount"] if by == "discount" else prices["effective"]
+    index = np.flatnonzero(~np.isnan(metric))
+
+    # Rows are ranked within groups: categories, split by unit for price
+    keys = [category[index]]
+    if by == "price":
+        keys.append(prices["unit"][index])
+
+    # Stable sort by group, then metric, then effective price as the
+    # tie-break, so each group's best rows come first
+    order = np.lexsort((prices["effective"][index], metric[index], *keys[::-1]))
+    if not len(order):
+        return []
+
+    changed = np.zeros(len(order) - 1, dtype=bool)
+    for key in keys:
+        sorted_key = key[order]
+        changed |= sorted_key[1:] != sorted_key[:-1]
+    order = index[order]
+    starts = np.flatnonzero(np.r_[True, changed])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+
+    return _rows(deals, prices, order[rank < k])
+
+
+def compare_sources(
+    deals: Deals,
+    min_sources: int = 2,
+    limit: int | None = 20,
+    prices: dict | None = None,
+) -> list:
+    """
+    Compare the effective price of each item across sources
+
+    Items are matched on their normalized title and priced in the same unit.
+    Each source's cheapest listing of an item counts. Items found in at
+    least min_sources sources are ranked by how much cheaper the best source
+    is than the worst one.
+
+    Args:
+        deals (Deals): Deals loaded from several files, labelled by week or
+            store
+        min_sources (int): Sources an item must appear in
+        limit (int | None): Rows to return, all if None
+        prices (dict | None): effective_prices(deals), if already computed
+
+    Returns:
+        list: One dictionary per item with its best and worst source
+    """
+    prices = prices or effective_prices(deals)
+    effective = prices["effective"]
+
+    # Normalize the string table once instead of every title
+    norm_ids = {}
+    norm = np.fromiter(
+        (norm_ids.setdefault(normalize(s), len(norm_ids)) for s in deals.strings),
+        dtype=np.int64,
+        count=len(deals.strings),
+    )
+
+    index = np.flatnonzero(~np.isnan(effective) & (deals["title"] != NULL_ID))
+    if not len(index):
+        return []
+
+    # One integer per (normalized title, unit), NULL_ID taking the last slot
+    width = len(deals.strings) + 1
+    unit = prices["unit"][index].astype(np.int64)
+    unit[unit == NULL_ID] = width - 1
+    key = norm[deals["title"][index]] * width + unit
+    source = deals.source[index]
+    price = effective[index]
+
+    # Cheapest listing per (item, source)
+    order = np.lexsort((price, source, key))
+    key, source, price, index = key[order], source[order], price[order], index[order]
+    first = np.r_[True, (key[1:] != key[:-1]) | (source[1:] != source[:-1])]
+    key, source, price, index = key[first], source[first], price[first], index[first]
+
+    # Per item, sources ordered by price: first is best, last is worst
+    order = np.lexsort((price, key))
+    key, source, price, index = key[order], source[order], price[order], index[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    ends = np.r_[starts[1:], len(key)] - 1
+    counts = ends - starts + 1
+
+    keep = counts >= min_sources
+    starts, ends, counts = starts[keep], ends[keep], counts[keep]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread = (price[ends] - price[starts]) / price[ends] * 100
+    ranked = np.lexsort((price[starts], -spread))
+    if limit is not None:
+        ranked = ranked[:limit]
+
+    best, worst = starts[ranked], ends[ranked]
+    titles = deals.decode(deals["title"][index[best]])
+    units = deals.decode(prices["unit"][index[best]])
+
+    return [
+        {
+            "title": titles[i],
+            "unit": units[i],
+            "sources": int(counts[r]),
+            "best_source": deals.labels[source[b]],
+            "best_price": _round(price[b]),
+            "worst_source": deals.labels[source[w]],
+            "worst_price": _round(price[w]),
+            "spread_pct": _round(spread[r]),
+        }
+        for i, (r, b, w) in enumerate(zip(ranked, best, worst))
+    ]
@@ -0,0 +1,368 @@
+"""Columnar, memory-mappable export of sanitized deals.
+
+A ``.cols`` file holds one row per item, with its parsed savings and offer
+flattened into the same columns as the history database's offers table (see
+``autoply.history.offer_columns``). Every column is a contiguous typed array:
+
+- numbers (amounts, quantities, prices) as float64, NaN where missing
+- strings (category, title, kinds, units) as uint32 ids into one string
+  table, NULL_ID where missing
+
+Layout, little-endian throughout::
+
+    MAGIC                 8 bytes
+    version, header size  2 x uint32
+    header                JSON: rows, timestamp, source, column offsets
+    data                  columns and the string table, each 8-byte aligned
+
+The string table is a uint64 offsets array (one entry per string plus an end
+offset) followed by the UTF-8 bytes of all strings. Loading maps the file and
+reads only the header; columns are memoryviews straight onto the mapping, so
+nothing is parsed or copied until it is used.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from autoply.history import offer_columns
+
+MAGIC = b"DEALCOLS"
+VERSION = 1
+
+# Id of a missing string in a string column
+NULL_ID = 0xFFFFFFFF
+
+# Column name to array typecode: "I" for string ids, "d" for numbers
+COLUMNS = {
+    "category": "I",
+    "title": "I",
+    "savings_kind": "I",
+    "savings_amount": "d",
+    "savings_unit": "I",
+    "offer_kind": "I",
+    "buy_qty": "d",
+    "get_qty": "d",
+    "qty": "d",
+    "total_price": "d",
+    "amount_off": "d",
+    "unit_price": "d",
+    "unit": "I",
+}
+
+# offer_columns fields that are stored, after category and title, and whether
+# each is a string column
+_PARSED = tuple((name, COLUMNS[name] == "I") for name in tuple(COLUMNS)[2:])
+
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 8
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGN
+
+
+class ColumnBuilder:
+    """
+    Accumulates rows into typed arrays and writes them as a .cols file
+
+    Args:
+        source (str | None): Input the rows came from, kept in the header
+    """
+
+    def __init__(self, source: str | None = None):
+        self.source = source
+        self.timestamp = None
+        self.strings = []
+        self._ids = {}
+        self._category = array("I")
+        self._title = array("I")
+        # The sanitizer shares one parsed dict between identical savings or
+        # offer strings, so most rows repeat an earlier (savings, offer) pair.
+        # Each pair is flattened once and rows store its index; the parsed
+        # columns are only expanded when written. The dicts are kept
+        # referenced so their ids stay unique while cached.
+        self._pairs = {}
+        self._flat = []
+        self._pair = array("I")
+
+    def __len__(self) -> int:
+        return len(self._category)
+
+    def string_id(self, value) -> int:
+        """
+        Id of a string in the string table, adding it if new
+
+        Args:
+            value: String (other values are stored as their str()) or None
+
+        Returns:
+            int: The string's id, or NULL_ID for None
+        """
+        if value is None:
+            return NULL_ID
+        if not isinstance(value, str):
+            value = str(value)
+
+        sid = self._ids.get(value)
+        if sid is None:
+            sid = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return sid
+
+    def add(self, category, title, savings_parsed, offer_parsed):
+        """
+        Append one item
+
+        Args:
+            category (str): Category the item is listed under
+            title: Item title
+            savings_parsed (dict | None): The item's parsed savings
+            offer_parsed (dict | None): The item's parsed offer
+        """
+        key = (id(savings_parsed), id(offer_parsed))
+        pair = self._pairs.get(key)
+        if pair is None:
+            flat = offer_columns(
+                {"savings_parsed": savings_parsed, "offer_parsed": offer_parsed}
+            )
+            self._flat.append(
+                tuple(
+                    (
+                        self.string_id(flat[name])
+                        if is_string
+                        else float("nan") if flat[name] is None else flat[name]
+                    )
+                    for name, is_string in _PARSED
+                )
+            )
+            pair = self._pairs[key] = (
+                savings_parsed,
+                offer_parsed,
+                len(self._flat) - 1,
+            )
+
+        self._category.append(self.string_id(category))
+        self._title.append(self.string_id(title))
+        self._pair.append(pair[2])
+
+    def columns(self) -> dict:
+        """
+        Expand the rows into one typed array per column
+
+        Returns:
+            dict: Column name to array, in COLUMNS order
+        """
+        columns = {"category": self._category, "title": self._title}
+        for i, (name, _) in enumerate(_PARSED):
+            values = [flat[i] for flat in self._flat]
+            columns[name] = array(COLUMNS[name], map(values.__getitem__, self._pair))
+        return columns
+
+    def set_category(self, start: int, category: str):
+        """
+        Re-assign the category of every row from start onwards
+
+        Args:
+            start (int): First row to change
+            category (str): Category to assign
+        """
+        sid = self.string_id(category)
+        for i in range(start, len(self._category)):
+            self._category[i] = sid
+
+    def write(self, path: Path):
+        """
+        Write the rows as a .cols file, atomically
+
+        Args:
+            path (Path): Output path
+        """
+        encoded = [s.encode("utf-8") for s in self.strings]
+        offsets = array("Q", [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        blob = b"".join(encoded)
+
+        # Offsets are relative to the start of the data section
+        columns = self.columns()
+        blocks = [*columns.values(), offsets, blob]
+        positions = []
+        position = 0
+        for block in blocks:
+            positions.append(position)
+            size = len(block) * (block.itemsize if isinstance(block, array) else 1)
+            position += size + _padding(size)
+
+        names = list(columns)
+        header = {
+            "rows": len(self),
+            "timestamp": self.timestamp,
+            "source": self.source,
+            "columns": {
+                name: {"type": COLUMNS[name], "offset": positions[i]}
+                for i, name in enumerate(names)
+            },
+            "strings": {
+                "count": len(self.strings),
+                "offsets": positions[-2],
+                "data": positions[-1],
+                "bytes": len(blob),
+            },
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        header_bytes += b" " * _padding(_PREFIX.size + len(header_bytes))
+
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for block in blocks:
+                if isinstance(block, array) and sys.byteorder != "little":
+                    block = array(block.typecode, block)
+                    block.byteswap()
+                f.write(block)
+                size = f.tell()
+                f.write(b"\0" * _padding(size))
+        os.replace(tmp, path)
+
+
+class ColumnarDeals:
+    """
+    A .cols file mapped into memory
+
+    Columns are read-only memoryviews onto the mapping, usable directly or
+    wrapped without copying (e.g. numpy.frombuffer). Release them before
+    calling close.
+
+    Args:
+        path (Path): .cols file written by ColumnBuilder
+    """
+
+    def __init__(self, path: Path):
+        if sys.byteorder != "little":
+            raise ValueError("Deal columns files can only be mapped little-endian")
+
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_size = _PREFIX.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"Not a version {VERSION} deal columns file: {path}")
+
+        start = _PREFIX.size
+        header = json.loads(self._map[start : start + header_size])
+        self._data = start + header_size
+        self._header = header
+        self._strings = None
+
+        self.rows = header["rows"]
+        self.timestamp = header["timestamp"]
+        self.source = header["source"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def names(self) -> list:
+        return list(self._header["columns"])
+
+    def column(self, name: str) -> memoryview:
+        """
+        Map one column
+
+        Args:
+            name (str): Column name, see COLUMNS
+
+        Returns:
+            memoryview: rows values, typed "I" (string ids) or "d" (numbers)
+        """
+        spec = self._header["columns"][name]
+        return self._view(spec["offset"], spec["type"], self.rows)
+
+    def _view(self, offset: int, code: str, count: int) -> memoryview:
+        start = self._data + offset
+        size = count * array(code).itemsize
+        return memoryview(self._map)[start : start + size].cast(code)
+
+    @property
+    def strings(self) -> list:
+        """
+        The string table, decoded on first use
+
+        Returns:
+            list: Strings, indexed by id
+        """
+        if self._strings is None:
+            spec = self._header["strings"]
+            offsets = self._view(spec["offsets"], "Q", spec["count"] + 1)
+            start = self._data + spec["data"]
+            data = self._map[start : start + spec["bytes"]]
+            self._strings = [
+                data[offsets[i] : offsets[i + 1]].decode("utf-8")
+                for i in range(spec["count"])
+            ]
+            offsets.release()
+        return self._strings
+
+    def decode(self, name: str) -> list:
+        """
+        Resolve a string column's ids
+
+        Args:
+            name (str): String column name
+
+        Returns:
+            list: One string (or None) per row
+        """
+        strings = self.strings
+        with self.column(name) as ids:
+            return [None if i == NULL_ID else strings[i] for i in ids]
+
+    def row(self, index: int) -> dict:
+        """
+        One row with its strings resolved and missing numbers as None
+
+        Args:
+            index (int): Row number
+
+        Returns:
+            dict: Column name to value
+        """
+        strings = self.strings
+        row = {}
+        for name in self.names:
+            with self.column(name) as column:
+                value = column[index]
+            if COLUMNS[name] == "I":
+                row[name] = None if value == NULL_ID else strings[value]
+            else:
+                row[name] = None if value != value else value
+        return row
+
+    def close(self):
+        self._map.close()
+
+
+def load_columnar(path: Path) -> ColumnarDeals:
+    """
+    Map a .cols file
+
+    Args:
+        path (Path): File written by ColumnBuilder
+
+    Returns:
+        ColumnarDeals: The mapped columns
+    """
+    return ColumnarDeals(path)
@@ -0,0 +1,467 @@
+"""SQLite deal history.
+
+An optional store for every weekly ad ingested so far, so questions that span
+many weeks are answered from indexed tables instead of by loading each week's
+JSON. Offers are ingested with the ``savings_parsed`` / ``offer_parsed``
+fields that ``sanitizer.py`` adds. Raw ``publix.json`` files are accepted as
+well, but their parsed columns stay empty.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+from autoply.snapshots import ad_week, normalize
+
+HISTORY_PATH = "history.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    timestamp TEXT,
+    week TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS snapshots_week ON snapshots (week, timestamp);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS offers (
+    id INTEGER PRIMARY KEY,
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    category_id INTEGER NOT NULL REFERENCES categories (id),
+    item_id INTEGER NOT NULL REFERENCES items (id),
+    savings_raw TEXT,
+    offer_raw TEXT,
+    savings_kind TEXT,
+    savings_amount REAL,
+    savings_unit TEXT,
+    offer_kind TEXT,
+    buy_qty INTEGER,
+    get_qty INTEGER,
+    qty INTEGER,
+    total_price REAL,
+    amount_off REAL,
+    unit_price REAL,
+    unit TEXT
+);
+CREATE INDEX IF NOT EXISTS offers_item ON offers (item_id, snapshot_id);
+CREATE INDEX IF NOT EXISTS offers_snapshot ON offers (
+    snapshot_id, category_id, unit_price
+);
+CREATE INDEX IF NOT EXISTS offers_kind ON offers (offer_kind, item_id);
+"""
+
+OFFER_COLUMNS = (
+    "snapshot_id",
+    "category_id",
+    "item_id",
+    "savings_raw",
+    "offer_raw",
+    "savings_kind",
+    "savings_amount",
+    "savings_unit",
+    "offer_kind",
+    "buy_qty",
+    "get_qty",
+    "qty",
+    "total_price",
+    "amount_off",
+    "unit_price",
+    "unit",
+)
+
+
+def connect(path: str = HISTORY_PATH) -> sqlite3.Connection:
+    """
+    Open the history database, creating the schema if needed
+
+    Args:
+        path (str): SQLite database path
+
+    Returns:
+        sqlite3.Connection: Connection with rows returned as sqlite3.Row
+    """
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def offer_columns(item: dict) -> dict:
+    """
+    Flatten an item's parsed savings and offer into offers table columns
+
+    Only offers that state a price per item get a unit price: a plain price
+    (per lb or each) or a multibuy (total / quantity). BOGO and coupon offers
+    don't say what one item costs, so theirs is left empty.
+
+    Args:
+        item (dict): Sanitized item
+
+    Returns:
+        dict: Column values, excluding the snapshot, category and item ids
+    """
+    savings = item.get("savings_parsed") or {}
+    offer = item.get("offer_parsed") or {}
+    kind = offer.get("kind")
+
+    unit_price, unit = None, None
+    if kind == "price":
+        unit_price, unit = offer.get("amount"), offer.get("unit") or "each"
+    elif kind == "multibuy":
+        unit_price, unit = offer.get("unit_price"), "each"
+
+    return {
+        "savings_raw": item.get("savings_raw", item.get("savings")),
+        "offer_raw": item.get("offer_raw", item.get("offer")),
+        "savings_kind": savings.get("kind"),
+        "savings_amount": savings.get("amount"),
+        "savings_unit": savings.get("unit"),
+        "offer_kind": kind,
+        "buy_qty": offer.get("buy_qty"),
+        "get_qty": offer.get("get_qty"),
+        "qty": offer.get("qty"),
+        "total_price": offer.get("total_price"),
+        "amount_off": offer.get("amount_off"),
+        "unit_price": unit_price,
+        "unit": unit,
+    }
+
+
+# Item fields that identify a scrape; the parsed fields sanitizer.py adds are
+# left out, so a raw payload and its sanitized copy are one snapshot
+SCRAPE_FIELDS = ("title", "savings", "offer")
+
+
+def scrape_hash(data: dict) -> str:
+    """
+    Identity of the scrape a payload holds, raw or sanitized
+
+    Args:
+        data (dict): Grouped payload
+
+    Returns:
+        str: Hex SHA-256 of every item's category and SCRAPE_FIELDS
+    """
+    canonical = json.dumps(
+        [
+            [
+                cat.get("category"),
+                [
+                    [item.get(f) for f in SCRAPE_FIELDS]
+                    for item in cat.get("items") or ()
+                    if isinstance(item, dict)
+                ],
+            ]
+            for cat in data.get("deals", [])
+        ],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _has_parsed_offers(conn: sqlite3.Connection, snapshot_id: int) -> bool:
+    return (
+        conn.execute(
+            "SELECT 1 FROM offers WHERE snapshot_id = ? "
+            "AND (savings_kind IS NOT NULL OR offer_kind IS NOT NULL) LIMIT 1",
+            (snapshot_id,),
+        ).fetchone()
+        is not None
+    )
+
+
+def ingest(conn: sqlite3.Connection, data: dict, source: str | None = None) -> dict:
+    """
+    Ingest one grouped payload in a single transaction
+
+    Categories and items are upserted in bulk and the offers inserted with one
+    executemany. A payload whose scrape (see scrape_hash) was already
+    ingested is skipped, so re-running over the same files, or over a raw
+    file and its sanitized copy, is harmless. The one exception is a
+    sanitized copy of a scrape ingested raw: its offers replace the raw ones,
+    so the parsed columns get filled.
+
+    Args:
+        conn (sqlite3.Connection): Connection from connect
+        data (dict): Sanitized (or raw) grouped payload
+        source (str | None): Where the payload came from, e.g. its file path
+
+    Returns:
+        dict: Snapshot id, offer count, whether the payload was new and
+            whether it upgraded a raw ingest
+    """
+    digest = scrape_hash(data)
+    timestamp = data.get("timestamp")
+
+    rows = [
+        (cat.get("category") or "Uncategorized", item)
+        for cat in data.get("deals", [])
+        for item in cat.get("items", [])
+        if isinstance(item, dict) and item.get("title")
+    ]
+    sanitized = any(
+        "savings_parsed" in item or "offer_parsed" in item for _, item in rows
+    )
+
+    with conn:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO snapshots (content_hash, timestamp, week, source) "
+            "VALUES (?, ?, ?, ?)",
+            (digest, timestamp, ad_week(timestamp), source),
+        )
+        new = bool(cur.rowcount)
+
+        if new:
+            snapshot_id = cur.lastrowid
+        else:
+            snapshot_id = conn.execute(
+                "SELECT id FROM snapshots WHERE content_hash = ?", (digest,)
+            ).fetchone()["id"]
+            if not sanitized or _has_parsed_offers(conn, snapshot_id):
+                return {
+                    "snapshot": snapshot_id,
+                    "offers": 0,
+                    "new": False,
+                    "upgraded": False,
+                }
+
+            conn.execute("DELETE FROM offers WHERE snapshot_id = ?", (snapshot_id,))
+            conn.execute(
+                "UPDATE snapshots SET source = ? WHERE id = ?", (source, snapshot_id)
+            )
+
+        names = {category for category, _ in rows}
+        conn.executemany(
+            "INSERT OR IGNORE INTO categories (name) VALUES (?)",
+            [(name,) for name in names],
+        )
+        category_ids = dict(conn.execute("SELECT name, id FROM categories"))
+
+        titles = {normalize(item["title"]): item["title"] for _, item in rows}
+        conn.executemany(
+            "INSERT OR IGNORE INTO items (key, title) VALUES (?, ?)", titles.items()
+        )
+        item_ids = dict(conn.execute("SELECT key, id FROM items"))
+
+        conn.executemany(
+            f"INSERT INTO offers ({', '.join(OFFER_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(OFFER_COLUMNS))})",
+            [
+                (
+                    snapshot_id,
+                    category_ids[category],
+                    item_ids[normalize(item["title"])],
+                    *offer_columns(item).values(),
+                )
+                for category, item in rows
+            ],
+        )
+
+    return {
+        "snapshot": snapshot_id,
+        "offers": len(rows),
+        "new": new,
+        "upgraded": not new,
+    }
+
+
+def ingest_files(conn: sqlite3.Connection, paths: list[str]) -> list:
+    """
+    Ingest grouped payload files, one transaction per file
+
+    Args:
+        conn (sqlite3.Connection): Connection from connect
+        paths (list[str]): JSON files, e.g. sanitized weekly outputs
+
+    Returns:
+        list: One ingest report per file
+    """
+    reports = []
+
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        report = ingest(conn, data, source=str(Path(path)))
+        reports.append({"path": path, **report})
+
+    return reports
+
+
+def _find_items(conn: sqlite3.Connection, title: str) -> list[int]:
+    key = normalize(title)
+    rows = conn.execute("SELECT id FROM items WHERE key = ?", (key,)).fetchall()
+    if not rows:
+        rows = conn.execute(
+            "SELECT id FROM items WHERE key LIKE ? ESCAPE '\\'",
+            ("%" + key.replace("\\", "\\\\").replace("%", "\\%") + "%",),
+        ).fetchall()
+    return [row["id"] for row in rows]
+
+
+def price_history(conn: sqlite3.Connection, title: str) -> list:
+    """
+    Every listing of an item, oldest first
+
+    Args:
+        conn (sqlite3.Connection): Connection from connect
+        title (str): Item title; matched exactly after normalization, or as a
+            substring if there is no exact match
+
+    Returns:
+        list: Dictionaries with week, timestamp, title, category, offer and
+            unit price
+    """
+    ids = _find_items(conn, title)
+    if not ids:
+        return []
+
+    rows = conn.execute(
+        f"""
+        SELECT s.week, s.timestamp, i.title, c.name AS category, o.offer_raw,
+               o.offer_kind, o.savings_raw, o.unit_price, o.unit
+        FROM offers o
+        JOIN snapshots s ON s.id = o.snapshot_id
+        JOIN items i ON i.id = o.item_id
+        JOIN categories c ON c.id = o.category_id
+        WHERE o.item_id IN ({', '.join('?' * len(ids))})
+        ORDER BY s.timestamp, i.title
+        """,
+        ids,
+    )
+    return [dict(row) for row in rows]
+
+
+def bogo_frequency(conn: sqlite3.Connection, title: str) -> list:
+    """
+    How often an item is listed, and how often as buy one get one
+
+    Args:
+        conn (sqlite3.Connection): Connection from connect
+        title (str): Item title, matched as in price_history
+
+    Returns:
+        list: One dictionary per matching item with weeks listed, weeks BOGO,
+            the BOGO share of all ingested weeks and the last BOGO week
+    """
+    ids = _find_items(conn, title)
+    if not ids:
+        return []
+
+    weeks = conn.execute("SELECT COUNT(DISTINCT week) FROM snapshots").fetchone()[0]
+    rows = conn.execute(
+        f"""
+        SELECT i.title,
+               COUNT(DISTINCT s.week) AS weeks_listed,
+               COUNT(DISTINCT CASE WHEN o.offer_kind = 'bogo' THEN s.week END)
+                   AS weeks_bogo,
+               MAX(CASE WHEN o.offer_kind = 'bogo' THEN s.week END)
+                   AS last_bogo
+        FROM offers o
+        JOIN snapshots s ON s.id = o.snapshot_id
+        JOIN items i ON i.id = o.item_id
+        WHERE o.item_id IN ({', '.join('?' * len(ids))})
+        GROUP BY i.id
+        ORDER BY weeks_bogo DESC, i.title
+        """,
+        ids,
+    )
+    return [
+        {
+            **dict(row),
+            "weeks_total": weeks,
+            "bogo_share": round(row["weeks_bogo"] / weeks, 3) if weeks else None,
+        }
+        for row in rows
+    ]
+
+
+def best_unit_prices(conn: sqlite3.Connection, week: str | None = None) -> list:
+    """
+    Lowest unit price per category and unit in one ad week
+
+    Per-lb and per-each prices are ranked separately, since they don't
+    compare.
+
+    Args:
+        conn (sqlite3.Connection): Connection from connect
+        week (str | None): Ad week (YYYY-MM-DD); the latest ingested if None
+
+    Returns:
+        list: One dictionary per category and unit with the cheapest item
+    """
+    if week is None:
+        row = conn.execute(
+            "SELECT week FROM snapshots ORDER BY timestamp DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return []
+        week = row["week"]
+
+    # A week can be scraped more than once; use its latest snapshot
+    rows = conn.execute(
+        """
+        WITH snapshot AS (
+            SELECT id FROM snapshots WHERE week = ?
+            ORDER BY timestamp DESC LIMIT 1
+        ),
+        ranked AS (
+            SELECT c.name AS category, o.unit, i.title, o.unit_price,
+                   o.offer_raw,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY o.category_id, o.unit
+                       ORDER BY o.unit_price, i.title
+                   ) AS rank
+            FROM offers o
+            JOIN items i ON i.id = o.item_id
+            JOIN categories c ON c.id = o.category_id
+            WHERE o.snapshot_id = (SELECT id FROM snapshot)
+              AND o.unit_price IS NOT NULL
+        )
+        SELECT ? AS week, category, unit, title, unit_price, offer_raw
+        FROM ranked WHERE rank = 1
+        ORDER BY category, unit
+        """,
+        (week, week),
+    )
+    return [dict(row) for row in rows]
+
+
+def print_rows(rows: list, columns: tuple):
+    """
+    Print query results as a plain table
+
+    Args:
+        rows (list): Result dictionaries
+        columns (tuple): Keys to print, in order
+    """
+    if not rows:
+        print("No matching rows")
+        return
+
+    cells = [list(columns)] + [
+        [str(row[c]) if row.get(c) is not None else "" for c in columns] for row in rows
+    ]
+    widths = [max(len(r[i]) for r in cells) for i in range(len(columns))]
+
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)).rstrip())
@@ -0,0 +1,309 @@
+"""Local search over deal titles, for matching meal ingredients to deals.
+
+Titles are tokenized (accents and punctuation stripped, case-folded) and
+stemmed with a light plural stemmer, then put in an inverted index from stem
+to the deals whose title contains it. An ingredient is scored against the
+deals it shares a stem with by the cosine of their IDF-weighted stem sets, so
+rare words ("asparagus") count for more than common ones ("publix"). A stem
+that no title contains falls back to the closest stem in the index by trigram
+similarity, which absorbs misspellings and spelling variants.
+
+The index of a payload is built once and kept in
+``snapshots/search/<content hash>.json``, so every later lookup against the
+same weekly ad loads it instead of rebuilding it.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from autoply.snapshots import SNAPSHOT_DIR, _write_json, content_hash
+
+# Bumped whenever tokenizing or the file layout changes, so stale indexes
+# are rebuilt rather than read
+INDEX_VERSION = 1
+
+# Minimum cosine score for an ingredient to count as on sale
+MATCH_THRESHOLD = 0.5
+
+# Minimum trigram similarity for a stem to stand in for an unknown one
+FUZZY_THRESHOLD = 0.45
+
+STOPWORDS = frozenset(
+    {"a", "an", "and", "for", "in", "of", "on", "or", "the", "to", "with"}
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_APOSTROPHE = re.compile(r"['’]")
+
+
+def stem(token: str) -> str:
+    """
+    Reduce a token to its stem by stripping plural endings
+
+    Args:
+        token (str): Lower-case token
+
+    Returns:
+        str: "berries" -> "berry", "tomatoes" -> "tomato", "breasts" ->
+            "breast"; short tokens and words ending in "ss" are kept
+    """
+    if len(token) <= 3 or token.endswith(("ss", "us", "is")):
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return token[:-2]
+    if token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str | None) -> list:
+    """
+    Split text into stems
+
+    Args:
+        text (str | None): Title or ingredient
+
+    Returns:
+        list: Stems in order, without stopwords
+    """
+    text = unicodedata.normalize("NFKD", (text or "").casefold())
+    text = _APOSTROPHE.sub("", text.encode("ascii", "ignore").decode())
+    return [stem(t) for t in _TOKEN.findall(text) if t not in STOPWORDS]
+
+
+def trigrams(term: str) -> set:
+    padded = f"  {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class DealIndex:
+    """
+    Inverted index from title stems to deals
+
+    Args:
+        docs (list): Deals, each a dict with title, category, savings and
+            offer
+        postings (dict): Stem to the ids (positions in docs) of the deals
+            whose title contains it
+        snapshot (str | None): Content hash of the payload indexed
+    """
+
+    def __init__(self, docs: list, postings: dict, snapshot: str | None = None):
+        self.docs = docs
+        self.postings = postings
+        self.snapshot = snapshot
+
+        # Smoothed IDF; a stem no title contains gets the largest weight
+        n = len(docs)
+        self.idf = {
+            t: math.log((n + 1) / (len(ids) + 1)) + 1 for t, ids in postings.items()
+        }
+        self.unknown_idf = math.log(n + 1) + 1
+
+        norms = [0.0] * n
+        for term, ids in postings.items():
+            weight = self.idf[term] ** 2
+            for i in ids:
+                norms[i] += weight
+        self.norms = [math.sqrt(v) for v in norms]
+
+        self._trigrams = None
+        self._trigram_counts = None
+        self._fuzzy = {}
+        self._cache = {}
+
+    @classmethod
+    def build(cls, data: dict) -> DealIndex:
+        """
+        Index a grouped payload's deals
+
+        Args:
+            data (dict): Grouped payload, as written to publix.json
+
+        Returns:
+            DealIndex: The index
+        """
+        docs, postings = [], {}
+
+        for cat in data["deals"]:
+            for item in cat["items"]:
+                doc_id = len(docs)
+                docs.append(
+                    {
+                        "title": item.get("title"),
+                        "category": cat.get("category"),
+                        "savings": item.get("savings"),
+                        "offer": item.get("offer"),
+                    }
+                )
+                for term in set(tokenize(item.get("title"))):
+                    postings.setdefault(term, []).append(doc_id)
+
+        return cls(docs, postings, content_hash(data))
+
+    @classmethod
+    def for_payload(cls, data: dict, root: str = SNAPSHOT_DIR) -> DealIndex:
+        """
+        Load the persisted index of a payload, building it on first use
+
+        Args:
+            data (dict): Grouped payload
+            root (str): Snapshot store directory; indexes are kept in its
+                search/ subdirectory
+
+        Returns:
+            DealIndex: The index
+        """
+        path = Path(root) / "search" / f"{content_hash(data)}.json"
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("version") == INDEX_VERSION:
+                return cls(stored["docs"], stored["postings"], stored["snapshot"])
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        index = cls.build(data)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_json(
+            path,
+            {
+                "version": INDEX_VERSION,
+                "snapshot": index.snapshot,
+                "docs": index.docs,
+                "postings": index.postings,
+            },
+        )
+        return index
+
+    def closest_term(self, term: str) -> tuple:
+        """
+        Indexed stem most similar to a stem the index does not contain
+
+        Args:
+            term (str): Stem
+
+        Returns:
+            tuple: (stem, trigram Jaccard similarity), or (None, 0.0) if
+                nothing reaches FUZZY_THRESHOLD
+        """
+        cached = self._fuzzy.get(term)
+        if cached is not None:
+            return cached
+
+        # Built on the first unknown stem; most lookups never need it
+        if self._trigrams is None:
+            self._trigrams, self._trigram_counts = {}, {}
+            for known in self.postings:
+                grams = trigrams(known)
+                self._trigram_counts[known] = len(grams)
+                for gram in grams:
+                    self._trigrams.setdefault(gram, []).append(known)
+
+        grams = trigrams(term)
+        shared = Counter(
+            known for gram in grams for known in self._trigrams.get(gram, ())
+        )
+
+        best, best_score = None, 0.0
+        for known, count in shared.items():
+            score = count / (len(grams) + self._trigram_counts[known] - count)
+            if score > best_score or (score == best_score and known < best):
+                best, best_score = known, score
+
+        result = (best, best_score) if best_score >= FUZZY_THRESHOLD else (None, 0.0)
+        self._fuzzy[term] = result
+        return result
+
+    def search(self, text: str, limit: int = 3) -> list:
+        """
+        Best-matching deals for an ingredient
+
+        Args:
+            text (str): Ingredient, e.g. "Boneless chicken breasts"
+            limit (int): Matches to return
+
+        Returns:
+            list: Deal dicts with a "score" between 0 and 1, best first
+        """
+        key = (" ".join(tokenize(text)), limit)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        scores = {}
+        query_norm = 0.0
+
+        for term in set(key[0].split()):
+            weight = 1.0
+            if term not in self.postings:
+                term, weight = self.closest_term(term)
+            if term is None:
+                query_norm += self.unknown_idf**2
+                continue
+
+            idf = self.idf[term]
+            query_norm += (weight * idf) ** 2
+            for i in self.postings[term]:
+                scores[i] = scores.get(i, 0.0) + weight * idf * idf
+
+        query_norm = math.sqrt(query_norm)
+        ranked = heapq.nsmallest(
+            limit,
+            ((-s / (query_norm * self.norms[i]), i) for i, s in scores.items()),
+        )
+
+        matches = [{**self.docs[i], "score": round(-s, 4)} for s, i in ranked]
+        self._cache[key] = matches
+        return matches
+
+    def match_all(self, ingredients: list, limit: int = 3) -> dict:
+        """
+        Resolve many ingredients at once
+
+        Args:
+            ingredients (list): Ingredient strings
+            limit (int): Matches per ingredient
+
+        Returns:
+            dict: Ingredient to its matches, see search
+        """
+        return {text: self.search(text, limit) for text in ingredients}
+
+
+def recompute_in_deals(
+    plan: dict, index: DealIndex, threshold: float = MATCH_THRESHOLD
+) -> dict:
+    """
+    Decide in_deals for every ingredient of a meal plan from the index
+
+    Each ingredient_list entry gets in_deals "yes" when its best match
+    scores at least threshold, and "deal" set to that match (None
+    otherwise). Meals are left as they are.
+
+    Args:
+        plan (dict): Meal plan as in dinners.json
+        index (DealIndex): Index of the week's deals
+        threshold (float): Minimum score for a match
+
+    Returns:
+        dict: A copy of the plan with its ingredient list updated
+    """
+    entries = []
+
+    for entry in plan.get("ingredient_list", []):
+        matches = index.search(entry["ingredient"], limit=1)
+        best = matches[0] if matches and matches[0]["score"] >= threshold else None
+        entries.append({**entry, "in_deals": "yes" if best else "no", "deal": best})
+
+    return {**plan, "ingredient_list": entries}
@@ -0,0 +1,355 @@
+"""Content-addressed weekly ad snapshots and week-over-week deltas.
+
+Every scrape is stored under ``snapshots/objects/<sha256>.json``, addressed by
+the hash of its deals (the timestamp is left out, so re-scraping an unchanged
+ad stores nothing new). ``snapshots/index.json`` lists the snapshots in scrape
+order together with the ad week they belong to.
+
+``diff_snapshots`` compares two grouped payloads in one pass over each,
+keying items on their normalized category and title.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, tzinfo
+from functools import lru_cache
+from pathlib import Path
+
+SNAPSHOT_DIR = "snapshots"
+
+# Publix weekly ads start on Wednesday in most regions (Monday is 0)
+AD_WEEK_START = 2
+
+# Ads turn over at midnight store time, so scrapes are bucketed into weeks in
+# the stores' zone rather than UTC
+AD_TIMEZONE = "America/New_York"
+
+# Fields compared between two versions of the same item
+DELTA_FIELDS = ("savings", "offer")
+
+
+def normalize(text: str | None) -> str:
+    """
+    Normalize a title or category for matching across weeks
+
+    Args:
+        text (str | None): Raw text
+
+    Returns:
+        str: Case-folded text with whitespace collapsed
+    """
+    return " ".join((text or "").split()).casefold()
+
+
+def item_key(category: str | None, title: str | None) -> tuple[str, str]:
+    """
+    Key that identifies an item across snapshots
+
+    Args:
+        category (str | None): Category the item is listed under
+        title (str | None): Item title
+
+    Returns:
+        tuple[str, str]: Normalized (category, title)
+    """
+    return normalize(category), normalize(title)
+
+
+def content_hash(data: dict) -> str:
+    """
+    Content address of a grouped payload
+
+    Only the deals are hashed, so two scrapes of the same ad share an address
+    no matter when they ran.
+
+    Args:
+        data (dict): Grouped output, as written to publix.json
+
+    Returns:
+        str: Hex SHA-256 of the canonical JSON encoding of the deals
+    """
+    canonical = json.dumps(
+        data["deals"], sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _ad_zone() -> tzinfo | None:
+    # Imported here to keep zoneinfo off the status/summary import path
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+    # Without tzdata (e.g. on Windows) fall back to the machine's local time
+    try:
+        return ZoneInfo(AD_TIMEZONE)
+    except ZoneInfoNotFoundError:
+        return None
+
+
+def ad_week(timestamp: str | None) -> str:
+    """
+    Ad week a scrape belongs to
+
+    Args:
+        timestamp (str | None): ISO timestamp of the scrape; one without an
+            offset is taken as store time already
+
+    Returns:
+        str: ISO date of the Wednesday the ad week started on, or "unknown"
+    """
+    if not timestamp:
+        return "unknown"
+
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(_ad_zone())
+    day = moment.date()
+    return (day - timedelta(days=(day.weekday() - AD_WEEK_START) % 7)).isoformat()
+
+
+def _write_json(path: Path, obj, indent: int | None = None):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class SnapshotStore:
+    """
+    Directory of content-addressed snapshots with an index by ad week
+
+    Args:
+        root (str): Store directory
+    """
+
+    def __init__(self, root: str = SNAPSHOT_DIR):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.index_path = self.root / "index.json"
+
+    def entries(self) -> list:
+        """
+        Snapshot index entries, oldest first
+
+        Returns:
+            list: Entry dictionaries with id, week, timestamp and counts
+        """
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)["snapshots"]
+        except FileNotFoundError:
+            return []
+
+    def add(self, data: dict) -> dict:
+        """
+        Store a grouped payload and index it
+
+        A payload whose deals are already stored is not written again, only
+        indexed under its new timestamp.
+
+        Args:
+            data (dict): Grouped output, as written to publix.json
+
+        Returns:
+            dict: The index entry for the payload
+        """
+        digest = content_hash(data)
+        self.objects.mkdir(parents=True, exist_ok=True)
+
+        obj = self.objects / f"{digest}.json"
+        if not obj.exists():
+            _write_json(obj, data)
+
+        entry = {
+            "id": digest,
+            "week": ad_week(data.get("timestamp")),
+            "timestamp": data.get("timestamp"),
+            "categories": len(data["deals"]),
+            "items": sum(len(cat["items"]) for cat in data["deals"]),
+        }
+
+        entries = self.entries()
+        if not any(
+            e["id"] == digest and e["timestamp"] == entry["timestamp"] for e in entries
+        ):
+            entries.append(entry)
+            entries.sort(key=lambda e: e["timestamp"] or "")
+            _write_json(self.index_path, {"snapshots": entries}, indent=2)
+
+        return entry
+
+    def resolve(self, ref: str) -> dict:
+        """
+        Find the index entry a reference points to
+
+        Args:
+            ref (str): "latest", "previous" (the newest snapshot whose deals
+                differ from the latest), an ad week (YYYY-MM-DD, latest
+                snapshot of that week) or a snapshot id prefix
+
+        Returns:
+            dict: The matching index entry
+
+        Raises:
+            KeyError: No snapshot or more than one snapshot matches
+        """
+        entries = self.entries()
+
+        if ref == "latest":
+            if not entries:
+                raise KeyError("Not enough snapshots for 'latest'")
+            return entries[-1]
+
+        if ref == "previous":
+            # Re-scraping an unchanged ad indexes the same content again, so
+            # skip back past every entry with the latest's id
+            latest = entries[-1]["id"] if entries else None
+            for e in reversed(entries):
+                if e["id"] != latest:
+                    return e
+            raise KeyError("Not enough snapshots for 'previous'")
+
+        week = [e for e in entries if e["week"] == ref]
+        if week:
+            return week[-1]
+
+        matches = {e["id"]: e for e in entries if e["id"].startswith(ref)}
+        if len(matches) != 1:
+            raise KeyError(f"{'Ambiguous' if matches else 'Unknown'} snapshot {ref!r}")
+        return next(iter(matches.values()))
+
+    def load(self, ref: str) -> dict:
+        """
+        Load a stored payload
+
+        Args:
+            ref (str): Snapshot reference, see resolve
+
+        Returns:
+            dict: The grouped payload
+        """
+        entry = self.resolve(ref)
+        with open(self.objects / f"{entry['id']}.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def index_items(data: dict) -> dict:
+    """
+    Index a grouped payload's items by normalized (category, title)
+
+    Args:
+        data (dict): Grouped payload
+
+    Returns:
+        dict: Key to list of (category, item) pairs; a key holds several pairs
+            when one title is listed with several offers
+    """
+    index = {}
+
+    for cat in data["deals"]:
+        category = cat["category"]
+        norm_category = normalize(category)
+
+        for item in cat["items"]:
+            key = (norm_category, normalize(item["title"]))
+            entries = index.get(key)
+            if entries is None:
+                index[key] = [(category, item)]
+            else:
+                entries.append((category, item))
+
+    return index
+
+
+def _version(entries: list) -> list:
+    return sorted(tuple(item.get(f) or "" for f in DELTA_FIELDS) for _, item in entries)
+
+
+def _fields(entries: list) -> list:
+    return [{f: item.get(f) for f in DELTA_FIELDS} for _, item in entries]
+
+
+def diff_snapshots(old: dict, new: dict) -> dict:
+    """
+    Compute the added, removed and changed items between two payloads
+
+    Each payload is indexed once and every key is looked up once, so the work
+    is linear in the number of items.
+
+    Args:
+        old (dict): Earlier grouped payload
+        new (dict): Later grouped payload
+
+    Returns:
+        dict: Lists of added, removed and changed items, plus counts
+    """
+    before = index_items(old)
+    after = index_items(new)
+
+    added, removed, changed = [], [], []
+    unchanged = 0
+
+    for key, entries in after.items():
+        previous = before.get(key)
+        if previous is None:
+            added.extend({"category": c, **item} for c, item in entries)
+        # Most items are untouched week to week, and comparing the entries
+        # directly is much cheaper than building their sorted versions
+        elif previous != entries and _version(previous) != _version(entries):
+            category, item = entries[0]
+            changed.append(
+                {
+                    "category": category,
+                    "title": item["title"],
+                    "before": _fields(previous),
+                    "after": _fields(entries),
+                }
+            )
+        else:
+            unchanged += 1
+
+    for key, entries in before.items():
+        if key not in after:
+            removed.extend({"category": c, **item} for c, item in entries)
+
+    return {
+        "from": old.get("timestamp"),
+        "to": new.get("timestamp"),
+        "counts": {
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+            "unchanged": unchanged,
+        },
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+    }
+
+
+def print_delta(delta: dict):
+    """
+    Print a delta as a readable report
+
+    Args:
+        delta (dict): Result of diff_snapshots
+    """
+    print(f"{delta['from']} → {delta['to']}")
+
+    for item in delta["added"]:
+        print(f"+ [{item['category']}] {item['title']}: {item['offer']}")
+    for item in delta["removed"]:
+        print(f"- [{item['category']}] {item['title']}: {item['offer']}")
+    for item in delta["changed"]:
+        before = "; ".join(str(v["offer"]) for v in item["before"])
+        after = "; ".join(str(v["offer"]) for v in item["after"])
+        print(f"~ [{item['category']}] {item['title']}: {before} → {after}")
+
+    counts = delta["counts"]
+    print(
+        f"{counts['added']} added, {counts['removed']} removed, "
+        f"{counts['changed']} changed, {counts['unchanged']} unchanged"
+    )
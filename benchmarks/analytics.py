@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+"""Benchmark for the vectorized deal analytics.
+
+Sanitizes publix.json (or any grouped JSON file), makes --sources copies of
+its deals with prices shifted per copy, as if scraped in different weeks or
+stores, and repeats them to --rows items in total. Each copy is written as a
+columnar export. The analytics are then timed both ways:
+
+- numpy: load_deals (mapping the exports), effective_prices, top_deals and
+  compare_sources from autoply.analytics
+- loop: the same computations as a Python loop over sanitized item dicts
+
+Both must agree before anything is reported.
+
+Run from the repo root (needs numpy):
+
+    python -m benchmarks.analytics --rows 1000000 --out bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from autoply.analytics import compare_sources, effective_prices, load_deals, top_deals
+from autoply.columnar import ColumnBuilder
+from autoply.snapshots import normalize
+from sanitizer import DealRecord, sanitize_records
+
+_PRICE_FIELDS = ("amount", "unit_price", "total_price")
+
+
+def shifted(parsed: dict | None, factor: float) -> dict | None:
+    if not parsed:
+        return parsed
+    return {
+        k: round(v * factor, 2) if k in _PRICE_FIELDS else v for k, v in parsed.items()
+    }
+
+
+def build_sources(source: Path, sources: int) -> list:
+    """
+    Sanitized rows of every source, prices shifted by up to 10% per source
+
+    Args:
+        source (Path): Grouped JSON file, e.g. publix.json
+        sources (int): Number of sources
+
+    Returns:
+        list: Per source, a list of (category, title, savings_parsed,
+            offer_parsed) rows
+    """
+    data = json.loads(source.read_text(encoding="utf-8"))
+    records = sanitize_records(data)
+
+    base = [
+        (section.category, item)
+        for section in records.deals
+        for item in section.items or ()
+        if isinstance(item, DealRecord)
+    ]
+    return [
+        [
+            (
+                category,
+                item.title,
+                item.savings_parsed,
+                shifted(item.offer_parsed, 1 + (i * 7 + s * 3) % 11 / 100),
+            )
+            for i, (category, item) in enumerate(base)
+        ]
+        for s in range(sources)
+    ]
+
+
+def write_sources(rows: list, repeat: int, out_dir: Path) -> list:
+    paths = []
+
+    for s, source_rows in enumerate(rows):
+        builder = ColumnBuilder(f"source-{s}")
+        for row in source_rows:
+            builder.add(*row)
+
+        # Repeat the rows in place rather than adding them again; the
+        # parsed columns are expanded from these when written
+        builder._category *= repeat
+        builder._title *= repeat
+        builder._pair *= repeat
+
+        path = out_dir / f"source-{s}.cols"
+        builder.write(path)
+        paths.append(path)
+
+    return paths
+
+
+def loop_prices(savings: dict | None, offer: dict | None) -> tuple:
+    # autoply.analytics.effective_prices, one item at a time
+    savings = savings or {}
+    offer = offer or {}
+    kind = offer.get("kind")
+    amount = savings.get("amount")
+    savings_unit = savings.get("unit")
+
+    if kind == "bogo":
+        if amount is None:
+            return math.nan, math.nan, math.nan, savings_unit or "each"
+        regular = amount / offer["get_qty"]
+        buy = offer["buy_qty"]
+        effective = regular * buy / (buy + offer["get_qty"])
+        unit = savings_unit or "each"
+    elif kind == "price":
+        effective, unit = offer["amount"], offer.get("unit") or "each"
+    elif kind == "multibuy":
+        effective, unit = offer["unit_price"], "each"
+    else:
+        return math.nan, math.nan, math.nan, None
+
+    if kind != "bogo":
+        same_unit = savings_unit is None or savings_unit == unit
+        regular = effective + amount if amount is not None and same_unit else math.nan
+
+    discount = (regular - effective) / regular * 100 if regular else math.nan
+    return effective, regular, discount, unit
+
+
+def run_loop(rows: list, k: int) -> dict:
+    timings = {}
+
+    start = time.perf_counter()
+    priced = [
+        (s, category, title, *loop_prices(savings, offer))
+        for s, category, title, savings, offer in rows
+    ]
+    timings["effective_prices_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    by_category = {}
+    for i, row in enumerate(priced):
+        if row[5] == row[5]:
+            by_category.setdefault(row[1], []).append((-row[5], row[3], i))
+    top = [i for category in by_category.values() for _, _, i in sorted(category)[:k]]
+    timings["top_deals_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cheapest = {}
+    for s, _, title, effective, _, _, unit in priced:
+        if effective == effective and title is not None:
+            per_source = cheapest.setdefault((normalize(title), unit), {})
+            if effective < per_source.get(s, math.inf):
+                per_source[s] = effective
+    spreads = []
+    for key, per_source in cheapest.items():
+        if len(per_source) >= 2:
+            best, worst = min(per_source.values()), max(per_source.values())
+            spreads.append(((worst - best) / worst * 100, key))
+    spreads.sort(reverse=True)
+    timings["compare_sources_s"] = time.perf_counter() - start
+
+    return {
+        "timings": timings,
+        "effective": [row[3] for row in priced],
+        "top": len(top),
+        "compared": len(spreads),
+        "max_spread": spreads[0][0] if spreads else None,
+    }
+
+
+def run_numpy(paths: list, k: int) -> dict:
+    timings = {}
+
+    start = time.perf_counter()
+    deals = load_deals(paths)
+    timings["load_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prices = effective_prices(deals)
+    timings["effective_prices_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top = top_deals(deals, k=k, prices=prices)
+    timings["top_deals_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compared = compare_sources(deals, limit=None, prices=prices)
+    timings["compare_sources_s"] = time.perf_counter() - start
+
+    return {
+        "timings": timings,
+        "effective": prices["effective"],
+        "top": len(top),
+        "compared": len(compared),
+        "max_spread": compared[0]["spread_pct"] if compared else None,
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    rows = build_sources(args.source, args.sources)
+    repeat = max(1, args.rows // (len(rows[0]) * args.sources))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_sources(rows, repeat, Path(tmp))
+        vectorized = run_numpy(paths, args.k)
+
+        flat = [
+            (s, *row)
+            for s, source_rows in enumerate(rows)
+            for row in source_rows * repeat
+        ]
+        loop = run_loop(flat, args.k)
+        del flat
+
+        if not np.allclose(vectorized["effective"], loop["effective"], equal_nan=True):
+            raise SystemExit("effective prices differ between numpy and loop")
+        for check in ("top", "compared"):
+            if vectorized[check] != loop[check]:
+                raise SystemExit(f"{check} differs between numpy and loop")
+        if not math.isclose(
+            vectorized["max_spread"] or 0, round(loop["max_spread"] or 0, 2)
+        ):
+            raise SystemExit("largest spread differs between numpy and loop")
+
+        items = len(vectorized["effective"])
+        results = []
+        for name, result in (("numpy", vectorized), ("loop", loop)):
+            timings = {k: round(v, 4) for k, v in result["timings"].items()}
+            total = sum(result["timings"].values())
+            results.append(
+                {
+                    "engine": name,
+                    **timings,
+                    "total_s": round(total, 4),
+                    "items_per_s": round(items / total) if total else None,
+                }
+            )
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "source": str(args.source),
+        "sources": args.sources,
+        "items": items,
+        "results": results,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark vectorized deal analytics against a Python loop.",
+    )
+    parser.add_argument(
+        "--source",
+        type=Path,
+        default=Path("publix.json"),
+        help="Grouped JSON file to build the sources from (default: publix.json)",
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=1_000_000,
+        help="Items across all sources (default: 1000000)",
+    )
+    parser.add_argument(
+        "--sources",
+        type=int,
+        default=4,
+        help="Weeks or stores to compare (default: 4)",
+    )
+    parser.add_argument(
+        "-k", type=int, default=5, help="Top deals per category (default: 5)"
+    )
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=None,
+        help="Also write the results JSON to this path",
+    )
+
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
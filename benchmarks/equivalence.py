@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+
+"""Equivalence checks for the sanitizer rewrites.
+
+Each check compares a rewritten part of sanitizer.py with the behaviour it
+replaced and exits with an error on the first disagreement, so a change to
+it can be verified against the old behaviour before it lands:
+
+- parsers: the table-driven parse_savings and parse_offer against the regex
+  cascades they replaced (kept below as they were), on every string in the
+  source file and on --fuzz generated strings
+- stream: --stream output against the default (records) mode, byte for byte
+  apart from generated_at, compact and indented, grouped and NDJSON, for the
+  source file and edge-case payloads read in chunks down to one character
+- repair: load_json_maybe_repair against the scanner it replaced (kept in
+  benchmarks/repair.py) on the source file cut at --cuts random bytes,
+  compact and indented: it must load whatever the old loader loaded, to the
+  same result, and otherwise salvage every item that ends before the cut
+
+Run from the repo root:
+
+    python -m benchmarks.equivalence               # every check
+    python -m benchmarks.equivalence parsers --fuzz 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import io
+import json
+import random
+import re
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from benchmarks.repair import legacy_load
+from sanitizer import (
+    load_json_maybe_repair,
+    parse_offer,
+    parse_savings,
+    sanitize_records,
+    sanitize_stream,
+    write_records,
+)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _legacy_norm_ws(text: str) -> str:
+    return _WS_RE.sub(" ", text).strip()
+
+
+def _legacy_safe_float(value: str) -> float | None:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _legacy_norm_unit(unit: str | None) -> str | None:
+    if not unit:
+        return None
+    u = unit.strip().lower()
+    if u in {"lb", "lbs", "pound", "pounds"}:
+        return "lb"
+    if u in {"ea", "each"}:
+        return "each"
+    return u
+
+
+def legacy_parse_savings(savings: str | None) -> dict[str, Any] | None:
+    # The regex cascade parse_savings used before the rule tables
+    if savings is None:
+        return None
+
+    s = _legacy_norm_ws(savings)
+    if not s:
+        return None
+
+    low = s.lower()
+    if low in {"your choice", "surprisingly low price"}:
+        return {"kind": "text", "text": s}
+
+    m = re.match(
+        r"^save\s+up\s+to\s*\$?\s*(\d+(?:\.\d+)?)\s*([A-Za-z]+)?\s*$",
+        s,
+        flags=re.I,
+    )
+    if m:
+        amount = _legacy_safe_float(m.group(1))
+        unit = _legacy_norm_unit(m.group(2))
+        if amount is None:
+            return {"kind": "text", "text": s}
+        return {
+            "kind": "save_up_to",
+            "amount": amount,
+            "unit": unit,
+            "currency": "USD",
+        }
+
+    m = re.match(
+        r"^save\s*\$?\s*(\d+(?:\.\d+)?)\s*([A-Za-z]+)?\s*$",
+        s,
+        flags=re.I,
+    )
+    if m:
+        amount = _legacy_safe_float(m.group(1))
+        unit = _legacy_norm_unit(m.group(2))
+        if amount is None:
+            return {"kind": "text", "text": s}
+        return {
+            "kind": "save",
+            "amount": amount,
+            "unit": unit,
+            "currency": "USD",
+        }
+
+    return {"kind": "text", "text": s}
+
+
+def legacy_parse_offer(offer: str | None) -> dict[str, Any] | None:
+    # The regex cascade parse_offer used before the rule tables
+    if offer is None:
+        return None
+
+    s = _legacy_norm_ws(offer)
+    if not s:
+        return None
+
+    low = s.lower()
+
+    m = re.match(r"^buy\s+(\d+)\s+get\s+(\d+)\s+free$", s, flags=re.I)
+    if m:
+        return {
+            "kind": "bogo",
+            "buy_qty": int(m.group(1)),
+            "get_qty": int(m.group(2)),
+            "free": True,
+        }
+
+    m = re.match(r"^(\d+)\s+for\s+\$?\s*(\d+(?:\.\d+)?)\s*$", s, flags=re.I)
+    if m:
+        qty = int(m.group(1))
+        total = _legacy_safe_float(m.group(2))
+        if total is None or qty <= 0:
+            return {"kind": "text", "text": s}
+        return {
+            "kind": "multibuy",
+            "qty": qty,
+            "total_price": total,
+            "unit_price": round(total / qty, 4),
+            "currency": "USD",
+        }
+
+    m = re.match(r"^(\d+)\s*/\s*\$?\s*(\d+(?:\.\d+)?)\s*$", s, flags=re.I)
+    if m:
+        qty = int(m.group(1))
+        total = _legacy_safe_float(m.group(2))
+        if total is None or qty <= 0:
+            return {"kind": "text", "text": s}
+        return {
+            "kind": "multibuy",
+            "qty": qty,
+            "total_price": total,
+            "unit_price": round(total / qty, 4),
+            "currency": "USD",
+        }
+
+    m = re.match(
+        r"^\$?\s*(\d+(?:\.\d+)?)\s*off\s+with\s+mfr\s+digital\s+coupon\s*$",
+        s,
+        flags=re.I,
+    )
+    if m:
+        amount_off = _legacy_safe_float(m.group(1))
+        if amount_off is None:
+            return {"kind": "text", "text": s}
+        return {
+            "kind": "coupon",
+            "amount_off": amount_off,
+            "currency": "USD",
+            "scope": "mfr_digital_coupon",
+        }
+
+    m = re.match(r"^sale\s+price\s+\$?\s*(\d+(?:\.\d+)?)\s*$", s, flags=re.I)
+    if m:
+        amount = _legacy_safe_float(m.group(1))
+        if amount is None:
+            return {"kind": "text", "text": s}
+        return {"kind": "price", "amount": amount, "unit": None, "currency": "USD"}
+
+    m = re.match(
+        r"^\$\s*(\d+(?:\.\d+)?)\s*(lb|lbs|each|ea)?\s*$",
+        s,
+        flags=re.I,
+    )
+    if m:
+        amount = _legacy_safe_float(m.group(1))
+        unit = _legacy_norm_unit(m.group(2))
+        if amount is None:
+            return {"kind": "text", "text": s}
+        return {"kind": "price", "amount": amount, "unit": unit, "currency": "USD"}
+
+    if low == "surprisingly low price":
+        return {"kind": "text", "text": s}
+
+    return {"kind": "text", "text": s}
+
+
+# Pieces the fuzzer joins into savings and offer strings: the words of every
+# rule, in odd cases and spacing, plus near misses and noise
+_WORDS = (
+    "save", "Save", "SAVE", "up", "Up", "to", "To", "buy", "Buy", "get", "Get",
+    "free", "FREE", "for", "FOR", "off", "OFF", "with", "WITH", "mfr", "MFR",
+    "digital", "coupon", "Coupon", "sale", "Sale", "price", "Price", "lb",
+    "Lb", "lbs", "LBS", "each", "ea", "EA", "pound", "pounds", "oz", "your",
+    "choice", "Surprisingly", "Low", "$", "/", "-", ".", "½", "é", "x",
+)  # fmt: skip
+_SPACES = ("", " ", " ", " ", " ", "  ", "\t", "\n", "\xa0", " ")
+
+
+def _number(rng: random.Random) -> str:
+    whole = str(rng.choice((0, 1, 2, 3, 10, 12, 99, 1000, rng.randrange(10**6))))
+    roll = rng.random()
+    if roll < 0.4:
+        return f"{whole}.{rng.randrange(100):02d}"
+    if roll < 0.5:
+        return f"{whole}."
+    if roll < 0.55:
+        return f"{whole}.{rng.randrange(10)}.{rng.randrange(10)}"
+    return whole
+
+
+def fuzz_strings(rng: random.Random, count: int) -> list:
+    """
+    Savings and offer-like strings, from valid to nearly valid to noise
+
+    Args:
+        rng (random.Random): Seeded generator
+        count (int): Strings to make
+
+    Returns:
+        list: The strings
+    """
+    # N is a number, U a unit; the joins between tokens are random spacing,
+    # often none, so "$ N" also comes out as "$12.99"
+    templates = (
+        "save up to $ N U",
+        "save $ N U",
+        "save N",
+        "buy N get N free",
+        "N for $ N",
+        "N / $ N",
+        "N / N",
+        "$ N off with mfr digital coupon",
+        "sale price $ N",
+        "$ N U",
+        "N U",
+    )
+    strings = []
+
+    for _ in range(count):
+        if rng.random() < 0.7:
+            tokens = rng.choice(templates).split()
+        else:
+            tokens = ["W"] * rng.randrange(1, 7)
+
+        parts = []
+        for token in tokens:
+            if token == "N":
+                piece = _number(rng)
+            elif token == "U":
+                piece = rng.choice(("lb", "Lb", "lbs", "each", "ea", "pound", ""))
+            elif token == "W" or rng.random() < 0.05:
+                piece = rng.choice(_WORDS) if rng.random() < 0.8 else _number(rng)
+            else:
+                piece = token.upper() if rng.random() < 0.2 else token
+            parts.append(piece)
+            parts.append(rng.choice(_SPACES))
+
+        text = rng.choice(_SPACES) + "".join(parts)
+        strings.append(text if rng.random() < 0.9 else text.replace("$", ""))
+
+    return strings
+
+
+def check_parsers(args: argparse.Namespace) -> dict:
+    data = json.loads(args.source.read_text(encoding="utf-8"))
+    savings, offers = set(), set()
+    for cat in data["deals"]:
+        for item in cat["items"]:
+            savings.add(item.get("savings"))
+            offers.add(item.get("offer"))
+
+    fuzzed = fuzz_strings(random.Random(args.seed), args.fuzz)
+    pairs = (
+        ("parse_savings", parse_savings, legacy_parse_savings, [*savings, *fuzzed]),
+        ("parse_offer", parse_offer, legacy_parse_offer, [*offers, *fuzzed]),
+    )
+
+    for name, new, old, inputs in pairs:
+        for text in inputs:
+            if new(text) != old(text):
+                raise SystemExit(
+                    f"{name} differs on {text!r}: {new(text)} != {old(text)}"
+                )
+
+    return {"source_strings": len(savings) + len(offers), "fuzzed": len(fuzzed)}
+
+
+_GENERATED_AT = re.compile(r'"generated_at": "[^"]*"')
+
+
+class ChunkedReader:
+    """Text file stand-in that returns at most size characters per read."""
+
+    def __init__(self, text: str, size: int):
+        self._text = text
+        self._size = size
+        self._pos = 0
+
+    def read(self, n: int = -1) -> str:
+        n = self._size if n < 0 else min(n, self._size)
+        chunk = self._text[self._pos : self._pos + n]
+        self._pos += len(chunk)
+        return chunk
+
+
+def stream_cases(data: dict) -> dict:
+    """
+    Payloads the stream tokenizer and writer must handle like the default mode
+
+    Args:
+        data (dict): Grouped payload, e.g. publix.json
+
+    Returns:
+        dict: Case name to payload
+    """
+    first = data["deals"][0]
+    items = first["items"][:3]
+    return {
+        "source": data,
+        "empty": {"timestamp": data.get("timestamp"), "deals": []},
+        "empty and null sections": {
+            "deals": [
+                {"category": "Empty", "items": []},
+                {"category": "Null", "items": None},
+                {"category": None, "items": items},
+                {"items": items},
+            ]
+        },
+        "non-dict items": {
+            "deals": [{"category": "Mixed", "items": [1, "x", None, *items, []]}]
+        },
+        "items before category": {
+            "deals": [{"items": items, "extra": {"a": [1, 2]}, "category": "Late"}]
+        },
+        "meta first": {"meta": {"stale": True}, **data, "deals": data["deals"][:2]},
+        "meta between": {
+            "timestamp": data.get("timestamp"),
+            "meta": {},
+            "deals": data["deals"][:2],
+            "after": "kept",
+        },
+        "unknown keys": {
+            "source": "test",
+            "deals": [{**first, "note": 'ü ✓ "quoted"'}],
+            "tail": [None, 1.5, {"k": []}],
+        },
+        "deals not a list": {"timestamp": None, "deals": {"category": "x"}},
+    }
+
+
+def check_stream(args: argparse.Namespace) -> dict:
+    data = json.loads(args.source.read_text(encoding="utf-8"))
+    compared = 0
+
+    for name, payload in stream_cases(data).items():
+        # Small chunks put every token boundary across a refill; the source
+        # file is large, so only a few sizes are run on it
+        sizes = (7, 4096) if name == "source" else (1, 3, 64)
+
+        for input_indent in (None, 1):
+            text = json.dumps(payload, ensure_ascii=False, indent=input_indent)
+
+            for indent in (None, 2):
+                for ndjson in (False, True):
+                    records = sanitize_records(copy.deepcopy(payload))
+                    expected = io.StringIO()
+                    write_records(records, expected, indent=indent, ndjson=ndjson)
+                    expected = _GENERATED_AT.sub("", expected.getvalue())
+                    expected_meta = {**records.meta, "generated_at": None}
+
+                    for size in sizes:
+                        out = io.StringIO()
+                        meta = sanitize_stream(
+                            ChunkedReader(text, size),
+                            out,
+                            indent=indent,
+                            ndjson=ndjson,
+                        )
+                        if (
+                            _GENERATED_AT.sub("", out.getvalue()) != expected
+                            or {**meta, "generated_at": None} != expected_meta
+                        ):
+                            raise SystemExit(
+                                f"stream output differs for {name!r} (input "
+                                f"indent {input_indent}, indent {indent}, "
+                                f"ndjson {ndjson}, chunk {size})"
+                            )
+                        compared += 1
+
+    return {"cases": len(stream_cases(data)), "compared": compared}
+
+
+def item_ends(text: str, data: dict, indent: int | None) -> list:
+    """
+    Character offset just past each item in a dumped grouped payload
+
+    Args:
+        text (str): json.dumps(data, ensure_ascii=False, indent=indent)
+        data (dict): Grouped payload
+        indent (int | None): Indent it was dumped with
+
+    Returns:
+        list: One offset per item, in order
+    """
+    ends, pos = [], 0
+    for cat in data["deals"]:
+        for item in cat["items"]:
+            dumped = json.dumps(item, ensure_ascii=False, indent=indent)
+            if indent is not None:
+                # Items sit four levels deep: root, deals, category, items
+                dumped = dumped.replace("\n", "\n" + " " * (4 * indent))
+            pos = text.index(dumped, pos) + len(dumped)
+            ends.append(pos)
+    return ends
+
+
+def _items(data: Any) -> list:
+    return [item for cat in data["deals"] for item in cat.get("items") or []]
+
+
+def check_repair(args: argparse.Namespace) -> dict:
+    data = json.loads(args.source.read_text(encoding="utf-8"))
+    originals = _items(data)
+    rng = random.Random(args.seed)
+    legacy_loaded = salvaged = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cut.json"
+
+        for indent in (None, 2):
+            text = json.dumps(data, ensure_ascii=False, indent=indent)
+            raw = text.encode("utf-8")
+            # Byte offsets, so cuts can land inside a multi-byte character
+            ends = [
+                len(text[:end].encode("utf-8")) for end in item_ends(text, data, indent)
+            ]
+
+            for _ in range(args.cuts):
+                cut = rng.randrange(1, len(raw))
+                path.write_bytes(raw[:cut])
+                where = f"cut at byte {cut} of the {'indented' if indent else 'compact'} source"
+                complete = sum(1 for end in ends if end <= cut)
+
+                try:
+                    old = legacy_load(path)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    old = None
+
+                try:
+                    new = load_json_maybe_repair(path).data
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    if old is not None or complete:
+                        raise SystemExit(f"repair failed to load {where}")
+                    continue
+
+                if old is not None:
+                    legacy_loaded += 1
+                    if new != old:
+                        raise SystemExit(f"repair differs from the old loader, {where}")
+
+                items = _items(new)
+                # Closing brackets alone can also keep the cut item, up to its
+                # last complete value
+                partial = items[complete:]
+                if items[:complete] != originals[:complete] or (
+                    partial
+                    and (
+                        len(partial) > 1
+                        or complete == len(originals)
+                        or not partial[0].items() <= originals[complete].items()
+                    )
+                ):
+                    raise SystemExit(f"repair lost or altered items, {where}")
+                salvaged += len(items)
+
+    return {
+        "cuts": 2 * args.cuts,
+        "legacy_loaded": legacy_loaded,
+        "salvaged_items": salvaged,
+    }
+
+
+CHECKS = {"parsers": check_parsers, "stream": check_stream, "repair": check_repair}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check the sanitizer rewrites against the behaviour they "
+        "replaced.",
+    )
+    parser.add_argument(
+        "checks",
+        nargs="*",
+        help=f"Checks to run (default: all of {', '.join(CHECKS)})",
+    )
+    parser.add_argument(
+        "--source",
+        type=Path,
+        default=Path("publix.json"),
+        help="Grouped JSON file to check with (default: publix.json)",
+    )
+    parser.add_argument(
+        "--fuzz",
+        type=int,
+        default=20_000,
+        help="parsers: generated strings to compare (default: 20000)",
+    )
+    parser.add_argument(
+        "--cuts",
+        type=int,
+        default=500,
+        help="repair: random cuts per layout (default: 500)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+
+    for name in args.checks or CHECKS:
+        print(json.dumps({"check": name, "ok": True, **CHECKS[name](args)}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
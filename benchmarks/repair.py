@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+"""Benchmark for the sanitizer's truncation repair.
+
+Builds an enlarged payload from publix.json (or any grouped JSON file),
+truncates it at several points, and loads each truncated file with both
+load_json_maybe_repair (single read, regex scanner, prefix salvage) and the
+scanner it replaced, kept below as it was. Reports wall time and how many
+items each recovered as JSON.
+
+Run from the repo root:
+
+    python -m benchmarks.repair --repeat 200 --out bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sanitizer import _count_items, load_json_maybe_repair
+
+
+def legacy_repair_truncated_json(text: str) -> str | None:
+    # The character-by-character scanner load_json_maybe_repair used before
+    s = text.lstrip("﻿")
+
+    stack: list[str] = []
+    in_string = False
+    escape = False
+
+    for ch in s:
+        if in_string:
+            if escape:
+                escape = False
+                continue
+            if ch == "\\":
+                escape = True
+                continue
+            if ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+            continue
+
+        if ch == "{":
+            stack.append("}")
+        elif ch == "[":
+            stack.append("]")
+        elif ch in {"}", "]"}:
+            if stack and stack[-1] == ch:
+                stack.pop()
+            else:
+                return None
+
+    if in_string:
+        return None
+
+    if not stack:
+        return None
+
+    repaired = s.rstrip()
+    repaired = re.sub(r",\s*$", "", repaired)
+    if re.search(r":\s*$", repaired):
+        return None
+
+    return repaired + "".join(reversed(stack))
+
+
+def legacy_load(path: Path):
+    # Read once to parse, again to repair, as load_json_maybe_repair did
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as e:
+        msg = str(e).lower()
+        text = path.read_text(encoding="utf-8", errors="replace")
+        if "unterminated" in msg or "expecting" in msg:
+            repaired_text = legacy_repair_truncated_json(text)
+            if repaired_text:
+                try:
+                    return json.loads(repaired_text)
+                except json.JSONDecodeError:
+                    pass
+        raise
+
+
+def timed(load, path: Path) -> tuple[float, int | None]:
+    start = time.perf_counter()
+    try:
+        data = load(path)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return time.perf_counter() - start, None
+    return time.perf_counter() - start, _count_items(data)
+
+
+def run(args: argparse.Namespace) -> dict:
+    data = json.loads(args.source.read_text(encoding="utf-8"))
+    data = {**data, "deals": data["deals"] * args.repeat}
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    total = _count_items(data)
+
+    # Cut between values (old scanner can repair) and inside a string (it
+    # cannot), near the end so both scanners walk almost the whole file
+    end = int(len(text) * args.fraction)
+    between = text.rfind("}", 0, end) + 1
+    inside = text.rfind('"title": "', 0, end) + len('"title": "') + 3
+    cuts = {"between-values": between, "mid-string": inside}
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, cut in cuts.items():
+            path = Path(tmp) / f"{name}.json"
+            path.write_text(text[:cut], encoding="utf-8")
+
+            legacy_s, legacy_items = timed(legacy_load, path)
+            new_s, new_items = timed(lambda p: load_json_maybe_repair(p).data, path)
+
+            results.append(
+                {
+                    "cut": name,
+                    "bytes": path.stat().st_size,
+                    "legacy_s": round(legacy_s, 4),
+                    "legacy_items": legacy_items,
+                    "new_s": round(new_s, 4),
+                    "new_items": new_items,
+                    "speedup": round(legacy_s / new_s, 2) if new_s else None,
+                }
+            )
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "source": str(args.source),
+        "items": total,
+        "results": results,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark truncation repair against the previous scanner.",
+    )
+    parser.add_argument(
+        "--source",
+        type=Path,
+        default=Path("publix.json"),
+        help="Grouped JSON file to enlarge (default: publix.json)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=200,
+        help="Copies of every category in the payload (default: 200)",
+    )
+    parser.add_argument(
+        "--fraction",
+        type=float,
+        default=0.95,
+        help="Where to truncate, as a fraction of the file (default: 0.95)",
+    )
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=None,
+        help="Also write the results JSON to this path",
+    )
+
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
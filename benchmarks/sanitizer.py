@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""Benchmark for the sanitizer core.
+
+Sanitizes a payload built by repeating publix.json (or any grouped JSON file)
+with each core and reports wall time, peak traced memory, and the memory and
+heap blocks still held per item afterwards, as JSON:
+
+- copy: sanitize_publix_payload, deep copy plus four keys per item dict
+- in-place: sanitize_publix_payload(in_place=True), no copy
+- records: sanitize_records, compact DealRecords with interned strings and
+  shared parsed dicts
+
+Every core's serialized output is checked to be byte-identical to the copy
+core's before anything is reported.
+
+Run from the repo root:
+
+    python -m benchmarks.sanitizer --repeat 50 --out bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import io
+import json
+import re
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sanitizer import sanitize_publix_payload, sanitize_records, write_records
+
+_GENERATED_AT = re.compile(r'"generated_at": "[^"]*"')
+
+
+def build_payload(source: Path, repeat: int) -> dict:
+    """
+    Repeat a grouped payload's categories to reach a realistic dump size
+
+    Args:
+        source (Path): Grouped JSON file, e.g. publix.json
+        repeat (int): Copies of every category
+
+    Returns:
+        dict: The enlarged payload
+    """
+    data = json.loads(source.read_text(encoding="utf-8"))
+    return {**data, "deals": data["deals"] * repeat}
+
+
+def run_core(name: str, data: dict):
+    if name == "copy":
+        return sanitize_publix_payload(data)[0]
+    if name == "in-place":
+        return sanitize_publix_payload(data, in_place=True)[0]
+    return sanitize_records(data, in_place=True)
+
+
+def serialize(result) -> str:
+    if isinstance(result, dict):
+        text = json.dumps(result, ensure_ascii=False)
+    else:
+        f = io.StringIO()
+        write_records(result, f)
+        text = f.getvalue()
+    return _GENERATED_AT.sub("", text)
+
+
+def measure(name: str, text: str, items: int) -> dict:
+    """
+    Time one core, then trace its memory from parsing the input onwards
+
+    Args:
+        name (str): Core name: copy, in-place or records
+        text (str): Payload JSON; each run parses its own copy
+        items (int): Items in the payload
+
+    Returns:
+        dict: Timings and memory figures for the core
+    """
+    data = json.loads(text)
+    gc.collect()
+    start = time.perf_counter()
+    result = run_core(name, data)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    serialize(result)
+    serialize_s = time.perf_counter() - start
+    del data, result
+
+    gc.collect()
+    tracemalloc.start()
+
+    data = json.loads(text)
+    result = run_core(name, data)
+    # Whatever the core still needs stays referenced through result
+    del data
+    gc.collect()
+
+    held, peak = tracemalloc.get_traced_memory()
+    blocks = sum(
+        stat.count for stat in tracemalloc.take_snapshot().statistics("filename")
+    )
+    tracemalloc.stop()
+    del result
+
+    return {
+        "core": name,
+        "sanitize_s": round(elapsed, 4),
+        "serialize_s": round(serialize_s, 4),
+        "items_per_s": round(items / elapsed) if elapsed else None,
+        "peak_mb": round(peak / 1e6, 2),
+        "held_bytes_per_item": round(held / items, 1),
+        "held_blocks_per_item": round(blocks / items, 2),
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    payload = build_payload(args.source, args.repeat)
+    items = sum(len(cat["items"]) for cat in payload["deals"])
+    text = json.dumps(payload)
+    del payload
+
+    expected = serialize(run_core("copy", json.loads(text)))
+    for name in args.cores:
+        if serialize(run_core(name, json.loads(text))) != expected:
+            raise SystemExit(f"{name} output differs from the copy core")
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "source": str(args.source),
+        "items": items,
+        "results": [measure(name, text, items) for name in args.cores],
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the sanitizer cores on an enlarged weekly ad payload.",
+    )
+    parser.add_argument(
+        "--source",
+        type=Path,
+        default=Path("publix.json"),
+        help="Grouped JSON file to enlarge (default: publix.json)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=50,
+        help="Copies of every category in the payload (default: 50)",
+    )
+    parser.add_argument(
+        "--cores",
+        nargs="+",
+        choices=["copy", "in-place", "records"],
+        default=["copy", "in-place", "records"],
+        help="Cores to benchmark",
+    )
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=None,
+        help="Also write the results JSON to this path",
+    )
+
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+"""Offline benchmark for the weekly ad scraper.
+
+Serves a synthetic weekly ad page (or a saved snapshot of the real one) from a
+local HTTP server, runs ``scrape_publix`` against it headless and reports wall
+time, scroll iterations, browser round trips and deals per second as JSON.
+
+Run from the repo root:
+
+    python -m benchmarks.scrape --cards 100 500 --out bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import html
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from playwright.async_api import Browser, async_playwright
+
+from autoply.__main__ import (
+    VIEWPORT,
+    load_weekly_ad,
+    scrape_publix,
+    tracing,
+)
+
+OFFERS = (
+    ("Save Up To $6.99 Lb", "Buy 1 Get 1 Free"),
+    ("Save Up To $3.29", "Buy 1 Get 1 Free"),
+    (None, "2 for $10.00"),
+    (None, "$8.99 lb"),
+    ("Your Choice", "Sale Price $29.99"),
+)
+
+
+def synthetic_page(cards: int, headings: int) -> str:
+    """
+    Build a weekly ad page using the same selectors as publix.com
+
+    Args:
+        cards (int): Number of deal cards
+        headings (int): Number of category headings the cards are split under
+
+    Returns:
+        str: HTML document
+    """
+    headings = max(1, min(headings, cards))
+    per_heading = -(-cards // headings)
+
+    sections = []
+    for h in range(headings):
+        items = []
+        for i in range(h * per_heading, min(cards, (h + 1) * per_heading)):
+            savings, offer = OFFERS[i % len(OFFERS)]
+            savings_html = (
+                f'<span class="additional-info">{html.escape(savings)}</span>'
+                if savings
+                else ""
+            )
+            items.append(
+                '<div class="card" data-qa="savings-weekly-card">'
+                f'<span data-qa-automation="prod-title">Item {i}</span>'
+                f"{savings_html}"
+                '<div class="p-savings-badge__text">'
+                f"<span>{html.escape(offer)}</span></div></div>"
+            )
+
+        sections.append(
+            f'<h2 id="category-{h}-heading">Category {h}</h2>'
+            f'<div class="grid">{"".join(items)}</div>'
+        )
+
+    return (
+        "<!doctype html><html><head><style>"
+        "body{margin:0;font-family:sans-serif}"
+        ".grid{display:grid;grid-template-columns:repeat(4,1fr);gap:16px;"
+        "padding:16px}"
+        ".card{height:280px;border:1px solid #ccc;display:flex;"
+        "flex-direction:column;gap:8px;padding:8px}"
+        "h2{margin:24px 16px}"
+        "</style></head><body>"
+        f'<div class="weekly-ad-xp-content-wrapper">{"".join(sections)}</div>'
+        "</body></html>"
+    )
+
+
+def serve(document: str) -> ThreadingHTTPServer:
+    """
+    Serve a single HTML document at / from a background thread
+
+    Args:
+        document (str): HTML to serve
+
+    Returns:
+        ThreadingHTTPServer: The running server, bound to a free local port
+    """
+    body = document.encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/":
+                self.send_error(404)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_case(browser: Browser, url: str, batched: bool) -> dict:
+    """
+    Load the served page in a fresh tab and scrape it once
+
+    Args:
+        browser (Browser): Browser to open the tab in
+        url (str): URL of the served page
+        batched (bool): Use the batched viewport extraction
+
+    Returns:
+        dict: Timings and counters for the run
+    """
+    page = await browser.new_page(color_scheme="dark", viewport=VIEWPORT)
+
+    # Keep the scraper's progress output off stdout, which carries the results
+    with tracing() as trace, contextlib.redirect_stdout(sys.stderr):
+        start = time.perf_counter()
+        await load_weekly_ad(page, url)
+        loaded = time.perf_counter()
+        deals = await scrape_publix(page, batched=batched)
+        done = time.perf_counter()
+
+    await page.close()
+
+    scrape_s = done - loaded
+    return {
+        "mode": "batched" if batched else "per-card",
+        "load_s": round(loaded - start, 4),
+        "scrape_s": round(scrape_s, 4),
+        "iterations": len(trace.iterations),
+        "round_trips": sum(trace.counts.values()),
+        "round_trip_counts": dict(trace.counts),
+        "phases": trace.phases,
+        "deals": len(deals),
+        "deals_per_s": round(len(deals) / scrape_s, 2) if scrape_s else None,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.snapshot:
+        pages = [("snapshot", None, args.snapshot.read_text(encoding="utf-8"))]
+    else:
+        pages = [
+            ("synthetic", cards, synthetic_page(cards, args.headings))
+            for cards in args.cards
+        ]
+
+    modes = {"batched": [True], "per-card": [False], "both": [True, False]}
+    results = []
+
+    async with async_playwright() as p:
+        browser = await p.firefox.launch(headless=True)
+
+        for name, cards, document in pages:
+            server = serve(document)
+            url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+            try:
+                for batched in modes[args.mode]:
+                    for run_index in range(args.repeat):
+                        result = await run_case(browser, url, batched)
+                        results.append(
+                            {
+                                "page": name,
+                                "cards": cards,
+                                "headings": None if args.snapshot else args.headings,
+                                "run": run_index,
+                                **result,
+                            }
+                        )
+            finally:
+                server.shutdown()
+
+        await browser.close()
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark scrape_publix against a locally served weekly ad page.",
+    )
+    parser.add_argument(
+        "--cards",
+        type=int,
+        nargs="+",
+        default=[200],
+        help="Card counts for the synthetic page, one benchmark per value",
+    )
+    parser.add_argument(
+        "--headings",
+        type=int,
+        default=10,
+        help="Category headings on the synthetic page",
+    )
+    parser.add_argument(
+        "--snapshot",
+        type=Path,
+        default=None,
+        help="Serve this saved weekly ad HTML instead of a synthetic page",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["batched", "per-card", "both"],
+        default="both",
+        help="Viewport extraction mode(s) to benchmark",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case")
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=None,
+        help="Also write the results JSON to this path",
+    )
+
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
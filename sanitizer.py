@@ -3,14 +3,24 @@
 from __future__ import annotations
 
 import argparse
+import glob
+import hashlib
 import json
+import os
 import re
+import shutil
 import sys
-from collections import Counter
-from dataclasses import dataclass
+import tempfile
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Iterable
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+if TYPE_CHECKING:
+    from autoply.columnar import ColumnBuilder
 
 
 @dataclass(frozen=True)
@@ -18,13 +28,18 @@ class RepairResult:
     data: Any
     repaired: bool
     note: str | None = None
+    # Items in the repaired payload
+    salvaged_items: int | None = None
 
 
-_WS_RE = re.compile(r"\s+")
+# Distinct normalized savings/offer strings kept in each parser's LRU cache.
+# A weekly ad repeats a few hundred strings, so this covers many stores/weeks.
+PARSE_CACHE_SIZE = 4096
 
 
 def _norm_ws(text: str) -> str:
-    return _WS_RE.sub(" ", text).strip()
+    # Same whitespace set as re's \s, without the regex
+    return " ".join(text.split())
 
 
 def _safe_float(value: str) -> float | None:
@@ -45,152 +60,222 @@ def _norm_unit(unit: str | None) -> str | None:
     return u
 
 
-def parse_savings(savings: str | None) -> dict[str, Any] | None:
-    if savings is None:
-        return None
+@dataclass(frozen=True)
+class _Rule:
+    """One parser pattern: its name (used for hit counts), the characters an
+    input can start with for it to apply, the compiled regex, and a builder
+    turning the match into the parsed dict (or None to fall back to text)."""
 
-    s = _norm_ws(savings)
-    if not s:
-        return None
+    name: str
+    first: str
+    regex: re.Pattern
+    build: Callable[[re.Match], dict[str, Any] | None]
 
-    low = s.lower()
-    if low in {"your choice", "surprisingly low price"}:
-        return {"kind": "text", "text": s}
-
-    # Examples:
-    # - Save Up To $5.55 Lb
-    # - Save Up To $11.29
-    # - Save $1.00
-    m = re.match(
-        r"^save\s+up\s+to\s*\$?\s*(\d+(?:\.\d+)?)\s*([A-Za-z]+)?\s*$",
-        s,
-        flags=re.I,
-    )
-    if m:
-        amount = _safe_float(m.group(1))
-        unit = _norm_unit(m.group(2))
-        if amount is None:
-            return {"kind": "text", "text": s}
-        return {
-            "kind": "save_up_to",
-            "amount": amount,
-            "unit": unit,
-            "currency": "USD",
-        }
 
-    m = re.match(
-        r"^save\s*\$?\s*(\d+(?:\.\d+)?)\s*([A-Za-z]+)?\s*$",
-        s,
-        flags=re.I,
-    )
-    if m:
+def _amount_unit(kind: str) -> Callable[[re.Match], dict[str, Any] | None]:
+    def build(m: re.Match) -> dict[str, Any] | None:
         amount = _safe_float(m.group(1))
-        unit = _norm_unit(m.group(2))
         if amount is None:
-            return {"kind": "text", "text": s}
+            return None
         return {
-            "kind": "save",
+            "kind": kind,
             "amount": amount,
-            "unit": unit,
+            "unit": _norm_unit(m.group(2)),
             "currency": "USD",
         }
 
-    return {"kind": "text", "text": s}
+    return build
 
 
-def parse_offer(offer: str | None) -> dict[str, Any] | None:
-    if offer is None:
+def _multibuy(m: re.Match) -> dict[str, Any] | None:
+    qty = int(m.group(1))
+    total = _safe_float(m.group(2))
+    if total is None or qty <= 0:
         return None
+    return {
+        "kind": "multibuy",
+        "qty": qty,
+        "total_price": total,
+        "unit_price": round(total / qty, 4),
+        "currency": "USD",
+    }
 
-    s = _norm_ws(offer)
-    if not s:
+
+def _coupon(m: re.Match) -> dict[str, Any] | None:
+    amount_off = _safe_float(m.group(1))
+    if amount_off is None:
         return None
+    return {
+        "kind": "coupon",
+        "amount_off": amount_off,
+        "currency": "USD",
+        "scope": "mfr_digital_coupon",
+    }
 
-    low = s.lower()
 
+def _price(m: re.Match) -> dict[str, Any] | None:
+    amount = _safe_float(m.group(1))
+    if amount is None:
+        return None
+    unit = _norm_unit(m.group(2)) if m.lastindex and m.lastindex > 1 else None
+    return {"kind": "price", "amount": amount, "unit": unit, "currency": "USD"}
+
+
+_DIGITS = "0123456789"
+
+SAVINGS_RULES: tuple[_Rule, ...] = (
+    # Save Up To $5.55 Lb / Save Up To $11.29
+    _Rule(
+        "save_up_to",
+        "sS",
+        re.compile(r"^save\s+up\s+to\s*\$?\s*(\d+(?:\.\d+)?)\s*([A-Za-z]+)?\s*$", re.I),
+        _amount_unit("save_up_to"),
+    ),
+    # Save $1.00
+    _Rule(
+        "save",
+        "sS",
+        re.compile(r"^save\s*\$?\s*(\d+(?:\.\d+)?)\s*([A-Za-z]+)?\s*$", re.I),
+        _amount_unit("save"),
+    ),
+)
+
+OFFER_RULES: tuple[_Rule, ...] = (
     # Buy 1 Get 1 Free
-    m = re.match(r"^buy\s+(\d+)\s+get\s+(\d+)\s+free$", s, flags=re.I)
-    if m:
-        return {
+    _Rule(
+        "bogo",
+        "bB",
+        re.compile(r"^buy\s+(\d+)\s+get\s+(\d+)\s+free$", re.I),
+        lambda m: {
             "kind": "bogo",
             "buy_qty": int(m.group(1)),
             "get_qty": int(m.group(2)),
             "free": True,
-        }
-
+        },
+    ),
     # 2 for $10.00
-    m = re.match(r"^(\d+)\s+for\s+\$?\s*(\d+(?:\.\d+)?)\s*$", s, flags=re.I)
-    if m:
-        qty = int(m.group(1))
-        total = _safe_float(m.group(2))
-        if total is None or qty <= 0:
-            return {"kind": "text", "text": s}
-        return {
-            "kind": "multibuy",
-            "qty": qty,
-            "total_price": total,
-            "unit_price": round(total / qty, 4),
-            "currency": "USD",
-        }
-
+    _Rule(
+        "multibuy_for",
+        _DIGITS,
+        re.compile(r"^(\d+)\s+for\s+\$?\s*(\d+(?:\.\d+)?)\s*$", re.I),
+        _multibuy,
+    ),
     # 10/$10.00
-    m = re.match(r"^(\d+)\s*/\s*\$?\s*(\d+(?:\.\d+)?)\s*$", s, flags=re.I)
-    if m:
-        qty = int(m.group(1))
-        total = _safe_float(m.group(2))
-        if total is None or qty <= 0:
-            return {"kind": "text", "text": s}
-        return {
-            "kind": "multibuy",
-            "qty": qty,
-            "total_price": total,
-            "unit_price": round(total / qty, 4),
-            "currency": "USD",
-        }
-
+    _Rule(
+        "multibuy_slash",
+        _DIGITS,
+        re.compile(r"^(\d+)\s*/\s*\$?\s*(\d+(?:\.\d+)?)\s*$", re.I),
+        _multibuy,
+    ),
     # $3.00 off WITH MFR DIGITAL COUPON
-    m = re.match(
-        r"^\$?\s*(\d+(?:\.\d+)?)\s*off\s+with\s+mfr\s+digital\s+coupon\s*$",
-        s,
-        flags=re.I,
-    )
-    if m:
-        amount_off = _safe_float(m.group(1))
-        if amount_off is None:
-            return {"kind": "text", "text": s}
-        return {
-            "kind": "coupon",
-            "amount_off": amount_off,
-            "currency": "USD",
-            "scope": "mfr_digital_coupon",
-        }
-
+    _Rule(
+        "coupon",
+        "$" + _DIGITS,
+        re.compile(
+            r"^\$?\s*(\d+(?:\.\d+)?)\s*off\s+with\s+mfr\s+digital\s+coupon\s*$",
+            re.I,
+        ),
+        _coupon,
+    ),
     # Sale Price $29.99
-    m = re.match(r"^sale\s+price\s+\$?\s*(\d+(?:\.\d+)?)\s*$", s, flags=re.I)
-    if m:
-        amount = _safe_float(m.group(1))
-        if amount is None:
-            return {"kind": "text", "text": s}
-        return {"kind": "price", "amount": amount, "unit": None, "currency": "USD"}
-
+    _Rule(
+        "sale_price",
+        "sS",
+        re.compile(r"^sale\s+price\s+\$?\s*(\d+(?:\.\d+)?)\s*$", re.I),
+        _price,
+    ),
     # $8.99 lb / $9.99 each / $3.99
-    m = re.match(
-        r"^\$\s*(\d+(?:\.\d+)?)\s*(lb|lbs|each|ea)?\s*$",
-        s,
-        flags=re.I,
-    )
-    if m:
-        amount = _safe_float(m.group(1))
-        unit = _norm_unit(m.group(2))
-        if amount is None:
-            return {"kind": "text", "text": s}
-        return {"kind": "price", "amount": amount, "unit": unit, "currency": "USD"}
+    _Rule(
+        "price",
+        "$",
+        re.compile(r"^\$\s*(\d+(?:\.\d+)?)\s*(lb|lbs|each|ea)?\s*$", re.I),
+        _price,
+    ),
+)
+
+# Fixed strings that are only ever free text, whatever else they start with
+_SAVINGS_TEXT = frozenset({"your choice", "surprisingly low price"})
+
+
+def _dispatch(rules: tuple[_Rule, ...]) -> dict[str, tuple[_Rule, ...]]:
+    # First-character dispatch: each input is only tried against the rules
+    # that can match its first character, in table order
+    table: dict[str, list[_Rule]] = {}
+    for rule in rules:
+        for ch in rule.first:
+            table.setdefault(ch, []).append(rule)
+    return {ch: tuple(group) for ch, group in table.items()}
+
+
+_SAVINGS_DISPATCH = _dispatch(SAVINGS_RULES)
+_OFFER_DISPATCH = _dispatch(OFFER_RULES)
+
+
+def _run_rules(
+    s: str, dispatch: dict[str, tuple[_Rule, ...]]
+) -> tuple[str, dict[str, Any]]:
+    for rule in dispatch.get(s[0], ()):
+        m = rule.regex.match(s)
+        if m:
+            parsed = rule.build(m)
+            if parsed is None:
+                break
+            return rule.name, parsed
+    return "text", {"kind": "text", "text": s}
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_savings_normalized(s: str) -> tuple[str, dict[str, Any]]:
+    if s.lower() in _SAVINGS_TEXT:
+        return "text", {"kind": "text", "text": s}
+    return _run_rules(s, _SAVINGS_DISPATCH)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_offer_normalized(s: str) -> tuple[str, dict[str, Any]]:
+    return _run_rules(s, _OFFER_DISPATCH)
+
+
+def _parse(
+    value: str | None, parse: Callable[[str], tuple[str, dict[str, Any]]]
+) -> tuple[str, dict[str, Any] | None]:
+    if value is None:
+        return "null", None
+    s = _norm_ws(value)
+    if not s:
+        return "null", None
+    return parse(s)
 
-    # Surprisingly Low Price
-    if low == "surprisingly low price":
-        return {"kind": "text", "text": s}
 
-    return {"kind": "text", "text": s}
+def parse_savings(savings: str | None) -> dict[str, Any] | None:
+    _, parsed = _parse(savings, _parse_savings_normalized)
+    # Cached results are shared, so callers get their own copy
+    return dict(parsed) if parsed is not None else None
+
+
+def parse_offer(offer: str | None) -> dict[str, Any] | None:
+    _, parsed = _parse(offer, _parse_offer_normalized)
+    return dict(parsed) if parsed is not None else None
+
+
+def parse_offers(
+    offers: Iterable[str | None],
+) -> tuple[list[dict[str, Any] | None], Counter[str]]:
+    """Parse many offer strings at once.
+
+    Returns the parsed offers in input order, plus how many inputs each rule
+    in OFFER_RULES matched ("text" for the fallback, "null" for empty input).
+    Identical offers share one parsed dict, so treat the results as read-only.
+    """
+    hits: Counter[str] = Counter()
+    results: list[dict[str, Any] | None] = []
+
+    for offer in offers:
+        name, parsed = _parse(offer, _parse_offer_normalized)
+        hits[name] += 1
+        results.append(parsed)
+
+    return results, hits
 
 
 def _iter_items(data: dict[str, Any]) -> Iterable[tuple[str, dict[str, Any]]]:
@@ -201,158 +286,1207 @@ def _iter_items(data: dict[str, Any]) -> Iterable[tuple[str, dict[str, Any]]]:
                 yield category, item
 
 
-def sanitize_publix_payload(
-    data: dict[str, Any],
-) -> tuple[dict[str, Any], dict[str, Any]]:
-    warnings: list[str] = []
+_TITLE_WARNING = "missing/invalid title in category '{}'"
 
-    ts = data.get("timestamp")
-    if isinstance(ts, str):
-        try:
-            # Publix scraper writes ISO-8601 with offset
-            datetime.fromisoformat(ts)
-        except ValueError:
-            warnings.append("timestamp is not ISO-8601")
-    elif ts is not None:
-        warnings.append("timestamp is not a string")
 
-    offer_kind_counts: Counter[str] = Counter()
-    savings_kind_counts: Counter[str] = Counter()
+@dataclass
+class _Tally:
+    """Report counters, filled in while items are sanitized."""
 
-    # Work in-place on a deep-ish copy that preserves unknown fields.
-    out = json.loads(json.dumps(data))
+    warnings: list[str] = field(default_factory=list)
+    savings_kind_counts: Counter[str] = field(default_factory=Counter)
+    offer_kind_counts: Counter[str] = field(default_factory=Counter)
+    categories: int = 0
+    items: int = 0
 
-    for category, item in _iter_items(out):
-        title = item.get("title")
-        if not isinstance(title, str) or not title.strip():
-            warnings.append(f"missing/invalid title in category '{category}'")
+    def check_timestamp(self, ts: Any) -> None:
+        if isinstance(ts, str):
+            try:
+                # Publix scraper writes ISO-8601 with offset
+                datetime.fromisoformat(ts)
+            except ValueError:
+                self.warnings.append("timestamp is not ISO-8601")
+        elif ts is not None:
+            self.warnings.append("timestamp is not a string")
 
-        savings_raw = item.get("savings")
-        offer_raw = item.get("offer")
+    def parse_item(
+        self, category: str, title: Any, savings_raw: Any, offer_raw: Any
+    ) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        """Parse one item's savings and offer and count it.
 
-        savings_parsed = parse_savings(
-            savings_raw if isinstance(savings_raw, str) else None
+        The parsed dicts come straight from the parser caches, so identical
+        strings share one dict.
+        """
+        self.items += 1
+
+        if not isinstance(title, str) or not title.strip():
+            self.warnings.append(_TITLE_WARNING.format(category))
+
+        _, savings_parsed = _parse(
+            savings_raw if isinstance(savings_raw, str) else None,
+            _parse_savings_normalized,
+        )
+        _, offer_parsed = _parse(
+            offer_raw if isinstance(offer_raw, str) else None, _parse_offer_normalized
         )
-        offer_parsed = parse_offer(offer_raw if isinstance(offer_raw, str) else None)
 
         if savings_parsed is not None:
-            savings_kind_counts[savings_parsed.get("kind", "unknown")] += 1
+            self.savings_kind_counts[savings_parsed.get("kind", "unknown")] += 1
         else:
-            savings_kind_counts["null"] += 1
+            self.savings_kind_counts["null"] += 1
 
         if offer_parsed is not None:
-            offer_kind_counts[offer_parsed.get("kind", "unknown")] += 1
+            self.offer_kind_counts[offer_parsed.get("kind", "unknown")] += 1
         else:
-            offer_kind_counts["null"] += 1
+            self.offer_kind_counts["null"] += 1
+
+        return savings_parsed, offer_parsed
+
+    def sanitize_item(
+        self, category: str, item: dict[str, Any], shared: bool = False
+    ) -> None:
+        """Add the parsed fields to one item dict.
+
+        The item gets its own copies of the cached parsed dicts, so editing
+        it cannot change later parses. shared=True skips the copies, for
+        callers that serialize the item and drop it.
+        """
+        savings_raw = item.get("savings")
+        offer_raw = item.get("offer")
+        savings_parsed, offer_parsed = self.parse_item(
+            category, item.get("title"), savings_raw, offer_raw
+        )
+
+        if not shared:
+            # Parsed dicts hold only scalars, so a shallow copy is enough
+            savings_parsed = dict(savings_parsed) if savings_parsed else savings_parsed
+            offer_parsed = dict(offer_parsed) if offer_parsed else offer_parsed
 
         item["savings_raw"] = savings_raw
         item["offer_raw"] = offer_raw
         item["savings_parsed"] = savings_parsed
         item["offer_parsed"] = offer_parsed
 
-    meta = {
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "categories": len(out.get("deals", []) or []),
-        "items": sum(1 for _ in _iter_items(out)),
-        "savings_kind_counts": dict(savings_kind_counts),
-        "offer_kind_counts": dict(offer_kind_counts),
-        "warnings": warnings,
-    }
+    def meta(self) -> dict[str, Any]:
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "categories": self.categories,
+            "items": self.items,
+            "savings_kind_counts": dict(self.savings_kind_counts),
+            "offer_kind_counts": dict(self.offer_kind_counts),
+            "warnings": self.warnings,
+        }
+
+
+def sanitize_publix_payload(
+    data: dict[str, Any],
+    in_place: bool = False,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Add the parsed fields to every item and build the report.
+
+    By default the input is left untouched and a deep copy is sanitized. With
+    in_place=True the input itself is sanitized and returned, skipping the
+    copy. Either way, every item gets its own parsed dicts, safe to edit.
+    """
+    tally = _Tally()
+    tally.check_timestamp(data.get("timestamp"))
+
+    # Work in-place on a deep-ish copy that preserves unknown fields.
+    out = data if in_place else json.loads(json.dumps(data))
+
+    for category, item in _iter_items(out):
+        tally.sanitize_item(category, item)
+
+    tally.categories = len(out.get("deals", []) or [])
+    meta = tally.meta()
 
     out["meta"] = meta
     return out, meta
 
 
-def _try_load_json(path: Path) -> Any:
-    return json.loads(path.read_text(encoding="utf-8"))
+# Bytes read from the input per refill in --stream mode
+STREAM_CHUNK_SIZE = 1 << 16
 
+# Output held in memory while a member's value is pending in --stream mode;
+# anything beyond it is spooled to a temporary file
+STREAM_HOLD_SIZE = 1 << 20
 
-def _repair_truncated_json(text: str) -> str | None:
-    """Best-effort repair for JSON truncated at EOF.
-
-    This is intentionally conservative: it only attempts to repair when we can
-    balance brackets/braces outside of strings, and it appends the missing
-    closers. It won't fix arbitrary corruption.
-    """
 
-    s = text.lstrip("\ufeff")
+class _StreamReader:
+    """Incremental JSON tokenizer over a text file.
 
-    stack: list[str] = []
-    in_string = False
-    escape = False
+    Holds at most one chunk plus the value being decoded, so memory does not
+    grow with the file. Containers are entered token by token; everything
+    else (strings, numbers, whole items) is decoded with raw_decode.
+    """
 
-    for ch in s:
-        if in_string:
-            if escape:
-                escape = False
+    _WS = " \t\n\r"
+
+    def __init__(self, f, chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, without consuming it ("" at EOF)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in self._WS:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise json.JSONDecodeError(
+                f"Expecting '{ch}'" if got else "Unterminated document",
+                self._buf,
+                self._pos,
+            )
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number or literal touching the end of the buffer may continue
+            # in the next chunk
+            if end == len(self._buf) and self._fill():
                 continue
-            if ch == "\\":
-                escape = True
+            self._pos = end
+            return value
+
+    def members(self):
+        """Yield the keys of the object at the cursor; the caller must consume
+        each key's value before asking for the next key."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
                 continue
-            if ch == '"':
-                in_string = False
-            continue
+            self.expect("}")
+            return
+
+    def elements(self):
+        """Yield once per element of the array at the cursor; the caller must
+        consume each element before asking for the next."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+class _StreamWriter:
+    """Write JSON progressively with exactly the bytes json.dumps(indent=...)
+    would produce for the whole document."""
+
+    def __init__(self, out, indent: int | None) -> None:
+        self._out = out
+        self._indent = indent
+        self._depth = 0
+        self._first = [True]
+        self._held: Any = None
+
+    def _newline(self, depth: int) -> str:
+        return "\n" + " " * (self._indent * depth)
+
+    def _sep(self) -> None:
+        if not self._first[-1]:
+            self._out.write("," if self._indent is not None else ", ")
+        self._first[-1] = False
+        if self._indent is not None:
+            self._out.write(self._newline(self._depth))
+
+    def _dumps(self, value: Any) -> str:
+        text = json.dumps(value, ensure_ascii=False, indent=self._indent)
+        if self._indent is not None and self._depth:
+            text = text.replace("\n", self._newline(self._depth))
+        return text
+
+    def open(self, bracket: str, key: str | None = None) -> None:
+        if self._depth or key is not None:
+            self._sep()
+        if key is not None:
+            self._out.write(json.dumps(key, ensure_ascii=False) + ": ")
+        self._out.write(bracket)
+        self._depth += 1
+        self._first.append(True)
+
+    def close(self, bracket: str) -> None:
+        self._depth -= 1
+        empty = self._first.pop()
+        if self._indent is not None and not empty:
+            self._out.write(self._newline(self._depth))
+        self._out.write(bracket)
+
+    def member(self, key: str, value: Any) -> None:
+        self._sep()
+        self._out.write(json.dumps(key, ensure_ascii=False) + ": " + self._dumps(value))
+
+    def element(self, value: Any) -> None:
+        self._sep()
+        self._out.write(self._dumps(value))
+
+    @property
+    def holding(self) -> bool:
+        return self._held is not None
+
+    def hold(self, key: str) -> None:
+        """Write a member's key now and its value later, at release().
+
+        Everything written in between goes to a spool and follows the value.
+        """
+        self._sep()
+        self._out.write(json.dumps(key, ensure_ascii=False) + ": ")
+        self._held = (self._out, self._depth)
+        self._out = tempfile.SpooledTemporaryFile(
+            max_size=STREAM_HOLD_SIZE, mode="w+", encoding="utf-8"
+        )
+
+    def release(self, value: Any) -> None:
+        out, depth = self._held
+        spool, current = self._out, self._depth
+        self._out, self._depth, self._held = out, depth, None
+        out.write(self._dumps(value))
+        self._depth = current
+
+        spool.seek(0)
+        shutil.copyfileobj(spool, out)
+        spool.close()
+
+
+def sanitize_stream(
+    in_file,
+    out_file,
+    indent: int | None = None,
+    ndjson: bool = False,
+    columns: ColumnBuilder | None = None,
+) -> dict[str, Any]:
+    """Sanitize a payload item by item without loading it.
+
+    Reads deals[].items[] incrementally and writes each item as soon as it is
+    sanitized, either as the usual grouped JSON (byte-identical to the
+    non-streaming output) or as NDJSON with one item per line carrying its
+    category. Memory stays bounded by the largest single item, plus a compact
+    row per item when columns are collected too.
+
+    Returns the report meta, built from counters kept during the pass.
+    """
+    reader = _StreamReader(in_file)
+    writer = None if ndjson else _StreamWriter(out_file, indent)
+    tally = _Tally()
+
+    def emit(category: str, item: Any) -> None:
+        if isinstance(item, dict):
+            # Written and dropped right away, so the cached dicts can be
+            # shared, which also lets columns dedupe rows by dict identity
+            tally.sanitize_item(category, item, shared=True)
+            if columns is not None:
+                columns.add(
+                    category,
+                    item.get("title"),
+                    item["savings_parsed"],
+                    item["offer_parsed"],
+                )
+        if ndjson:
+            if isinstance(item, dict):
+                line = {"category": category, **item}
+                out_file.write(json.dumps(line, ensure_ascii=False) + "\n")
+        else:
+            writer.element(item)
+
+    if reader.peek() != "{":
+        raise ValueError("expected top-level JSON object")
+
+    if writer:
+        writer.open("{")
+
+    for key in reader.members():
+        if key == "timestamp":
+            ts = reader.value()
+            tally.check_timestamp(ts)
+            if columns is not None:
+                columns.timestamp = ts
+            if writer:
+                writer.member(key, ts)
+        elif key == "deals" and reader.peek() == "[":
+            if writer:
+                writer.open("[", key)
+
+            for _ in reader.elements():
+                tally.categories += 1
+                fields: dict[str, Any] = {}
+                # NDJSON lines carry the category, so items that arrive before
+                # their category key (the scraper always writes it first) are
+                # held until it is known. Grouped output writes them straight
+                # away and fixes up their warnings afterwards.
+                pending: list[Any] | None = None
+                retitle: int | None = None
+                first_row = len(columns) if columns is not None else 0
+
+                if writer:
+                    writer.open("{")
+
+                for cat_key in reader.members():
+                    if cat_key == "items" and reader.peek() == "[":
+                        known = "category" in fields
+                        if ndjson and not known:
+                            pending = reader.value()
+                            continue
+                        if not known:
+                            retitle = len(tally.warnings)
+
+                        category = fields.get("category") or "Uncategorized"
+                        if writer:
+                            writer.open("[", cat_key)
+                        for _ in reader.elements():
+                            emit(category, reader.value())
+                        if writer:
+                            writer.close("]")
+                    else:
+                        fields[cat_key] = value = reader.value()
+                        if writer:
+                            writer.member(cat_key, value)
+
+                category = fields.get("category") or "Uncategorized"
+                for item in pending or ():
+                    emit(category, item)
+                if retitle is not None:
+                    for i in range(retitle, len(tally.warnings)):
+                        tally.warnings[i] = _TITLE_WARNING.format(category)
+                    if columns is not None:
+                        columns.set_category(first_row, category)
+
+                if writer:
+                    writer.close("}")
+
+            if writer:
+                writer.close("]")
+        elif key == "meta":
+            # The input was sanitized before. Its meta is replaced where it
+            # stands, like the other modes do, once the new one is known.
+            reader.value()
+            if writer and not writer.holding:
+                writer.hold(key)
+        else:
+            value = reader.value()
+            if writer:
+                writer.member(key, value)
+
+    if reader.peek():
+        raise json.JSONDecodeError("Extra data", "", 0)
+
+    meta = tally.meta()
+    if writer:
+        if writer.holding:
+            writer.release(meta)
+        else:
+            writer.member("meta", meta)
+        writer.close("}")
+
+    return meta
+
+
+# The item layout the scraper writes; items with exactly these keys, in this
+# order, are stored as bare DealRecords
+_DEAL_KEYS = ("title", "savings", "offer")
+
+
+@dataclass(slots=True)
+class DealRecord:
+    """One sanitized item.
 
-        if ch == '"':
-            in_string = True
+    Savings and offer strings are interned and the parsed dicts are shared
+    between identical strings, so a record costs a fraction of the item dict
+    it replaces. Items with fields beyond the scraper's title/savings/offer
+    keep their original dict in ``extra`` so nothing is lost on output.
+    """
+
+    title: Any
+    savings: Any
+    offer: Any
+    savings_parsed: dict[str, Any] | None
+    offer_parsed: dict[str, Any] | None
+    extra: dict[str, Any] | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """The item as the sanitizer has always written it."""
+        if self.extra is not None:
+            item = dict(self.extra)
+            item["savings_raw"] = self.savings
+            item["offer_raw"] = self.offer
+            item["savings_parsed"] = self.savings_parsed
+            item["offer_parsed"] = self.offer_parsed
+            return item
+
+        return {
+            "title": self.title,
+            "savings": self.savings,
+            "offer": self.offer,
+            "savings_raw": self.savings,
+            "offer_raw": self.offer,
+            "savings_parsed": self.savings_parsed,
+            "offer_parsed": self.offer_parsed,
+        }
+
+
+@dataclass(slots=True)
+class CategoryRecords:
+    """A deals[] entry: its own fields in order (items as a placeholder) and
+    its items as DealRecords (non-dict items are kept as they are)."""
+
+    category: str
+    fields: dict[str, Any]
+    items: list[Any] | None
+
+
+@dataclass(slots=True)
+class SanitizedRecords:
+    """A sanitized payload held as records, plus its report meta."""
+
+    fields: dict[str, Any]
+    deals: list[CategoryRecords] | None
+    meta: dict[str, Any]
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def sanitize_records(data: dict[str, Any], in_place: bool = False) -> SanitizedRecords:
+    """Sanitize a loaded payload into compact records in a single pass.
+
+    Items are counted as they are converted. With in_place=True the input's
+    item lists are emptied as each category is converted, so the original
+    dicts can be freed while the records are built; the input is otherwise
+    left untouched.
+    """
+    tally = _Tally()
+    tally.check_timestamp(data.get("timestamp"))
+
+    deals = data.get("deals")
+    sections: list[CategoryRecords] | None = None
+
+    if isinstance(deals, list):
+        sections = []
+        for cat in deals:
+            tally.categories += 1
+            category = _intern(cat.get("category")) or "Uncategorized"
+            items = cat.get("items")
+
+            records: list[Any] | None = None
+            if isinstance(items, list):
+                records = []
+                for item in items:
+                    if not isinstance(item, dict):
+                        records.append(item)
+                        continue
+
+                    savings = _intern(item.get("savings"))
+                    offer = _intern(item.get("offer"))
+                    savings_parsed, offer_parsed = tally.parse_item(
+                        category, item.get("title"), savings, offer
+                    )
+                    records.append(
+                        DealRecord(
+                            item.get("title"),
+                            savings,
+                            offer,
+                            savings_parsed,
+                            offer_parsed,
+                            None if tuple(item) == _DEAL_KEYS else item,
+                        )
+                    )
+
+                if in_place:
+                    cat["items"] = []
+
+            # Keep the entry's other fields in order; items are written from
+            # the records at the placeholder's position
+            fields = dict(cat)
+            if records is not None:
+                fields["items"] = None
+            sections.append(CategoryRecords(category, fields, records))
+
+    fields = dict(data)
+    if sections is not None:
+        fields["deals"] = None
+    # An existing meta (re-sanitizing a sanitized file) is replaced in place
+    fields["meta"] = None
+
+    return SanitizedRecords(fields, sections, tally.meta())
+
+
+def write_records(
+    payload: SanitizedRecords, f, indent: int | None = None, ndjson: bool = False
+) -> None:
+    """Serialize records exactly as sanitize_publix_payload's output would be
+    by json.dumps, or as NDJSON with one item per line."""
+    if ndjson:
+        for section in payload.deals or ():
+            for item in section.items or ():
+                if isinstance(item, DealRecord):
+                    line = {"category": section.category, **item.to_dict()}
+                    f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        return
+
+    writer = _StreamWriter(f, indent)
+    writer.open("{")
+
+    for key, value in payload.fields.items():
+        if key == "meta":
+            writer.member(key, payload.meta)
+            continue
+        if key != "deals" or payload.deals is None:
+            writer.member(key, value)
             continue
 
+        writer.open("[", key)
+        for section in payload.deals:
+            writer.open("{")
+            for cat_key, cat_value in section.fields.items():
+                if cat_key != "items" or section.items is None:
+                    writer.member(cat_key, cat_value)
+                    continue
+
+                # One category's items are materialized at a time, which keeps
+                # memory bounded while letting json encode them in one call
+                writer.member(
+                    cat_key,
+                    [
+                        item.to_dict() if isinstance(item, DealRecord) else item
+                        for item in section.items
+                    ],
+                )
+            writer.close("}")
+        writer.close("]")
+
+    writer.close("}")
+
+
+# Everything up to the next bracket or unterminated string: runs of plain
+# characters and complete strings, so the scanner only stops on structure
+_SKIP_RE = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+
+# Salvage candidates kept while scanning, newest last
+_SALVAGE_CUTS = 8
+
+
+@dataclass(frozen=True)
+class _Scan:
+    stack: tuple[str, ...]
+    in_string: bool
+    # (offset, closers) for the latest points where a JSON array element had
+    # just ended (or an array just opened): cutting there and appending the
+    # closers yields a valid document holding only complete elements
+    cuts: tuple[tuple[int, tuple[str, ...]], ...]
+
+
+def _scan_structure(text: str) -> _Scan | None:
+    stack: list[str] = []
+    cuts: deque[tuple[int, tuple[str, ...]]] = deque(maxlen=_SALVAGE_CUTS)
+    skip, push, pop, cut = _SKIP_RE.match, stack.append, stack.pop, cuts.append
+    pos, n = 0, len(text)
+
+    while True:
+        pos = skip(text, pos).end()
+        if pos >= n:
+            return _Scan(tuple(stack), False, tuple(cuts))
+
+        ch = text[pos]
+        pos += 1
         if ch == "{":
-            stack.append("}")
+            push("}")
         elif ch == "[":
-            stack.append("]")
-        elif ch in {"}", "]"}:
-            if stack and stack[-1] == ch:
-                stack.pop()
-            else:
-                return None
+            push("]")
+            cut((pos, tuple(stack)))
+        elif ch == '"':
+            return _Scan(tuple(stack), True, tuple(cuts))
+        elif stack and stack[-1] == ch:
+            pop()
+            if stack and stack[-1] == "]":
+                cut((pos, tuple(stack)))
+        else:
+            return None
 
-    if in_string:
-        return None
 
-    if not stack:
-        return None
+def _repair_truncated_json(text: str) -> Iterable[tuple[str, str]]:
+    """Candidate repairs for JSON truncated at EOF, best first.
 
-    repaired = s.rstrip()
+    First the conservative repair: when the text stops between values, append
+    the missing closers. Then, for truncation mid-value (inside an item or a
+    string), cut back to the end of the last complete array element and
+    close from there, salvaging the longest prefix of whole items. Structural
+    characters are found with one compiled regex that skips strings and plain
+    text, so the Python loop runs once per bracket rather than per character.
+    """
+
+    s = text.lstrip("\ufeff")
+    scan = _scan_structure(s)
+    if scan is None or not scan.stack:
+        return
+
+    if not scan.in_string:
+        # Remove a dangling trailing comma if present.
+        repaired = re.sub(r",\s*$", "", s.rstrip())
+
+        # If we end with ':' we can't repair by closing alone.
+        if not re.search(r":\s*$", repaired):
+            yield (
+                repaired + "".join(reversed(scan.stack)),
+                "input JSON looked truncated; repaired by appending missing "
+                "brackets/braces",
+            )
+
+    for offset, stack in reversed(scan.cuts):
+        yield (
+            s[:offset] + "".join(reversed(stack)),
+            f"input JSON looked truncated mid-value; salvaged everything up to "
+            f"the last complete array element (character {offset})",
+        )
 
-    # Remove a dangling trailing comma if present.
-    repaired = re.sub(r",\s*$", "", repaired)
 
-    # If we end with ':' we can't safely repair.
-    if re.search(r":\s*$", repaired):
+def _count_items(data: Any) -> int | None:
+    if not isinstance(data, dict):
         return None
-
-    return repaired + "".join(reversed(stack))
+    return sum(1 for _ in _iter_items(data))
 
 
 def load_json_maybe_repair(path: Path) -> RepairResult:
+    raw = path.read_bytes()
     try:
-        return RepairResult(data=_try_load_json(path), repaired=False)
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A file cut inside a multi-byte character (which can only be inside
+        # a string, so parsing below fails as truncated); else it is corrupt
+        if e.start < len(raw) - 3:
+            raise
+        text = raw[: e.start].decode("utf-8")
+
+    try:
+        return RepairResult(data=json.loads(text), repaired=False)
     except json.JSONDecodeError as e:
         # Only attempt repair when it looks like an EOF truncation.
         msg = str(e).lower()
-        text = path.read_text(encoding="utf-8", errors="replace")
 
         if "unterminated" in msg or "expecting" in msg:
-            repaired_text = _repair_truncated_json(text)
-            if repaired_text:
+            for candidate, note in _repair_truncated_json(text):
                 try:
-                    return RepairResult(
-                        data=json.loads(repaired_text),
-                        repaired=True,
-                        note="input JSON looked truncated; repaired by appending missing brackets/braces",
-                    )
+                    data = json.loads(candidate)
                 except json.JSONDecodeError:
-                    pass
+                    continue
+                return RepairResult(
+                    data=data,
+                    repaired=True,
+                    note=note,
+                    salvaged_items=_count_items(data),
+                )
 
         raise
 
 
+class SanitizeError(Exception):
+    """A single input could not be sanitized; the message says why."""
+
+
+def default_paths(
+    in_path: Path, ndjson: bool = False, out_dir: Path | None = None
+) -> tuple[Path, Path]:
+    """Sanitized output and report paths for an input file."""
+    suffix = ".sanitized.ndjson" if ndjson else ".sanitized.json"
+    base = out_dir / in_path.name if out_dir else in_path
+    return (
+        base.with_suffix(base.suffix + suffix),
+        base.with_suffix(base.suffix + ".report.json"),
+    )
+
+
+def columnar_path(out_path: Path) -> Path:
+    """Path of the columnar export written alongside an output.
+
+    The suffix is appended, so the JSON and NDJSON outputs of one input get
+    separate exports.
+    """
+    return out_path.with_name(out_path.name + ".cols")
+
+
+# Modules besides this one whose code shapes the columnar export
+_COLUMNAR_SOURCES = ("autoply/columnar.py", "autoply/history.py")
+
+
+@lru_cache(maxsize=None)
+def parser_fingerprint(
+    pretty: bool, stream: bool, ndjson: bool, columnar: bool = False
+) -> str:
+    """Fingerprint of everything besides the input that shapes the outputs.
+
+    Hashes this module's source (and the columnar export's, when one is
+    written), so any change to the rules, normalization or serialization
+    invalidates earlier outputs, together with the output options.
+    """
+    h = hashlib.sha256(Path(__file__).read_bytes())
+    if columnar:
+        for source in _COLUMNAR_SOURCES:
+            h.update((Path(__file__).parent / source).read_bytes())
+    h.update(f"pretty={pretty},stream={stream},ndjson={ndjson}".encode())
+    h.update(f",columnar={columnar}".encode())
+    return h.hexdigest()[:16]
+
+
+def _column_builder(source: Path) -> ColumnBuilder:
+    # Only --columnar needs the export module (and sqlite3, through history)
+    from autoply.columnar import ColumnBuilder
+
+    return ColumnBuilder(str(source))
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(STREAM_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cached_report(
+    in_path: Path, out_path: Path, report_path: Path, fingerprint: str
+) -> dict[str, Any] | None:
+    """The report of an earlier run whose outputs are still valid, if any.
+
+    The outputs are valid when they were written by the same parser version
+    with the same options, the output (and columnar export, if any) is the
+    size it was written at, and the input still has the content hash
+    recorded in the report. The input is only hashed when its size or mtime
+    changed since.
+    """
+    try:
+        report = json.loads(report_path.read_text(encoding="utf-8"))
+        out_size = out_path.stat().st_size
+        stat = in_path.stat()
+        cache = report.get("cache") if isinstance(report, dict) else None
+        columnar = report.get("columnar") if cache else None
+        columnar_size = Path(columnar).stat().st_size if columnar else None
+    except (OSError, ValueError):
+        return None
+
+    if (
+        not isinstance(cache, dict)
+        or cache.get("fingerprint") != fingerprint
+        or cache.get("output_bytes") != out_size
+        or cache.get("columnar_bytes") != columnar_size
+        or report.get("output") != str(out_path)
+    ):
+        return None
+
+    if (stat.st_size, stat.st_mtime_ns) != (
+        cache.get("input_bytes"),
+        cache.get("input_mtime_ns"),
+    ):
+        try:
+            if file_sha256(in_path) != cache.get("input_sha256"):
+                return None
+        except OSError:
+            return None
+
+    return report
+
+
+def sanitize_file(
+    in_path: Path,
+    out_path: Path | None = None,
+    report_path: Path | None = None,
+    pretty: bool = False,
+    stream: bool = False,
+    ndjson: bool = False,
+    columnar: bool = False,
+    incremental: bool = False,
+) -> dict[str, Any]:
+    """Sanitize one file and write its output and report.
+
+    With columnar, the parsed fields are also exported as typed columns (see
+    autoply.columnar) next to the output. The report records the input's
+    content hash and the parser fingerprint. With incremental, a file whose
+    earlier outputs are still valid (see cached_report) is not read again and
+    its earlier report is returned.
+
+    Returns the report, with "cached" set when the work was skipped. Raises
+    SanitizeError when the input is missing or cannot be parsed (or
+    repaired).
+    """
+    default_out, default_report = default_paths(in_path, ndjson)
+    out_path = out_path or default_out
+    report_path = report_path or default_report
+
+    fingerprint = parser_fingerprint(pretty, stream, ndjson, columnar)
+    if incremental:
+        report = cached_report(in_path, out_path, report_path, fingerprint)
+        if report is not None:
+            return {**report, "report": str(report_path), "cached": True}
+
+    # Taken before the input is read, so a file changed mid-run is seen as
+    # changed next time rather than matching outputs of its old content
+    try:
+        stat = in_path.stat()
+        input_sha256 = file_sha256(in_path)
+    except FileNotFoundError:
+        raise SanitizeError(f"file not found: {in_path}") from None
+
+    indent = 2 if pretty else None
+    columns = _column_builder(in_path) if columnar else None
+
+    if stream:
+        # Written next to the output and moved into place only once complete
+        tmp_path = out_path.with_name(out_path.name + ".tmp")
+        try:
+            with open(in_path, "r", encoding="utf-8-sig") as f_in, open(
+                tmp_path, "w", encoding="utf-8"
+            ) as f_out:
+                report = sanitize_stream(
+                    f_in, f_out, indent=indent, ndjson=ndjson, columns=columns
+                )
+                if not ndjson:
+                    f_out.write("\n")
+        except FileNotFoundError:
+            raise SanitizeError(f"file not found: {in_path}") from None
+        except ValueError as e:
+            tmp_path.unlink(missing_ok=True)
+            raise SanitizeError(f"failed to parse JSON: {in_path}: {e}") from None
+
+        os.replace(tmp_path, out_path)
+        loaded = RepairResult(data=None, repaired=False)
+    else:
+        try:
+            loaded = load_json_maybe_repair(in_path)
+        except FileNotFoundError:
+            raise SanitizeError(f"file not found: {in_path}") from None
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise SanitizeError(f"failed to parse JSON: {in_path}: {e}") from None
+
+        if not isinstance(loaded.data, dict):
+            raise SanitizeError("expected top-level JSON object")
+
+        # The loaded payload is only needed until it has become records
+        records = sanitize_records(loaded.data, in_place=True)
+        report = records.meta
+
+        with open(out_path, "w", encoding="utf-8") as f:
+            write_records(records, f, indent=indent, ndjson=ndjson)
+            if not ndjson:
+                f.write("\n")
+
+        if columns is not None:
+            columns.timestamp = records.fields.get("timestamp")
+            for section in records.deals or ():
+                for item in section.items or ():
+                    if isinstance(item, DealRecord):
+                        columns.add(
+                            section.category,
+                            item.title,
+                            item.savings_parsed,
+                            item.offer_parsed,
+                        )
+
+    cols_path = None
+    if columns is not None:
+        cols_path = columnar_path(out_path)
+        columns.write(cols_path)
+
+    report_payload = {
+        **report,
+        "input": str(in_path),
+        "output": str(out_path),
+        "repaired": loaded.repaired,
+        "repair_note": loaded.note,
+        "salvaged_items": loaded.salvaged_items,
+        "columnar": str(cols_path) if cols_path else None,
+        "cache": {
+            "input_sha256": input_sha256,
+            "input_bytes": stat.st_size,
+            "input_mtime_ns": stat.st_mtime_ns,
+            "fingerprint": fingerprint,
+            "output_bytes": out_path.stat().st_size,
+            "columnar_bytes": cols_path.stat().st_size if cols_path else None,
+        },
+    }
+    report_path.write_text(
+        json.dumps(report_payload, ensure_ascii=False, indent=indent) + "\n",
+        encoding="utf-8",
+    )
+    return {**report_payload, "report": str(report_path), "cached": False}
+
+
+def _summary(report: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "ok": True,
+        "cached": report["cached"],
+        "repaired": report["repaired"],
+        "output": report["output"],
+        "report": report["report"],
+        "categories": report.get("categories"),
+        "items": report.get("items"),
+        "warnings": len(report.get("warnings", [])),
+    }
+
+
+# Outputs of earlier runs and the scraper's sidecars, never picked up as
+# inputs from a directory or glob
+_OUTPUT_SUFFIXES = (
+    ".sanitized.json",
+    ".sanitized.ndjson",
+    ".report.json",
+    ".manifest.json",
+    ".checkpoint.json",
+)
+
+# Indexes kept next to the scraper's outputs (stores/index.json,
+# snapshots/index.json), skipped the same way
+_INDEX_NAMES = frozenset({"index.json"})
+
+
+def expand_inputs(specs: Iterable[str], exclude: Iterable[Path] = ()) -> list[Path]:
+    """Resolve files, directories (their *.json files) and glob patterns.
+
+    Returns unique paths in sorted order, so batches are processed and
+    reported the same way on every run. Explicitly named files are kept even
+    if they do not exist, so they are reported as failures. Files found by a
+    directory or glob are skipped if they are in exclude, e.g. the batch
+    report.
+    """
+    found: set[Path] = set()
+    skip = {Path(p).resolve() for p in exclude}
+
+    for spec in specs:
+        path = Path(spec)
+        if glob.has_magic(spec):
+            matches = [Path(m) for m in glob.glob(spec, recursive=True)]
+        elif path.is_dir():
+            matches = list(path.glob("*.json"))
+        else:
+            found.add(path)
+            continue
+
+        found.update(
+            m
+            for m in matches
+            if m.is_file()
+            and not m.name.endswith(_OUTPUT_SUFFIXES)
+            and m.name not in _INDEX_NAMES
+            and m.resolve() not in skip
+        )
+
+    return sorted(found)
+
+
+def _sanitize_job(
+    job: tuple[Path, Path | None, bool, bool, bool, bool, bool],
+) -> dict[str, Any]:
+    # Runs in a worker process; failures are returned so one bad file never
+    # takes the rest of the batch down with it
+    in_path, out_dir, pretty, stream, ndjson, columnar, incremental = job
+    out_path, report_path = default_paths(in_path, ndjson, out_dir)
+    try:
+        report = sanitize_file(
+            in_path,
+            out_path,
+            report_path,
+            pretty,
+            stream,
+            ndjson,
+            columnar,
+            incremental,
+        )
+    except Exception as e:
+        return {"ok": False, "input": str(in_path), "error": str(e)}
+    return {"input": str(in_path), **_summary(report), "_report": report}
+
+
+def sanitize_batch(
+    paths: list[Path],
+    out_dir: Path | None = None,
+    workers: int | None = None,
+    pretty: bool = False,
+    stream: bool = False,
+    ndjson: bool = False,
+    columnar: bool = False,
+    incremental: bool = False,
+) -> dict[str, Any]:
+    """Sanitize many files across worker processes.
+
+    Per-file outputs and reports are written as in single-file mode (into
+    out_dir if given). Returns the aggregated report: one entry per file in
+    the order given, plus totals with the kind counts and warnings of all
+    files merged. A file that fails is recorded with its error and the rest
+    of the batch carries on.
+
+    With incremental, files whose outputs are still valid are checked here
+    first, and only the rest go to the workers; when nothing changed, no
+    worker is started.
+    """
+    results: list[dict[str, Any] | None] = [None] * len(paths)
+    pending = []
+
+    fingerprint = parser_fingerprint(pretty, stream, ndjson, columnar)
+
+    for i, path in enumerate(paths):
+        job = (path, out_dir, pretty, stream, ndjson, columnar, False)
+        if incremental:
+            out_path, report_path = default_paths(path, ndjson, out_dir)
+            report = cached_report(path, out_path, report_path, fingerprint)
+            if report is not None:
+                report = {**report, "report": str(report_path), "cached": True}
+                results[i] = {"input": str(path), **_summary(report), "_report": report}
+                continue
+        pending.append((i, job))
+
+    jobs = [job for _, job in pending]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+
+    if workers == 1:
+        done = [_sanitize_job(job) for job in jobs]
+    else:
+        # Imported here so single files and fully cached batches don't pay for it
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map yields in submission order, whatever order workers finish in
+            done = list(pool.map(_sanitize_job, jobs, chunksize=4))
+
+    for (i, _), result in zip(pending, done):
+        results[i] = result
+
+    savings_kind_counts: Counter[str] = Counter()
+    offer_kind_counts: Counter[str] = Counter()
+    warnings: list[str] = []
+
+    for result in results:
+        report = result.pop("_report", None)
+        if report is None:
+            continue
+        savings_kind_counts.update(report["savings_kind_counts"])
+        offer_kind_counts.update(report["offer_kind_counts"])
+        warnings.extend(f"{result['input']}: {w}" for w in report["warnings"])
+
+    ok = [r for r in results if r["ok"]]
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "files": len(results),
+        "succeeded": len(ok),
+        "failed": len(results) - len(ok),
+        "cached": sum(1 for r in ok if r["cached"]),
+        "categories": sum(r["categories"] for r in ok),
+        "items": sum(r["items"] for r in ok),
+        "repaired": sum(1 for r in ok if r["repaired"]),
+        "savings_kind_counts": dict(sorted(savings_kind_counts.items())),
+        "offer_kind_counts": dict(sorted(offer_kind_counts.items())),
+        "warnings": warnings,
+        "results": results,
+    }
+
+
+def _stat_key(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def watch(
+    specs: list[str],
+    interval: float,
+    out_dir: Path | None = None,
+    workers: int | None = None,
+    pretty: bool = False,
+    stream: bool = False,
+    ndjson: bool = False,
+    columnar: bool = False,
+    exclude: Iterable[Path] = (),
+):
+    """Re-sanitize inputs whose content changed, every interval seconds.
+
+    The inputs are expanded again on every pass, so new files in a watched
+    directory or glob are picked up, skipping exclude as in expand_inputs.
+    Prints a summary line for every file sanitized, and for every file that
+    fails, once until it changes. Runs until interrupted.
+    """
+    failed: dict[Path, tuple[tuple[int, int] | None, str]] = {}
+
+    while True:
+        # Failed inputs have no outputs to validate, so they are only retried
+        # once they have been touched
+        paths = [
+            p
+            for p in expand_inputs(specs, exclude)
+            if p not in failed or _stat_key(p) != failed[p][0]
+        ]
+        batch = sanitize_batch(
+            paths,
+            out_dir,
+            workers,
+            pretty,
+            stream,
+            ndjson,
+            columnar,
+            incremental=True,
+        )
+
+        for path, result in zip(paths, batch["results"]):
+            if result["ok"]:
+                failed.pop(path, None)
+                if not result["cached"]:
+                    print(json.dumps(result, ensure_ascii=False), flush=True)
+            else:
+                failed[path] = (_stat_key(path), result["error"])
+                print(json.dumps(result, ensure_ascii=False), flush=True)
+
+        time.sleep(interval)
+
+
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(
         description="Sanitize Publix weekly-ad JSON: parse savings/offers, normalize unicode, and emit a report.",
     )
-    parser.add_argument("input", type=Path, help="Path to publix.json")
+    parser.add_argument(
+        "input",
+        nargs="+",
+        help="Path to publix.json; several files, directories (their *.json) "
+        "or glob patterns sanitize a batch",
+    )
     parser.add_argument(
         "--out",
         type=Path,
@@ -370,63 +1504,143 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Pretty-print JSON outputs",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Sanitize item by item in constant memory (no truncation repair)",
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Write one item per line, with its category, instead of grouped JSON",
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="Also export the parsed fields as memory-mappable typed columns "
+        "(<output>.cols)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for a batch (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--out-dir",
+        type=Path,
+        default=None,
+        help="Batch: write outputs and reports here instead of next to each input",
+    )
+    parser.add_argument(
+        "--batch-report",
+        type=Path,
+        default=Path("sanitizer.batch.json"),
+        help="Batch: aggregated report path (default: sanitizer.batch.json)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip inputs whose content hash and parser version match their outputs",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, re-sanitizing inputs whenever their content changes",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="Seconds between --watch passes (default: 2)",
+    )
 
     args = parser.parse_args(argv)
 
-    in_path: Path = args.input
-    out_path: Path = args.out or in_path.with_suffix(in_path.suffix + ".sanitized.json")
-    report_path: Path = args.report or in_path.with_suffix(
-        in_path.suffix + ".report.json"
+    single = len(args.input) == 1 and not (
+        glob.has_magic(args.input[0]) or Path(args.input[0]).is_dir()
     )
 
-    try:
-        loaded = load_json_maybe_repair(in_path)
-    except FileNotFoundError:
-        print(f"error: file not found: {in_path}", file=sys.stderr)
-        return 2
-    except json.JSONDecodeError as e:
-        print(f"error: failed to parse JSON: {in_path}: {e}", file=sys.stderr)
-        return 2
+    if single and not args.watch:
+        try:
+            report = sanitize_file(
+                Path(args.input[0]),
+                args.out,
+                args.report,
+                pretty=args.pretty,
+                stream=args.stream,
+                ndjson=args.ndjson,
+                columnar=args.columnar,
+                incremental=args.incremental,
+            )
+        except SanitizeError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+
+        print(json.dumps(_summary(report), ensure_ascii=False))
+        return 0
+
+    if args.out or args.report:
+        parser.error(
+            "--out and --report take a single input, without --watch; use --out-dir"
+        )
 
-    if not isinstance(loaded.data, dict):
-        print("error: expected top-level JSON object", file=sys.stderr)
+    paths = expand_inputs(args.input, exclude=[args.batch_report])
+    if not paths and not args.watch:
+        print("error: no input files matched", file=sys.stderr)
         return 2
 
-    sanitized, report = sanitize_publix_payload(loaded.data)
+    if args.out_dir:
+        names = [p.name for p in paths]
+        clashes = sorted({n for n in names if names.count(n) > 1})
+        if clashes:
+            parser.error(f"--out-dir would overwrite outputs: {', '.join(clashes)}")
+        args.out_dir.mkdir(parents=True, exist_ok=True)
 
-    indent = 2 if args.pretty else None
-
-    out_path.write_text(
-        json.dumps(sanitized, ensure_ascii=False, indent=indent) + "\n",
-        encoding="utf-8",
+    if args.watch:
+        try:
+            watch(
+                args.input,
+                args.interval,
+                out_dir=args.out_dir,
+                workers=args.workers,
+                pretty=args.pretty,
+                stream=args.stream,
+                ndjson=args.ndjson,
+                columnar=args.columnar,
+                exclude=[args.batch_report],
+            )
+        except KeyboardInterrupt:
+            return 0
+
+    batch = sanitize_batch(
+        paths,
+        out_dir=args.out_dir,
+        workers=args.workers,
+        pretty=args.pretty,
+        stream=args.stream,
+        ndjson=args.ndjson,
+        columnar=args.columnar,
+        incremental=args.incremental,
     )
-    report_payload = {
-        **report,
-        "input": str(in_path),
-        "output": str(out_path),
-        "repaired": loaded.repaired,
-        "repair_note": loaded.note,
-    }
-    report_path.write_text(
-        json.dumps(report_payload, ensure_ascii=False, indent=indent) + "\n",
-        encoding="utf-8",
+    args.batch_report.write_text(
+        json.dumps(batch, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
     )
 
+    for result in batch["results"]:
+        print(json.dumps(result, ensure_ascii=False))
     print(
         json.dumps(
             {
-                "ok": True,
-                "repaired": loaded.repaired,
-                "output": str(out_path),
-                "report": str(report_path),
-                "categories": report.get("categories"),
-                "items": report.get("items"),
-                "warnings": len(report.get("warnings", [])),
-            },
-            ensure_ascii=False,
+                "ok": not batch["failed"],
+                "files": batch["files"],
+                "failed": batch["failed"],
+                "items": batch["items"],
+                "batch_report": str(args.batch_report),
+            }
         )
     )
-    return 0
+    return 1 if batch["failed"] else 0
 
 
 if __name__ == "__main__":